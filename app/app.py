@@ -17,9 +17,11 @@ st.set_page_config(
     layout="centered"
 )
 
-# Initialize chatbot
+# Initialize chatbot. Completions are cached per process; set CHATBOT_COMPLETION_CACHE_DB
+# (in the environment or as a top-level key in secrets.toml) to keep them in a SQLite file
 if "chatbot" not in st.session_state:
-    st.session_state.chatbot = RealEstateChatbot(api_key=openai_api_key)
+    # Speculative: the next turn is prepared while the user types
+    st.session_state.chatbot = RealEstateChatbot(api_key=openai_api_key, speculative=True)
 
 # Initialize session state for messages
 if "messages" not in st.session_state:
@@ -153,8 +155,18 @@ if prompt:
     # Get and display assistant response
     with st.chat_message("assistant"):
         try:
-            response = st.session_state.chatbot.process_message(prompt)
-            st.markdown(response["assistant_response"])
+            # Render tokens as they arrive, then the final reply (postcode checks may rewrite it)
+            placeholder = st.empty()
+            streamed = ""
+            stream = st.session_state.chatbot.process_message_stream(prompt)
+            while True:
+                try:
+                    streamed += next(stream)
+                except StopIteration as done:
+                    response = done.value
+                    break
+                placeholder.markdown(streamed + "▌")
+            placeholder.markdown(response["assistant_response"])
             st.session_state.messages.append(
                 {"role": "assistant", "content": response["assistant_response"]}
             )
@@ -0,0 +1,333 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+from src.chatbot import RealEstateChatbot, SlotBlockFilter, _get_next_slot
+from src.llm.resilience import DeadlineExceeded
+
+
+class AsyncRealEstateChatbot(RealEstateChatbot):
+    """
+    RealEstateChatbot on the async OpenAI client.
+
+    Prompts, slot handling, postcode validation and the completion cache are
+    shared with RealEstateChatbot; only the API calls are awaited. Vector-store
+    writes are queued for the store's writer thread (or, for stores without
+    write-behind, run in a worker thread) so a slow embedding call doesn't
+    block the event loop.
+    """
+
+    def _make_client(self, api_key: str) -> AsyncOpenAI:
+        """
+        Get the async OpenRouter API client on the shared connection pool.
+
+        Args:
+            api_key: OpenAI API key
+
+        Returns:
+            Async API client
+        """
+        return self.client_pool.async_openai_client(api_key)
+
+    async def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cacheable: Optional[bool] = None,
+        **params,
+    ) -> str:
+        """
+        Run a chat completion, serving identical requests from the completion cache.
+
+        Args:
+            messages: Chat messages
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            cacheable: Force caching on or off (defaults to the cache's temperature rule)
+            **params: Other request parameters (e.g. top_p)
+
+        Returns:
+            Completion text
+        """
+        start = time.perf_counter()
+        request = dict(model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens, **params)
+        key, cached = self._cache_lookup(request, cacheable)
+        if cached is not None:
+            self._record_llm_call(time.perf_counter() - start, cache_hit=True)
+            return cached
+        completion = await self._create_completion(request)
+        self._record_llm_call(time.perf_counter() - start, usage=getattr(completion, "usage", None))
+        text = completion.choices[0].message.content or ""
+        if key is not None:
+            self.completion_cache.set(key, text)
+        return text
+
+    async def _create_completion(self, request: Dict[str, Any]) -> Any:
+        """
+        Send one chat completion request to the API.
+
+        Args:
+            request: Keyword arguments for chat.completions.create
+
+        Returns:
+            ChatCompletion response
+        """
+        return await self.llm_caller.acall(
+            lambda timeout: self.client.chat.completions.create(**request, timeout=timeout),
+            self._turn_deadline,
+        )
+
+    async def detect_intent(self, message: str) -> str:
+        """
+        Detect the user's intent from their message.
+
+        The local classifier answers when it is confident; otherwise the LLM is asked.
+
+        Args:
+            message: User's message
+
+        Returns:
+            Detected intent (BUY_HOME, SELL_HOME, GENERAL_QUERY, or INVALID)
+        """
+        intent = self._local_intent(message)
+        if intent is not None:
+            return intent
+        self.metrics.inc("intent_predictions_total", source="llm")
+        try:
+            if self.intent_batcher is not None:
+                return await self.intent_batcher.classify(message, self._turn_deadline)
+            return self._parse_intent(
+                await self._complete(messages=self._intent_messages(message), temperature=0.3, max_tokens=50, top_p=1)
+            )
+
+        except Exception as e:
+            print(f"Error detecting intent: {e}")
+            return "GENERAL_QUERY"
+
+    async def _batched_slot_response(self, message: str, next_slot: str) -> Optional[str]:
+        """
+        Fill the intent slot from the intent batcher's LLM label.
+
+        Args:
+            message: User's message
+            next_slot: Slot the chatbot asked for
+
+        Returns:
+            Templated response, or None if there is no batcher, the pending slot isn't
+            intent, or the label isn't BUY_HOME/SELL_HOME (the full slot prompt handles those)
+        """
+        if next_slot != "intent" or self.intent_batcher is None:
+            return None
+        try:
+            intent = await self.intent_batcher.classify(message, self._turn_deadline)
+        except Exception as e:
+            print(f"Error detecting intent: {e}")
+            return None
+        return self._batched_intent_reply(intent)
+
+    async def generate_response(
+        self, message: str, intent: str, conversation_history: List[Dict[str, Any]]
+    ) -> str:
+        """
+        Generate a response based on the user's message and intent.
+
+        Args:
+            message: User's message
+            intent: Detected intent
+            conversation_history: List of previous messages
+
+        Returns:
+            Generated response
+        """
+        try:
+            response = await self._complete(
+                messages=self._response_messages(message, intent, conversation_history),
+                temperature=0.7,
+                max_tokens=1024,
+                top_p=1,
+            )
+            return response.strip()
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return "I apologize, but I'm having trouble processing your request. Please try again."
+
+    async def _record_turn(self, message: str, response: str) -> Dict[str, Any]:
+        """
+        Store a finished turn in the conversation history and vector store.
+
+        The history entry is appended before the vector-store write starts, so
+        it is visible to the session as soon as the reply is ready.
+
+        Args:
+            message: User's message
+            response: Assistant response
+
+        Returns:
+            Conversation entry for the turn
+        """
+        conversation_entry = self._append_history(message, response)
+        self._speculate()
+        turn = len(self.conversation_history) - 1
+        if getattr(self.vector_store, "write_behind", False):
+            # Only enqueues; the store's writer thread does the slow part
+            self._store_turn(conversation_entry, turn)
+        elif self.vector_store:
+            await asyncio.to_thread(self._store_turn, conversation_entry, turn)
+        return conversation_entry
+
+    async def process_message(self, message: str) -> Dict[str, Any]:
+        """
+        Process a user message and generate a response.
+
+        Args:
+            message: User's message
+
+        Returns:
+            Dictionary containing the response and metadata
+        """
+        with self.metrics.timer("turn", mode="blocking"):
+            return await self._process_message(message)
+
+    async def _process_message(self, message: str) -> Dict[str, Any]:
+        next_slot = _get_next_slot(self.slot_state)
+        self._begin_turn(next_slot)
+
+        try:
+            if next_slot is None:
+                response = self._summary_response()
+            else:
+                response = self._local_slot_response(message, next_slot)
+                if response is None:
+                    response = await self._batched_slot_response(message, next_slot)
+                if response is None:
+                    response_raw = await self._complete(
+                        messages=self._slot_messages(message, next_slot),
+                        temperature=0.7,
+                        max_tokens=300,
+                    )
+                    response = self._apply_slot_response(response_raw.strip())
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            response = self._fallback_response(next_slot)
+        finally:
+            self._end_turn()
+
+        return await self._record_turn(message, response)
+
+    async def _stream_complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cacheable: Optional[bool] = None,
+        **params,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming counterpart of _complete: yields completion text as it arrives.
+
+        Cached completions are yielded in one piece; fresh ones are cached once complete.
+
+        Args:
+            messages: Chat messages
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            cacheable: Force caching on or off (defaults to the cache's temperature rule)
+            **params: Other request parameters (e.g. top_p)
+
+        Yields:
+            Pieces of the completion text
+        """
+        lookup_start = time.perf_counter()
+        request = dict(model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens, **params)
+        key, cached = self._cache_lookup(request, cacheable)
+        if cached is not None:
+            self._record_llm_call(time.perf_counter() - lookup_start, cache_hit=True)
+            yield cached
+            return
+
+        timeout, ticket = self.llm_caller.before_call(self._turn_deadline)
+        start = time.monotonic()
+        failed = False
+        pieces = []
+        usage = None
+        try:
+            async for chunk in await self.client.chat.completions.create(
+                **request, stream=True, stream_options={"include_usage": True}, timeout=timeout
+            ):
+                if time.monotonic() - start > timeout:
+                    raise DeadlineExceeded(f"LLM stream did not finish within {timeout:.1f}s")
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    pieces.append(content)
+                    yield content
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # A consumer closing the stream early is not a provider failure
+            self.llm_caller.record(not failed, time.monotonic() - start, ticket)
+        self._record_llm_call(time.monotonic() - start, usage=usage)
+        if key is not None:
+            self.completion_cache.set(key, "".join(pieces))
+
+    async def process_message_stream(self, message: str) -> AsyncIterator[str]:
+        """
+        Process a user message, yielding the response text as it is generated.
+
+        Async generators cannot return a value, so the finished turn's entry is
+        read from conversation_history[-1] once iteration ends. As with the sync
+        version, postcode validation can replace the whole reply, so callers should
+        render that entry's assistant_response when the generator finishes.
+
+        Args:
+            message: User's message
+
+        Yields:
+            Pieces of the assistant response
+        """
+        with self.metrics.timer("turn", mode="stream"):
+            async for piece in self._process_message_stream(message):
+                yield piece
+
+    async def _process_message_stream(self, message: str) -> AsyncIterator[str]:
+        next_slot = _get_next_slot(self.slot_state)
+        self._begin_turn(next_slot)
+
+        try:
+            if next_slot is None:
+                response = self._summary_response()
+                yield response
+            elif (response := self._local_slot_response(message, next_slot)) is not None:
+                yield response
+            elif (response := await self._batched_slot_response(message, next_slot)) is not None:
+                yield response
+            else:
+                pieces = []
+                visible = SlotBlockFilter()
+                async for piece in self._stream_complete(
+                    messages=self._slot_messages(message, next_slot),
+                    temperature=0.7,
+                    max_tokens=300,
+                ):
+                    pieces.append(piece)
+                    text = visible.feed(piece)
+                    if text:
+                        yield text
+                text = visible.flush()
+                if text:
+                    yield text
+                response = self._apply_slot_response("".join(pieces).strip())
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            response = self._fallback_response(next_slot)
+            yield response
+        finally:
+            self._end_turn()
+
+        await self._record_turn(message, response)
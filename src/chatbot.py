@@ -1,36 +1,183 @@
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Generator, Iterator, List, Any, NamedTuple, Optional, Tuple
 from datetime import datetime
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from openai import OpenAI
+from src.llm.batcher import IntentBatcher
+from src.llm.cache import CompletionCache, get_shared_completion_cache
+from src.llm.client_pool import ClientPool, get_shared_client_pool
+from src.llm.resilience import DeadlineExceeded, ResilientCaller, get_shared_resilient_caller
 from src.memory.vector_store import VectorStore
+from src.prompts.compiler import CompiledPrompt, compile_slot_prompt, count_tokens
 from src.prompts.templates import (
+    BUDGET_TOO_LOW_TEMPLATE,
+    INTENT_LABELS,
     INTENT_RECOGNITION_TEMPLATE,
+    LLM_FALLBACK_TEMPLATE,
+    PROPERTY_TYPE_LABELS,
     RESPONSE_TEMPLATE,
-    SLOT_PROMPT_TEMPLATE,
+    SLOT_ACKNOWLEDGEMENTS,
+    SLOT_QUESTIONS,
 )
 import json
 import os
-from src.utils.postcode_validator import validate_postcode, load_uk_postcodes, validate_uk_postcode_format
+from src.utils.coverage import CoverageEngine, get_shared_coverage_engine
+from src.utils.intent_classifier import IntentClassifier, get_shared_intent_classifier
+from src.utils.postcode_suggest import PostcodeSuggester
+from src.utils.postcode_validator import (
+    PostcodeIndex,
+    get_shared_postcode_index,
+    validate_postcode,
+    validate_uk_postcode_format,
+)
+from src.utils.metrics import MetricsRegistry, get_metrics
+from src.utils.slot_extractors import extract_slot_value
 
 # from src.prompts.templates import INTENT_RECOGNITION_TEMPLATE, RESPONSE_TEMPLATE
 # from src.agent.slot_filling import run_slot_filling, SLOTS
 
 # ── Slot‑filling setup ──────────────────────────────────────────────────────
 SLOT_KEYS = ["intent", "property_type", "name", "phone", "email", "budget", "postcode"]
+SLOT_START_TAG = "SLOT_VALUES_START"
+SLOT_END_TAG = "SLOT_VALUES_END"
+
+# Background threads that prepare the next turn for speculative sessions. At most
+# SPECULATION_MAX_PENDING speculations are running or queued; beyond that a turn is not
+# speculated, so a burst of sessions can't build an unbounded backlog of stale work
+SPECULATION_WORKERS = 2
+SPECULATION_MAX_PENDING = 4
+_speculation_executor: Optional[ThreadPoolExecutor] = None
+_speculation_slots = threading.BoundedSemaphore(SPECULATION_MAX_PENDING)
+_speculation_lock = threading.Lock()
+
+
+def _submit_speculation(fn, *args) -> Optional[Future]:
+    """
+    Run fn in the speculation pool if it has room.
+
+    Args:
+        fn: Callable preparing a speculation
+        *args: Arguments for fn
+
+    Returns:
+        Future for the result, or None if the pool is busy or shut down
+    """
+    global _speculation_executor
+    if not _speculation_slots.acquire(blocking=False):
+        return None
+    with _speculation_lock:
+        if _speculation_executor is None:
+            _speculation_executor = ThreadPoolExecutor(
+                max_workers=SPECULATION_WORKERS, thread_name_prefix="speculate"
+            )
+        try:
+            future = _speculation_executor.submit(fn, *args)
+        except RuntimeError:
+            # Interpreter or server shutting down
+            _speculation_slots.release()
+            return None
+    # Also runs when a queued speculation is cancelled
+    future.add_done_callback(lambda _: _speculation_slots.release())
+    return future
+
+
+def shutdown_speculation() -> None:
+    """Stop the speculation threads, dropping queued speculations (call on server shutdown)."""
+    global _speculation_executor
+    with _speculation_lock:
+        executor, _speculation_executor = _speculation_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class Speculation(NamedTuple):
+    """The next turn, prepared while the user is still typing."""
+
+    key: str
+    next_slot: str
+    # Slot-filling prompt compiled without the user's message
+    prompt: CompiledPrompt
+    # Complete replies for slots with a fixed set of answers (intent, property_type)
+    replies: Dict[str, str]
+    # Acknowledgement plus next question with a {value} placeholder, for free-form slots
+    reply_template: Optional[str]
+    # Reply for a NEW-build budget under 1 million
+    low_budget_reply: Optional[str]
+
+    def reply(self, value: Any) -> Optional[str]:
+        """
+        Get the prepared reply for an answer to next_slot.
+
+        Args:
+            value: Slot value extracted from the user's message
+
+        Returns:
+            Reply text, or None if nothing was prepared for this answer
+        """
+        if value in self.replies:
+            return self.replies[value]
+        if self.low_budget_reply is not None and value < 1_000_000:
+            return self.low_budget_reply
+        if self.reply_template is not None:
+            return self.reply_template.format(value=value)
+        return None
+
+
+def speculation_key(slot_state: Dict[str, Any], next_slot: str) -> str:
+    return json.dumps(slot_state, sort_keys=True, default=str) + "|" + next_slot
 
 
 class RealEstateChatbot:
-    def __init__(self, api_key: str, vector_store: Optional[VectorStore] = None):
+    def __init__(
+        self,
+        api_key: str,
+        vector_store: Optional[VectorStore] = None,
+        coverage: Optional[CoverageEngine] = None,
+        office: Optional[str] = None,
+        postcode_index: Optional[PostcodeIndex] = None,
+        completion_cache: Optional[CompletionCache] = None,
+        client: Optional[Any] = None,
+        client_pool: Optional[ClientPool] = None,
+        llm_caller: Optional[ResilientCaller] = None,
+        turn_budget: float = 20.0,
+        metrics: Optional[MetricsRegistry] = None,
+        intent_classifier: Optional[IntentClassifier] = None,
+        intent_threshold: float = 0.8,
+        intent_batcher: Optional[IntentBatcher] = None,
+        speculative: bool = False,
+        session_id: Optional[str] = None,
+    ):
         """
         Initialize the chatbot.
 
         Args:
             api_key: OpenAI API key
             vector_store: Optional vector store for conversation memory (defaults to in-memory storage)
+            coverage: Optional service-area coverage engine (defaults to the process-wide engine for data/coverage.json)
+            office: Optional branch office whose coverage applies (defaults to the configured default office)
+            postcode_index: Optional postcode index (defaults to the process-wide index for data/uk_postcodes.csv)
+            completion_cache: Optional LLM completion cache (defaults to the process-wide in-memory cache)
+            client: Optional pre-built API client (overrides client_pool)
+            client_pool: Optional HTTP connection pool (defaults to the process-wide pool)
+            llm_caller: Optional deadline/hedging/circuit-breaker policy for LLM calls
+                (defaults to the process-wide one)
+            turn_budget: Seconds a turn may spend on LLM calls before falling back to a templated reply
+            metrics: Optional metrics registry (defaults to the process-wide one)
+            intent_classifier: Optional local intent classifier (defaults to the process-wide model
+                in src/data/intent_model.npz, if one has been trained)
+            intent_threshold: Minimum classifier confidence to fill the intent slot (or answer
+                detect_intent) without the LLM
+            intent_batcher: Optional micro-batcher that shares intent LLM calls (intent slot and
+                detect_intent) between concurrent sessions
+            speculative: Prepare the next turn's prompt and reply in the background after each turn
+            session_id: Optional session identifier, used in vector-store document ids (defaults to a random one)
         """
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-        )
+        self.session_id = session_id or uuid.uuid4().hex
+        self.client_pool = client_pool or get_shared_client_pool()
+        self.metrics = metrics or get_metrics()
+        self.client = client if client is not None else self._make_client(api_key)
         # If no vector store is provided, use the in-memory vector store
         # self.vector_store = vector_store or VectorStore()  # This will use in-memory by default
         self.vector_store = vector_store  # This will use in-memory by default
@@ -39,8 +186,50 @@ class RealEstateChatbot:
         self.slot_state: Dict[str, Any] = {k: None for k in SLOT_KEYS}
 
         self.model = "openai/gpt-4o"
+        self.completion_cache = completion_cache or get_shared_completion_cache()
+        self.llm_caller = llm_caller or get_shared_resilient_caller()
+        self.turn_budget = turn_budget
+        # time.monotonic() by which the current turn's LLM calls must finish (None outside a turn)
+        self._turn_deadline: Optional[float] = None
+        # Most recent slot-filling prompt, with its token counts
+        self.last_prompt: Optional[CompiledPrompt] = None
+        self.intent_classifier = intent_classifier or get_shared_intent_classifier()
+        self.intent_threshold = intent_threshold
+        self.intent_batcher = intent_batcher
+        self.speculative = speculative
+        self._speculation: Optional[Future] = None
+        # Prepared speculation matching the current turn (None outside a turn or on a miss)
+        self._turn_speculation: Optional[Speculation] = None
+        # What filled the intent slot this turn without the slot prompt ("local" classifier or
+        # keyword "extractor"); None means the LLM did
+        self._turn_intent_source: Optional[str] = None
 
-        # Load valid postcodes
+        self.coverage = coverage or get_shared_coverage_engine()
+        self.office = office
+
+        # Valid postcodes are loaded once per process and shared by every session
+        self.valid_postcodes = postcode_index if postcode_index is not None else self._load_shared_postcodes()
+
+    def _make_client(self, api_key: str) -> OpenAI:
+        """
+        Get the OpenRouter API client on the shared connection pool.
+
+        Args:
+            api_key: OpenAI API key
+
+        Returns:
+            API client
+        """
+        return self.client_pool.openai_client(api_key)
+
+    @staticmethod
+    def _load_shared_postcodes() -> PostcodeIndex:
+        """
+        Get the process-wide postcode index for data/uk_postcodes.csv, with its suggester built.
+
+        Returns:
+            Shared PostcodeIndex, or an empty one if the postcodes cannot be loaded
+        """
         try:
             # Get the absolute path to the project root directory
             project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -48,16 +237,51 @@ class RealEstateChatbot:
             
             if not os.path.exists(postcode_file):
                 print(f"Warning: Postcode file not found at {postcode_file}")
-                self.valid_postcodes = []
-            else:
-                self.valid_postcodes = load_uk_postcodes(postcode_file)
+                return PostcodeIndex()
+            index = get_shared_postcode_index(postcode_file)
+            # Build the typo suggester here too, not inside the first turn with a bad postcode
+            PostcodeSuggester.for_index(index)
+            return index
         except Exception as e:
             print(f"Error loading postcodes: {e}")
-            self.valid_postcodes = []
+            return PostcodeIndex()
+
+    @classmethod
+    def warm_up(cls) -> None:
+        """Load the process-wide postcode index and its suggester before the first session."""
+        cls._load_shared_postcodes()
+
+    def export_state(self) -> Dict[str, Any]:
+        """
+        Snapshot the per-session state as JSON-serializable data.
+
+        Returns:
+            Dictionary with slot_state and conversation_history (timestamps as ISO strings)
+        """
+        return {
+            "slot_state": dict(self.slot_state),
+            "conversation_history": [
+                {**entry, "timestamp": entry["timestamp"].isoformat()} for entry in self.conversation_history
+            ],
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restore per-session state saved with export_state.
+
+        Args:
+            state: Dictionary returned by export_state
+        """
+        self.slot_state = {k: None for k in SLOT_KEYS}
+        self.slot_state.update(state.get("slot_state") or {})
+        self.conversation_history = [
+            {**entry, "timestamp": datetime.fromisoformat(entry["timestamp"])}
+            for entry in state.get("conversation_history") or []
+        ]
 
     def validate_user_postcode(self, postcode: str) -> Tuple[bool, str, str]:
         """
-        Validate if the user's postcode is in our service area.
+        Validate if the user's postcode exists and is in our service area.
         
         Args:
             postcode: User's postcode to validate
@@ -65,39 +289,203 @@ class RealEstateChatbot:
         Returns:
             Tuple of (is_valid, formatted_postcode, area)
         """
-        return validate_postcode(postcode, self.valid_postcodes)
+        with self.metrics.timer("postcode_validation"):
+            is_valid, formatted_postcode, area = validate_postcode(postcode, self.valid_postcodes)
+            if is_valid and not self.coverage.is_covered(formatted_postcode, self.office):
+                is_valid = False
+        return is_valid, formatted_postcode, area
+
+    def suggest_postcodes(self, postcode: str, k: int = 3) -> List[str]:
+        """
+        Suggest valid, covered postcodes close to a rejected one.
+        
+        Args:
+            postcode: Postcode the user typed
+            k: Maximum number of suggestions
+            
+        Returns:
+            Formatted postcodes, nearest first
+        """
+        if not len(self.valid_postcodes):
+            return []
+        suggester = PostcodeSuggester.for_index(self.valid_postcodes)
+        return suggester.suggest(postcode, k, where=lambda p: self.coverage.is_covered(p, self.office))
+
+    def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cacheable: Optional[bool] = None,
+        **params,
+    ) -> str:
+        """
+        Run a chat completion, serving identical requests from the completion cache.
+
+        Args:
+            messages: Chat messages
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            cacheable: Force caching on or off (defaults to the cache's temperature rule)
+            **params: Other request parameters (e.g. top_p)
+
+        Returns:
+            Completion text
+        """
+        start = time.perf_counter()
+        request = dict(model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens, **params)
+        key, cached = self._cache_lookup(request, cacheable)
+        if cached is not None:
+            self._record_llm_call(time.perf_counter() - start, cache_hit=True)
+            return cached
+        completion = self._create_completion(request)
+        self._record_llm_call(time.perf_counter() - start, usage=getattr(completion, "usage", None))
+        text = completion.choices[0].message.content or ""
+        if key is not None:
+            self.completion_cache.set(key, text)
+        return text
+
+    def _record_llm_call(self, seconds: float, cache_hit: bool = False, usage: Optional[Any] = None) -> None:
+        """
+        Record one completion's wall time, cache outcome and token usage.
+
+        Args:
+            seconds: Wall time including the cache lookup
+            cache_hit: True if the completion came from the completion cache
+            usage: completion.usage from the API response, if any
+        """
+        cache = "hit" if cache_hit else "miss"
+        self.metrics.observe("stage_seconds", seconds, stage="llm", model=self.model, cache=cache)
+        self.metrics.inc("llm_calls_total", model=self.model, cache=cache)
+        event = {"stage": "llm", "seconds": seconds, "model": self.model, "cache": cache}
+        if usage is not None:
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            self.metrics.inc("llm_tokens_total", prompt_tokens, model=self.model, kind="prompt")
+            self.metrics.inc("llm_tokens_total", completion_tokens, model=self.model, kind="completion")
+            event.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        self.metrics.emit(event)
+
+    def _cache_lookup(self, request: Dict[str, Any], cacheable: Optional[bool]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look a completion request up in the completion cache.
+
+        Args:
+            request: Keyword arguments for chat.completions.create
+            cacheable: Force caching on or off (defaults to the cache's temperature rule)
+
+        Returns:
+            Tuple of (cache key, or None if the request is not cacheable; cached text, or None on a miss)
+        """
+        cache = self.completion_cache
+        if cacheable is None:
+            cacheable = cache.is_cacheable(request["temperature"])
+        if not cacheable:
+            return None, None
+        key = cache.make_key(**request)
+        return key, cache.get(key)
+
+    def _create_completion(self, request: Dict[str, Any]) -> Any:
+        """
+        Send one chat completion request to the API.
+
+        Args:
+            request: Keyword arguments for chat.completions.create
+
+        Returns:
+            ChatCompletion response
+        """
+        return self.llm_caller.call(
+            lambda timeout: self.client.chat.completions.create(**request, timeout=timeout),
+            self._turn_deadline,
+        )
+
+    @staticmethod
+    def _intent_messages(message: str) -> List[Dict[str, str]]:
+        """Build the intent-classification prompt for a message."""
+        return [
+            {"role": "system", "content": INTENT_RECOGNITION_TEMPLATE},
+            {"role": "user", "content": message},
+        ]
+
+    @staticmethod
+    def _parse_intent(text: str) -> str:
+        """Map a completion onto one of the known intent labels."""
+        intent = text.strip().upper()
+        valid_intents = ["BUY_HOME", "SELL_HOME", "GENERAL_QUERY", "INVALID"]
+
+        # Ensure the intent is valid
+        if intent not in valid_intents:
+            return "GENERAL_QUERY"
+
+        return intent
+
+    @staticmethod
+    def _response_messages(
+        message: str, intent: str, conversation_history: List[Dict[str, Any]]
+    ) -> List[Dict[str, str]]:
+        """Build the response prompt, with the last few turns as context."""
+        # Format conversation history for context (only last 5 messages)
+        history_context = "\n".join(
+            [
+                f"User: {entry['user_message']}\nAssistant: {entry['assistant_response']}"
+                for entry in conversation_history[-5:]
+            ]
+        )  # Last 5 messages for context
+
+        # Create the prompt with context
+        prompt = RESPONSE_TEMPLATE.format(
+            intent=intent, message=message, conversation_history=history_context
+        )
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": message},
+        ]
+
+    def _local_intent(self, message: str, accept: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+        """
+        Classify intent with the local model, if it is confident enough.
+
+        Args:
+            message: User's message
+            accept: Optional labels to accept (others are treated as unsure)
+
+        Returns:
+            Detected intent, or None if something else should decide
+        """
+        if self.intent_classifier is None:
+            return None
+        with self.metrics.timer("intent_classification") as extra:
+            intent, confidence = self.intent_classifier.predict(message)
+            extra["confidence"] = confidence
+        if confidence < self.intent_threshold or (accept is not None and intent not in accept):
+            return None
+        self.metrics.inc("intent_predictions_total", source="local")
+        return intent
 
     def detect_intent(self, message: str) -> str:
         """
         Detect the user's intent from their message.
 
+        The local classifier answers when it is confident; otherwise the LLM is asked.
+
         Args:
             message: User's message
 
         Returns:
             Detected intent (BUY_HOME, SELL_HOME, GENERAL_QUERY, or INVALID)
         """
+        intent = self._local_intent(message)
+        if intent is not None:
+            return intent
+        self.metrics.inc("intent_predictions_total", source="llm")
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": INTENT_RECOGNITION_TEMPLATE},
-                    {"role": "user", "content": message},
-                ],
-                temperature=0.3,
-                max_tokens=50,
-                top_p=1,
+            if self.intent_batcher is not None:
+                return self.intent_batcher.classify(message, self._turn_deadline)
+            return self._parse_intent(
+                self._complete(messages=self._intent_messages(message), temperature=0.3, max_tokens=50, top_p=1)
             )
 
-            intent = completion.choices[0].message.content.strip().upper()
-            valid_intents = ["BUY_HOME", "SELL_HOME", "GENERAL_QUERY", "INVALID"]
-
-            # Ensure the intent is valid
-            if intent not in valid_intents:
-                return "GENERAL_QUERY"
-
-            return intent
-
         except Exception as e:
             print(f"Error detecting intent: {e}")
             return "GENERAL_QUERY"
@@ -117,120 +505,529 @@ class RealEstateChatbot:
             Generated response
         """
         try:
-            # Format conversation history for context (only last 5 messages)
-            history_context = "\n".join(
-                [
-                    f"User: {entry['user_message']}\nAssistant: {entry['assistant_response']}"
-                    for entry in conversation_history[-5:]
-                ]
-            )  # Last 5 messages for context
-
-            # Create the prompt with context
-            prompt = RESPONSE_TEMPLATE.format(
-                intent=intent, message=message, conversation_history=history_context
-            )
-
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": message},
-                ],
+            return self._complete(
+                messages=self._response_messages(message, intent, conversation_history),
                 temperature=0.7,
                 max_tokens=1024,
                 top_p=1,
-            )
-            return completion.choices[0].message.content.strip()
+            ).strip()
         except Exception as e:
             print(f"Error generating response: {e}")
             return "I apologize, but I'm having trouble processing your request. Please try again."
 
-    def process_message(self, message: str) -> Dict[str, Any]:
+    def _slot_messages(self, message: str, next_slot: str) -> List[Dict[str, str]]:
         """
-        Process a user message and generate a response.
-        
+        Build the slot-filling prompt for a turn.
+
+        Only the rules for the current intent and slot are included, as a static
+        system prefix followed by the slot state (see src.prompts.compiler).
+
         Args:
             message: User's message
-            
+            next_slot: Slot to collect next
+
         Returns:
-            Dictionary containing the response and metadata
+            Chat messages for the completion request
         """
-        next_slot = _get_next_slot(self.slot_state)
-        
-        if next_slot is None:
-            response = "✅ Thank you! Here's the info I have:\n" + "\n".join(
-                f"{k}: {v}" for k, v in self.slot_state.items()
+        speculation = self._turn_speculation
+        if speculation is not None:
+            prompt = speculation.prompt
+            messages = prompt.messages[:-1] + [{"role": "user", "content": message}]
+            self.last_prompt = prompt._replace(
+                messages=messages, total_tokens=prompt.prefix_tokens + prompt.suffix_tokens + count_tokens(message)
             )
-        else:
-            state_str = "\n".join(f"{k}: {v}" for k, v in self.slot_state.items())
-            prompt = SLOT_PROMPT_TEMPLATE.format(
-                state=state_str,
-                next_field=next_slot,
-                user_message=message,
-                json=json.dumps(self.slot_state),
-            )
-            
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": message},
-                ],
-                temperature=0.7,
-                max_tokens=300,
-            )
-            
-            response_raw = completion.choices[0].message.content.strip()
+            self.metrics.inc("speculation_total", outcome="prompt")
+            return messages
+        self.last_prompt = compile_slot_prompt(
+            self.slot_state, next_slot, message, phone=self.coverage.office(self.office).phone
+        )
+        return self.last_prompt.messages
+
+    def _fallback_response(self, next_slot: Optional[str]) -> str:
+        """
+        Templated reply for when the LLM can't be used this turn.
+
+        Args:
+            next_slot: Slot the chatbot is collecting
+
+        Returns:
+            Apology followed by the question for the pending slot
+        """
+        return LLM_FALLBACK_TEMPLATE.format(question=SLOT_QUESTIONS.get(next_slot, SLOT_QUESTIONS["chat"]))
+
+    def _summary_response(self) -> str:
+        return "✅ Thank you! Here's the info I have:\n" + "\n".join(
+            f"{k}: {v}" for k, v in self.slot_state.items()
+        )
+
+    def _apply_slot_response(self, response_raw: str) -> str:
+        """
+        Extract slot values from a slot-filling completion and update the slot state.
+
+        Args:
+            response_raw: Completion text, including the SLOT_VALUES block
+
+        Returns:
+            Assistant response to show the user
+        """
+        with self.metrics.timer("slot_extraction"):
             response_text, extracted_slots = extract_slot_block(response_raw)
+        return self._apply_slot_values(response_text, extracted_slots)
+
+    def _apply_slot_values(self, response_text: str, extracted_slots: Dict[str, Any]) -> str:
+        """
+        Validate and store extracted slot values.
+
+        Args:
+            response_text: Assistant response to show if nothing overrides it
+            extracted_slots: Slot values extracted from the user's message
+
+        Returns:
+            Assistant response to show the user
+        """
+        # Handle postcode validation
+        if "postcode" in extracted_slots and extracted_slots["postcode"]:
+            postcode = extracted_slots["postcode"]
+            is_valid, formatted_postcode, area = self.validate_user_postcode(postcode)
             
-            # Handle postcode validation
-            if "postcode" in extracted_slots and extracted_slots["postcode"]:
-                postcode = extracted_slots["postcode"]
-                is_valid, formatted_postcode, area = self.validate_user_postcode(postcode)
-                
-                if not is_valid:
-                    if not validate_uk_postcode_format(formatted_postcode):
-                        response_text = f"Sorry, '{formatted_postcode}' is not a valid UK postcode format. Please provide a valid UK postcode (e.g., SW1A 1AA)."
-                    elif area != "SW":
-                        response_text = f"Sorry, we don't cater to the {area} area. We currently only serve the SW (South West London) area. Please call the office on 1800 111 222 to get help."
-                    else:
-                        response_text = f"Sorry, we don't cater to the postcode {formatted_postcode}. Please call the office on 1800 111 222 to get help."
-                    self.slot_state["postcode"] = None  # Reset postcode as it's invalid
+            if not is_valid:
+                office = self.coverage.office(self.office)
+                if not validate_uk_postcode_format(formatted_postcode):
+                    response_text = f"Sorry, '{formatted_postcode}' is not a valid UK postcode format. Please provide a valid UK postcode (e.g., SW1A 1AA)."
+                elif not self.coverage.is_covered(formatted_postcode, self.office):
+                    response_text = f"Sorry, we don't cater to the {area} area. We currently only serve {office.description}. Please call the office on {office.phone} to get help."
                 else:
-                    self.slot_state["postcode"] = formatted_postcode
-                    response_text = f"Great! {formatted_postcode} is in our service area. "
-                    if self.slot_state["intent"] == "BUY_HOME":
-                        response_text += "You can expect someone to get in touch with you within 24 hours via phone or email. Do you need help with anything else?"
-                    else:
-                        response_text += "Our team will contact you shortly to discuss your property. Do you need help with anything else?"
-            
-            # Update other slots
-            for key, value in extracted_slots.items():
-                if key != "postcode" and key in self.slot_state and self.slot_state[key] is None:
-                    self.slot_state[key] = value
-            
-            response = response_text
+                    response_text = f"Sorry, we don't cater to the postcode {formatted_postcode}. Please call the office on {office.phone} to get help."
+                # A postcode that doesn't exist is most likely a typo, so offer the nearest covered ones
+                if not self.valid_postcodes.exists(formatted_postcode):
+                    suggestions = self.suggest_postcodes(postcode)
+                    if suggestions:
+                        response_text += f" Did you mean {' or '.join(suggestions)}?"
+                self.slot_state["postcode"] = None  # Reset postcode as it's invalid
+            else:
+                self.slot_state["postcode"] = formatted_postcode
+                response_text = f"Great! {formatted_postcode} is in our service area. "
+                if self.slot_state["intent"] == "BUY_HOME":
+                    response_text += "You can expect someone to get in touch with you within 24 hours via phone or email. Do you need help with anything else?"
+                else:
+                    response_text += "Our team will contact you shortly to discuss your property. Do you need help with anything else?"
+        
+        # Update other slots
+        for key, value in extracted_slots.items():
+            if key != "postcode" and key in self.slot_state and self.slot_state[key] is None:
+                self.slot_state[key] = value
+        
+        return response_text
+
+    def _local_slot_response(self, message: str, next_slot: str) -> Optional[str]:
+        """
+        Fill the pending slot without the LLM when the message is a clear-cut answer.
+
+        Args:
+            message: User's message
+            next_slot: Slot the chatbot asked for
 
-        # Store the conversation
+        Returns:
+            Templated response (acknowledgement plus the next question), or None if the
+            message needs the LLM
+        """
+        value = None
+        if next_slot == "intent":
+            # Only a confident buy/sell prediction fills the slot; anything else goes on to
+            # the keyword extractor and then the LLM
+            value = self._local_intent(message, accept=("BUY_HOME", "SELL_HOME"))
+            if value is not None:
+                self._turn_intent_source = "local"
+        if value is None:
+            value = extract_slot_value(next_slot, message)
+            if value is None:
+                return None
+            if next_slot == "intent":
+                self.metrics.inc("intent_predictions_total", source="extractor")
+                self._turn_intent_source = "extractor"
+        return self._fill_slot(next_slot, value)
+
+    def _batched_slot_response(self, message: str, next_slot: str) -> Optional[str]:
+        """
+        Fill the intent slot from the intent batcher's LLM label.
+
+        Args:
+            message: User's message
+            next_slot: Slot the chatbot asked for
+
+        Returns:
+            Templated response, or None if there is no batcher, the pending slot isn't
+            intent, or the label isn't BUY_HOME/SELL_HOME (the full slot prompt handles those)
+        """
+        if next_slot != "intent" or self.intent_batcher is None:
+            return None
+        try:
+            intent = self.intent_batcher.classify(message, self._turn_deadline)
+        except Exception as e:
+            print(f"Error detecting intent: {e}")
+            return None
+        return self._batched_intent_reply(intent)
+
+    def _batched_intent_reply(self, intent: str) -> Optional[str]:
+        if intent not in ("BUY_HOME", "SELL_HOME"):
+            return None
+        self.metrics.inc("intent_predictions_total", source="llm")
+        return self._fill_slot("intent", intent)
+
+    def _fill_slot(self, slot: str, value: Any) -> str:
+        """
+        Store a slot value found without the slot prompt and build the reply.
+
+        Args:
+            slot: Slot being filled
+            value: Its value
+
+        Returns:
+            Prepared speculative reply if one matches, otherwise the templated reply
+        """
+        if slot == "postcode":
+            # Postcode validation always replaces the response text
+            return self._apply_slot_values("", {"postcode": value})
+
+        speculation = self._turn_speculation
+        self._apply_slot_values("", {slot: value})
+        if speculation is not None:
+            reply = speculation.reply(value)
+            if reply is not None:
+                self._turn_speculation = None
+                self.metrics.inc("speculation_total", outcome="hit")
+                return reply
+        return self._slot_reply(slot, value)
+
+    def _slot_reply(self, slot: str, value: Any) -> str:
+        """
+        Templated reply for a slot that has just been filled.
+
+        Args:
+            slot: Slot that was filled
+            value: Its value (already stored in slot_state)
+
+        Returns:
+            Acknowledgement plus the next question, or the refusal for a NEW-build budget under 1 million
+        """
+        if slot == "budget" and self.slot_state.get("property_type") == "NEW" and value < 1_000_000:
+            return BUDGET_TOO_LOW_TEMPLATE.format(phone=self.coverage.office(self.office).phone)
+
+        label = {"intent": INTENT_LABELS, "property_type": PROPERTY_TYPE_LABELS}.get(slot, {}).get(value, value)
+        question = SLOT_QUESTIONS[_get_next_slot(self.slot_state)]
+        return f"{SLOT_ACKNOWLEDGEMENTS[slot].format(value=label)} {question}"
+
+    def _prepare_speculation(self, slot_state: Dict[str, Any]) -> Speculation:
+        """
+        Prepare the next turn for a predicted slot state.
+
+        Assumes the user will answer the question just asked: compiles that turn's
+        prompt and renders the reply for each expected answer.
+
+        Args:
+            slot_state: Slot state the next turn is expected to start from
+
+        Returns:
+            Speculation keyed on slot_state and the slot to collect next
+        """
+        next_slot = _get_next_slot(slot_state)
+        phone = self.coverage.office(self.office).phone
+        replies: Dict[str, str] = {}
+        reply_template = None
+        low_budget_reply = None
+        if next_slot in SLOT_ACKNOWLEDGEMENTS:
+            choices = {"intent": INTENT_LABELS, "property_type": PROPERTY_TYPE_LABELS}.get(next_slot)
+            if choices is not None:
+                for value, label in choices.items():
+                    question = SLOT_QUESTIONS[_get_next_slot({**slot_state, next_slot: value})]
+                    replies[value] = f"{SLOT_ACKNOWLEDGEMENTS[next_slot].format(value=label)} {question}"
+            else:
+                # Free-form answers don't change which slot comes next, so only the value varies
+                question = SLOT_QUESTIONS[_get_next_slot({**slot_state, next_slot: ""})]
+                reply_template = f"{SLOT_ACKNOWLEDGEMENTS[next_slot]} {question}"
+                if next_slot == "budget" and slot_state.get("property_type") == "NEW":
+                    low_budget_reply = BUDGET_TOO_LOW_TEMPLATE.format(phone=phone)
+        return Speculation(
+            key=speculation_key(slot_state, next_slot),
+            next_slot=next_slot,
+            prompt=compile_slot_prompt(slot_state, next_slot, "", phone=phone),
+            replies=replies,
+            reply_template=reply_template,
+            low_budget_reply=low_budget_reply,
+        )
+
+    def _speculate(self) -> None:
+        """Start preparing the next turn in the background, if speculative mode is on."""
+        if not self.speculative:
+            return
+        if self._speculation is not None:
+            self._speculation.cancel()
+        self._speculation = _submit_speculation(self._prepare_speculation, dict(self.slot_state))
+        if self._speculation is None:
+            self.metrics.inc("speculation_total", outcome="skipped")
+
+    def _begin_turn(self, next_slot: str) -> None:
+        """
+        Start a turn: set its LLM deadline and pick up the prepared speculation, if it still applies.
+
+        Args:
+            next_slot: Slot the turn collects
+        """
+        self._turn_deadline = time.monotonic() + self.turn_budget
+        self._turn_speculation = None
+        self._turn_intent_source = None
+        future, self._speculation = self._speculation, None
+        if future is None:
+            return
+        if not future.done() or future.cancelled() or future.exception() is not None:
+            # Never wait for a speculation; the turn is no slower than without one
+            future.cancel()
+            self.metrics.inc("speculation_total", outcome="pending")
+        elif future.result().key != speculation_key(self.slot_state, next_slot):
+            self.metrics.inc("speculation_total", outcome="stale")
+        else:
+            self._turn_speculation = future.result()
+
+    def _end_turn(self) -> None:
+        """Clear the turn's deadline and speculation."""
+        self._turn_deadline = None
+        self._turn_speculation = None
+
+    def _record_turn(self, message: str, response: str) -> Dict[str, Any]:
+        """
+        Store a finished turn in the conversation history and vector store.
+
+        Args:
+            message: User's message
+            response: Assistant response
+
+        Returns:
+            Conversation entry for the turn
+        """
+        conversation_entry = self._append_history(message, response)
+        self._speculate()
+        self._store_turn(conversation_entry, len(self.conversation_history) - 1)
+        return conversation_entry
+
+    def _append_history(self, message: str, response: str) -> Dict[str, Any]:
+        """
+        Add a finished turn to the conversation history.
+
+        The turn that fills the intent slot records what labelled it in
+        "intent_source" ("llm", "local" or "extractor"), so only LLM labels are
+        used to retrain the local classifier (see harvest_examples).
+
+        Args:
+            message: User's message
+            response: Assistant response
+
+        Returns:
+            Conversation entry for the turn
+        """
         conversation_entry = {
             "timestamp": datetime.now(),
             "user_message": message,
             "assistant_response": response,
             "slots": self.slot_state.copy()
         }
+        previous = self.conversation_history[-1]["slots"] if self.conversation_history else {}
+        if self.slot_state["intent"] is not None and previous.get("intent") is None:
+            conversation_entry["intent_source"] = self._turn_intent_source or "llm"
         self.conversation_history.append(conversation_entry)
-        
-        # Store in vector store if available
+        return conversation_entry
+
+    def _store_turn(self, conversation_entry: Dict[str, Any], turn: int) -> None:
+        """
+        Write a turn to the vector store, if one is configured.
+
+        Args:
+            conversation_entry: Entry returned by _record_turn
+            turn: Index of the entry in the conversation history
+        """
         if self.vector_store:
-            self.vector_store.add_documents(
-                documents=[message, response],
-                metadatas=[
-                    {"type": "user", "slot_state": self.slot_state},
-                    {"type": "assistant", "slot_state": self.slot_state}
-                ]
-            )
+            slot_state = conversation_entry["slots"]
+            with self.metrics.timer("vector_store_write"):
+                self.vector_store.add_documents(
+                    documents=[conversation_entry["user_message"], conversation_entry["assistant_response"]],
+                    metadatas=[
+                        {"type": "user", "session_id": self.session_id, "turn": turn, "slot_state": slot_state},
+                        {"type": "assistant", "session_id": self.session_id, "turn": turn, "slot_state": slot_state}
+                    ],
+                    # Unique per session, turn and role, so turns never overwrite each other
+                    ids=[f"{self.session_id}:{turn}:user", f"{self.session_id}:{turn}:assistant"],
+                )
+
+    def search_memory(self, query_text: str, n_results: int = 5, where: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Search this session's stored turns in the vector store.
+
+        Args:
+            query_text: Query text
+            n_results: Number of results to return
+            where: Optional extra metadata filter (e.g. {"type": "user"})
+
+        Returns:
+            Chroma-shaped results from this session only, or None if there is no
+            vector store or the query fails
+        """
+        if not self.vector_store:
+            return None
+        return self.vector_store.query(query_text, n_results, where=where, session_id=self.session_id)
+
+    def process_message(self, message: str) -> Dict[str, Any]:
+        """
+        Process a user message and generate a response.
         
-        return conversation_entry
+        Args:
+            message: User's message
+            
+        Returns:
+            Dictionary containing the response and metadata
+        """
+        with self.metrics.timer("turn", mode="blocking"):
+            return self._process_message(message)
+
+    def _process_message(self, message: str) -> Dict[str, Any]:
+        next_slot = _get_next_slot(self.slot_state)
+        self._begin_turn(next_slot)
+
+        try:
+            if next_slot is None:
+                response = self._summary_response()
+            else:
+                response = self._local_slot_response(message, next_slot)
+                if response is None:
+                    response = self._batched_slot_response(message, next_slot)
+                if response is None:
+                    response_raw = self._complete(
+                        messages=self._slot_messages(message, next_slot),
+                        temperature=0.7,
+                        max_tokens=300,
+                    ).strip()
+                    response = self._apply_slot_response(response_raw)
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            response = self._fallback_response(next_slot)
+        finally:
+            self._end_turn()
+
+        return self._record_turn(message, response)
+
+    def _stream_complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cacheable: Optional[bool] = None,
+        **params,
+    ) -> Iterator[str]:
+        """
+        Streaming counterpart of _complete: yields completion text as it arrives.
+
+        Cached completions are yielded in one piece; fresh ones are cached once complete.
+
+        Args:
+            messages: Chat messages
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            cacheable: Force caching on or off (defaults to the cache's temperature rule)
+            **params: Other request parameters (e.g. top_p)
+
+        Yields:
+            Pieces of the completion text
+        """
+        lookup_start = time.perf_counter()
+        request = dict(model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens, **params)
+        key, cached = self._cache_lookup(request, cacheable)
+        if cached is not None:
+            self._record_llm_call(time.perf_counter() - lookup_start, cache_hit=True)
+            yield cached
+            return
+
+        timeout, ticket = self.llm_caller.before_call(self._turn_deadline)
+        start = time.monotonic()
+        failed = False
+        pieces = []
+        usage = None
+        try:
+            for chunk in self.client.chat.completions.create(
+                **request, stream=True, stream_options={"include_usage": True}, timeout=timeout
+            ):
+                if time.monotonic() - start > timeout:
+                    raise DeadlineExceeded(f"LLM stream did not finish within {timeout:.1f}s")
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    pieces.append(content)
+                    yield content
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # A consumer closing the stream early is not a provider failure
+            self.llm_caller.record(not failed, time.monotonic() - start, ticket)
+        self._record_llm_call(time.monotonic() - start, usage=usage)
+        if key is not None:
+            self.completion_cache.set(key, "".join(pieces))
+
+    def process_message_stream(self, message: str) -> Generator[str, None, Dict[str, Any]]:
+        """
+        Process a user message, yielding the response text as it is generated.
+
+        The SLOT_VALUES block at the end of the completion is never yielded. Postcode
+        validation can replace the whole reply once the completion is done, so callers
+        should render the returned entry's assistant_response when the generator finishes.
+
+        Args:
+            message: User's message
+
+        Yields:
+            Pieces of the assistant response
+
+        Returns:
+            Dictionary containing the response and metadata (as process_message)
+        """
+        with self.metrics.timer("turn", mode="stream"):
+            return (yield from self._process_message_stream(message))
+
+    def _process_message_stream(self, message: str) -> Generator[str, None, Dict[str, Any]]:
+        next_slot = _get_next_slot(self.slot_state)
+        self._begin_turn(next_slot)
+
+        try:
+            if next_slot is None:
+                response = self._summary_response()
+                yield response
+            elif (response := self._local_slot_response(message, next_slot)) is not None:
+                yield response
+            elif (response := self._batched_slot_response(message, next_slot)) is not None:
+                yield response
+            else:
+                pieces = []
+                visible = SlotBlockFilter()
+                for piece in self._stream_complete(
+                    messages=self._slot_messages(message, next_slot),
+                    temperature=0.7,
+                    max_tokens=300,
+                ):
+                    pieces.append(piece)
+                    text = visible.feed(piece)
+                    if text:
+                        yield text
+                text = visible.flush()
+                if text:
+                    yield text
+                response = self._apply_slot_response("".join(pieces).strip())
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            response = self._fallback_response(next_slot)
+            yield response
+        finally:
+            self._end_turn()
+
+        return self._record_turn(message, response)
 
 
 def _get_next_slot(state: Dict[str, Any]) -> Optional[str]:
@@ -255,8 +1052,8 @@ def extract_slot_block(text: str) -> (str, Dict[str, Any]):
     """
     Extracts assistant message and slot values between SLOT_VALUES_START and SLOT_VALUES_END.
     """
-    start_tag = "SLOT_VALUES_START"
-    end_tag = "SLOT_VALUES_END"
+    start_tag = SLOT_START_TAG
+    end_tag = SLOT_END_TAG
 
     start = text.find(start_tag)
     end = text.find(end_tag)
@@ -272,3 +1069,53 @@ def extract_slot_block(text: str) -> (str, Dict[str, Any]):
         return response_text, slots
     except json.JSONDecodeError:
         return response_text, {}
+
+
+class SlotBlockFilter:
+    """
+    Incrementally strips the SLOT_VALUES block from streamed completion text.
+
+    Text is passed through until SLOT_VALUES_START appears; everything from the
+    tag on is held back. A trailing partial tag (e.g. "SLOT_VAL") is buffered
+    until the next chunk shows whether it really is the tag.
+    """
+
+    def __init__(self, tag: str = SLOT_START_TAG):
+        self.tag = tag
+        self._buffer = ""
+        self._done = False
+
+    def feed(self, text: str) -> str:
+        """
+        Add streamed text.
+
+        Args:
+            text: Next piece of the completion
+
+        Returns:
+            Text that is safe to display now (possibly empty)
+        """
+        if self._done:
+            return ""
+        self._buffer += text
+        index = self._buffer.find(self.tag)
+        if index != -1:
+            self._done = True
+            visible, self._buffer = self._buffer[:index], ""
+            return visible
+        keep = next(
+            (k for k in range(min(len(self.tag) - 1, len(self._buffer)), 0, -1) if self.tag.startswith(self._buffer[-k:])),
+            0,
+        )
+        visible, self._buffer = self._buffer[:len(self._buffer) - keep], self._buffer[len(self._buffer) - keep:]
+        return visible
+
+    def flush(self) -> str:
+        """
+        Release any buffered text at the end of the stream.
+
+        Returns:
+            Remaining displayable text
+        """
+        visible, self._buffer = ("" if self._done else self._buffer), ""
+        return visible
@@ -0,0 +1,3 @@
+"""
+LLM client helpers for the Real Estate Chatbot.
+"""
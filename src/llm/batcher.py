@@ -0,0 +1,350 @@
+"""
+Micro-batching for short LLM classification calls.
+
+At peak, many sessions ask for an intent label within a few milliseconds of
+each other, and each request is a full round trip that counts against the
+provider's rate limit. ``IntentBatcher`` (threads) and ``AsyncIntentBatcher``
+(asyncio) hold each request for at most ``max_wait`` seconds, pack up to
+``max_batch_size`` messages into one structured request that returns a label
+per message, and hand each caller its own label.
+
+A batch is sent as soon as it is full or its oldest request has waited
+``max_wait``; several batches can be in flight at once. The batch runs under
+the earliest deadline of the requests in it.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.llm.resilience import DeadlineExceeded, ResilientCaller, get_shared_resilient_caller
+from src.prompts.templates import INTENT_BATCH_TEMPLATE
+from src.utils.intent_classifier import INTENT_LABELS
+from src.utils.metrics import MetricsRegistry, get_metrics
+
+DEFAULT_MODEL = "openai/gpt-4o"
+
+# Queued by IntentBatcher.close to stop the collector thread
+_CLOSE = object()
+
+
+def batch_messages(messages: Sequence[str]) -> List[Dict[str, str]]:
+    """
+    Build the batched classification prompt.
+
+    Args:
+        messages: User messages, one per caller
+
+    Returns:
+        Chat messages
+    """
+    # JSON-quote each message so one user's text can't break out of its slot
+    numbered = "\n".join(f"{i}. {json.dumps(m, ensure_ascii=False)}" for i, m in enumerate(messages, 1))
+    return [
+        {"role": "system", "content": INTENT_BATCH_TEMPLATE.strip()},
+        {"role": "user", "content": numbered},
+    ]
+
+
+def parse_batch_labels(text: str, count: int) -> List[str]:
+    """
+    Read the per-message labels from a batched completion.
+
+    Args:
+        text: Completion text (a JSON object of message number to label)
+        count: Number of messages in the batch
+
+    Returns:
+        One label per message; missing or unknown labels become GENERAL_QUERY
+    """
+    labels: Dict[str, Any] = {}
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            labels = json.loads(text[start:end + 1])
+        except json.JSONDecodeError as e:
+            print(f"Error parsing batched intents: {e}")
+    result = []
+    for i in range(1, count + 1):
+        label = str(labels.get(str(i), "")).strip().upper()
+        result.append(label if label in INTENT_LABELS else "GENERAL_QUERY")
+    return result
+
+
+class _BatcherBase:
+    def __init__(
+        self,
+        client: Any,
+        model: str = DEFAULT_MODEL,
+        llm_caller: Optional[ResilientCaller] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+    ):
+        self.client = client
+        self.model = model
+        self.llm_caller = llm_caller or get_shared_resilient_caller()
+        self.metrics = metrics or get_metrics()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._counters = {"requests": 0, "batches": 0}
+        self._counter_lock = threading.Lock()
+
+    def _request(self, messages: Sequence[str]) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": batch_messages(messages),
+            "temperature": 0,
+            # A label plus JSON punctuation is under 10 tokens
+            "max_tokens": 10 * len(messages) + 10,
+        }
+
+    def _record_batch(self, size: int, seconds: float, usage: Optional[Any]) -> None:
+        with self._counter_lock:
+            self._counters["batches"] += 1
+            self._counters["requests"] += size
+        self.metrics.observe("stage_seconds", seconds, stage="llm", model=self.model, cache="batched")
+        self.metrics.observe("intent_batch_size", size)
+        self.metrics.inc("llm_calls_total", model=self.model, cache="batched")
+        event = {"stage": "llm", "seconds": seconds, "model": self.model, "cache": "batched", "batch_size": size}
+        if usage is not None:
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            self.metrics.inc("llm_tokens_total", prompt_tokens, model=self.model, kind="prompt")
+            self.metrics.inc("llm_tokens_total", completion_tokens, model=self.model, kind="completion")
+            event.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        self.metrics.emit(event)
+
+    @staticmethod
+    def _batch_deadline(deadlines: Sequence[Optional[float]]) -> Optional[float]:
+        known = [d for d in deadlines if d is not None]
+        return min(known) if known else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batching counters.
+
+        Returns:
+            Dictionary with requests, batches and the mean batch size
+        """
+        with self._counter_lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        stats["mean_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else None
+        return stats
+
+
+class IntentBatcher(_BatcherBase):
+    """Batches intent LLM calls from many threads into shared requests."""
+
+    def __init__(
+        self,
+        client: Any,
+        model: str = DEFAULT_MODEL,
+        llm_caller: Optional[ResilientCaller] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+        max_in_flight: int = 8,
+    ):
+        """
+        Start the batcher's collector thread.
+
+        Args:
+            client: OpenAI-compatible client (e.g. from ClientPool.openai_client)
+            model: Model used for batched requests
+            llm_caller: Optional deadline/hedging/circuit-breaker policy (defaults to the process-wide one)
+            metrics: Optional metrics registry (defaults to the process-wide one)
+            max_batch_size: Most messages sent in one request
+            max_wait: Seconds the oldest waiting message is held before its batch is sent
+            max_in_flight: Batches that may be waiting on the LLM at once
+        """
+        super().__init__(client, model, llm_caller, metrics, max_batch_size, max_wait)
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="intent-batch")
+        self._thread = threading.Thread(target=self._collect, name="intent-batcher", daemon=True)
+        self._thread.start()
+
+    def classify(self, message: str, deadline: Optional[float] = None) -> str:
+        """
+        Get the intent label for a message, sharing an LLM request with concurrent callers.
+
+        Args:
+            message: User's message
+            deadline: time.monotonic() by which the label is needed (None for no limit)
+
+        Returns:
+            Intent label (BUY_HOME, SELL_HOME, GENERAL_QUERY or INVALID)
+
+        Raises:
+            DeadlineExceeded: If the label doesn't arrive before the deadline
+            RuntimeError: If the batcher is closed
+        """
+        if self._closed:
+            raise RuntimeError("IntentBatcher is closed")
+        future: Future = Future()
+        self._queue.put((message, deadline, future))
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise DeadlineExceeded("Batched intent request did not finish in time")
+
+    def close(self) -> None:
+        """Send the messages already queued, wait for every batch in flight and stop the threads."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        # Fail anything that raced in behind the stop marker instead of leaving it waiting
+        while True:
+            try:
+                _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(RuntimeError("IntentBatcher is closed"))
+
+    def _collect(self) -> None:
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is _CLOSE:
+                break
+            batch = [item]
+            flush_at = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List[Tuple[str, Optional[float], Future]]) -> None:
+        messages = [message for message, _, _ in batch]
+        request = self._request(messages)
+        start = time.perf_counter()
+        try:
+            completion = self.llm_caller.call(
+                lambda timeout: self.client.chat.completions.create(**request, timeout=timeout),
+                self._batch_deadline([deadline for _, deadline, _ in batch]),
+            )
+            labels = parse_batch_labels(completion.choices[0].message.content or "", len(batch))
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        self._record_batch(len(batch), time.perf_counter() - start, getattr(completion, "usage", None))
+        for (_, _, future), label in zip(batch, labels):
+            future.set_result(label)
+
+
+class AsyncIntentBatcher(_BatcherBase):
+    """Batches intent LLM calls from many coroutines into shared requests."""
+
+    def __init__(
+        self,
+        client: Any,
+        model: str = DEFAULT_MODEL,
+        llm_caller: Optional[ResilientCaller] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+    ):
+        """
+        Initialize the batcher. It works on the event loop of its first caller.
+
+        Args:
+            client: AsyncOpenAI-compatible client (e.g. from ClientPool.async_openai_client)
+            model: Model used for batched requests
+            llm_caller: Optional deadline/hedging/circuit-breaker policy (defaults to the process-wide one)
+            metrics: Optional metrics registry (defaults to the process-wide one)
+            max_batch_size: Most messages sent in one request
+            max_wait: Seconds the oldest waiting message is held before its batch is sent
+        """
+        super().__init__(client, model, llm_caller, metrics, max_batch_size, max_wait)
+        self._pending: List[Tuple[str, Optional[float], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def classify(self, message: str, deadline: Optional[float] = None) -> str:
+        """
+        Get the intent label for a message, sharing an LLM request with concurrent callers.
+
+        Args:
+            message: User's message
+            deadline: time.monotonic() by which the label is needed (None for no limit)
+
+        Returns:
+            Intent label (BUY_HOME, SELL_HOME, GENERAL_QUERY or INVALID)
+
+        Raises:
+            DeadlineExceeded: If the label doesn't arrive before the deadline
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, deadline, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            # shield: a caller timing out must not cancel the label for the rest of the batch
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Batched intent request did not finish in time")
+
+    async def close(self) -> None:
+        """Send the pending messages and wait for every batch in flight."""
+        while self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            # Keep a reference so the task isn't garbage-collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, Optional[float], asyncio.Future]]) -> None:
+        messages = [message for message, _, _ in batch]
+        request = self._request(messages)
+        start = time.perf_counter()
+        try:
+            completion = await self.llm_caller.acall(
+                lambda timeout: self.client.chat.completions.create(**request, timeout=timeout),
+                self._batch_deadline([deadline for _, deadline, _ in batch]),
+            )
+            labels = parse_batch_labels(completion.choices[0].message.content or "", len(batch))
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark it retrieved: callers that already timed out never will
+                    future.exception()
+            return
+        self._record_batch(len(batch), time.perf_counter() - start, getattr(completion, "usage", None))
+        for (_, _, future), label in zip(batch, labels):
+            if not future.done():
+                future.set_result(label)
@@ -0,0 +1,245 @@
+"""
+Exact-match cache for chat completions.
+
+Completions are keyed on a hash of the model, messages and sampling
+parameters. Lookups go to an in-memory LRU tier with a TTL first and then,
+when configured, to a SQLite tier that every worker process on the host can
+share. Only low-temperature requests are cached by default, since
+high-temperature replies are meant to vary.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Process-wide cache shared by every chatbot session (see get_shared_completion_cache)
+COMPLETION_CACHE_DB_ENV = "CHATBOT_COMPLETION_CACHE_DB"
+_shared_cache: Optional["CompletionCache"] = None
+_shared_cache_lock = threading.Lock()
+
+
+class CompletionCache:
+    """Two-tier (memory LRU + optional SQLite) completion cache with TTL."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600.0,
+        max_temperature: float = 0.3,
+        db_path: Optional[str] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of completions kept in memory
+            ttl: Seconds a cached completion stays valid (both tiers)
+            max_temperature: Requests at or below this temperature are cacheable by default
+            db_path: Optional SQLite file for the shared on-disk tier
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.db_path = db_path
+
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expired": 0}
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(
+        model: str, messages: List[Dict[str, Any]], temperature: float, max_tokens: int, **params
+    ) -> str:
+        """
+        Build the cache key for a completion request.
+
+        Args:
+            model: Model name
+            messages: Chat messages
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            **params: Any other request parameters that affect the output (e.g. top_p)
+
+        Returns:
+            Hex digest identifying the request
+        """
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens, **params},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """
+        Check whether requests at a temperature are cached by default.
+
+        Args:
+            temperature: Sampling temperature
+
+        Returns:
+            True if the temperature is at or below max_temperature
+        """
+        return temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a completion.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Cached completion text, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._counters["expired"] += 1
+
+        if self.db_path:
+            try:
+                row = self._connection().execute(
+                    "SELECT value, expires_at FROM completions WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Warning: Completion cache lookup failed: {e}")
+                row = None
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                return row[0]
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a completion in every tier.
+
+        Args:
+            key: Key from make_key
+            value: Completion text
+        """
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        with self._lock:
+            self._counters["sets"] += 1
+
+        if self.db_path:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: Completion cache write failed: {e}")
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def purge_expired(self) -> int:
+        """
+        Drop expired completions from both tiers.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for k in expired:
+                del self._entries[k]
+            removed = len(expired)
+
+        if self.db_path:
+            try:
+                conn = self._connection()
+                removed += conn.execute("DELETE FROM completions WHERE expires_at <= ?", (now,)).rowcount
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: Completion cache purge failed: {e}")
+        return removed
+
+    def clear(self) -> None:
+        """Remove every completion from both tiers and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+        if self.db_path:
+            conn = self._connection()
+            conn.execute("DELETE FROM completions")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters.
+
+        Returns:
+            Dictionary with hits, disk_hits, misses, sets, evictions, expired, size and hit_rate
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+def get_shared_completion_cache() -> CompletionCache:
+    """
+    Get the process-wide completion cache.
+
+    The SQLite tier is enabled when CHATBOT_COMPLETION_CACHE_DB names a file,
+    so every worker process on the host shares the completions cached there.
+
+    Returns:
+        Shared CompletionCache
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = CompletionCache(db_path=os.getenv(COMPLETION_CACHE_DB_ENV) or None)
+    return _shared_cache
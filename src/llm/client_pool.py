@@ -0,0 +1,285 @@
+"""
+Process-wide pooled HTTP client for the OpenRouter API.
+
+Creating an ``OpenAI`` client per chatbot session gives every session its own
+connection pool, so each new session pays a fresh TCP + TLS handshake and
+idle sockets pile up. ``ClientPool`` owns one keep-alive ``httpx`` client
+(and one async client) per process with explicit connection limits and
+timeouts; the ``OpenAI``/``AsyncOpenAI`` wrappers handed to each chatbot all
+share it.
+"""
+import importlib.util
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Process-wide pool shared by every chatbot session (see get_shared_client_pool)
+_shared_pool: Optional["ClientPool"] = None
+_shared_pool_lock = threading.Lock()
+
+
+def _pool_stats(transport: Optional[httpx.BaseTransport]) -> Dict[str, int]:
+    pool = getattr(transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for c in connections if c.is_idle())
+    return {
+        "connections": len(connections),
+        "idle": idle,
+        "active": len(connections) - idle,
+        # httpcore doesn't expose its request queue publicly
+        "queued": len(getattr(pool, "_requests", [])),
+    }
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        return super().handle_request(request)
+
+
+class _AsyncCountingTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        return await super().handle_async_request(request)
+
+
+class ClientPool:
+    """Shared keep-alive HTTP clients and the OpenAI clients built on them."""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        write_timeout: float = 10.0,
+        pool_timeout: float = 10.0,
+        http2: bool = False,
+        max_retries: int = 0,
+    ):
+        """
+        Configure the pool. Connections are opened lazily, on first use.
+
+        Args:
+            base_url: API base URL
+            max_connections: Maximum open connections
+            max_keepalive_connections: Maximum idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection is kept open
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for each chunk of the response
+            write_timeout: Seconds to send each chunk of the request
+            pool_timeout: Seconds to wait for a free connection when the pool is full
+            http2: Use HTTP/2 when the server supports it (needs the 'h2' package)
+            max_retries: Retries the OpenAI client makes on connection errors and 429/5xx. Keep
+                it at 0 for clients used through ResilientCaller: its deadline, hedging and
+                breaker can't see retries made inside the SDK
+        """
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("Warning: HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+
+        self.base_url = base_url
+        self.http2 = http2
+        self.max_retries = max_retries
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=write_timeout, pool=pool_timeout
+        )
+
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+        self._transport: Optional[_CountingTransport] = None
+        self._async_transport: Optional[_AsyncCountingTransport] = None
+        self._clients: Dict[str, OpenAI] = {}
+        self._async_clients: Dict[str, AsyncOpenAI] = {}
+
+    @classmethod
+    def from_env(cls) -> "ClientPool":
+        """
+        Configure a pool from LLM_* environment variables.
+
+        Reads LLM_BASE_URL, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS,
+        LLM_KEEPALIVE_EXPIRY, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_WRITE_TIMEOUT,
+        LLM_POOL_TIMEOUT, LLM_HTTP2 and LLM_MAX_RETRIES; unset variables keep their defaults.
+
+        Returns:
+            ClientPool
+        """
+        casts = {
+            "base_url": str,
+            "max_connections": int,
+            "max_keepalive_connections": int,
+            "keepalive_expiry": float,
+            "connect_timeout": float,
+            "read_timeout": float,
+            "write_timeout": float,
+            "pool_timeout": float,
+            "http2": lambda v: v.lower() in ("1", "true", "yes"),
+            "max_retries": int,
+        }
+        kwargs: Dict[str, Any] = {}
+        for name, cast in casts.items():
+            value = os.getenv(f"LLM_{name.upper()}")
+            if value:
+                kwargs[name] = cast(value)
+        return cls(**kwargs)
+
+    def http_client(self) -> httpx.Client:
+        """
+        Get the shared synchronous HTTP client.
+
+        Returns:
+            httpx.Client with the pool's limits and timeouts
+        """
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    self._transport = _CountingTransport(limits=self.limits, http2=self.http2)
+                    self._http_client = httpx.Client(
+                        transport=self._transport, timeout=self.timeout, follow_redirects=True
+                    )
+        return self._http_client
+
+    def async_http_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared async HTTP client.
+
+        Its connections belong to the event loop that opens them, so use it from
+        one loop per process (as uvicorn workers do).
+
+        Returns:
+            httpx.AsyncClient with the pool's limits and timeouts
+        """
+        if self._async_http_client is None:
+            with self._lock:
+                if self._async_http_client is None:
+                    self._async_transport = _AsyncCountingTransport(limits=self.limits, http2=self.http2)
+                    self._async_http_client = httpx.AsyncClient(
+                        transport=self._async_transport, timeout=self.timeout, follow_redirects=True
+                    )
+        return self._async_http_client
+
+    def openai_client(self, api_key: str) -> OpenAI:
+        """
+        Get an OpenAI client on the shared connection pool.
+
+        Args:
+            api_key: OpenAI API key
+
+        Returns:
+            OpenAI client (one per API key, reused across sessions)
+        """
+        client = self._clients.get(api_key)
+        if client is None:
+            http_client = self.http_client()
+            with self._lock:
+                client = self._clients.get(api_key)
+                if client is None:
+                    client = OpenAI(
+                        base_url=self.base_url,
+                        api_key=api_key,
+                        http_client=http_client,
+                        timeout=self.timeout,
+                        max_retries=self.max_retries,
+                    )
+                    self._clients[api_key] = client
+        return client
+
+    def async_openai_client(self, api_key: str) -> AsyncOpenAI:
+        """
+        Get an AsyncOpenAI client on the shared async connection pool.
+
+        Args:
+            api_key: OpenAI API key
+
+        Returns:
+            AsyncOpenAI client (one per API key, reused across sessions)
+        """
+        client = self._async_clients.get(api_key)
+        if client is None:
+            http_client = self.async_http_client()
+            with self._lock:
+                client = self._async_clients.get(api_key)
+                if client is None:
+                    client = AsyncOpenAI(
+                        base_url=self.base_url,
+                        api_key=api_key,
+                        http_client=http_client,
+                        timeout=self.timeout,
+                        max_retries=self.max_retries,
+                    )
+                    self._async_clients[api_key] = client
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get connection pool utilisation.
+
+        Returns:
+            Dictionary with 'sync' and 'async' sections (requests sent, open, idle and
+            active connections, queued requests) plus the configured limits
+        """
+        stats: Dict[str, Any] = {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "http2": self.http2,
+        }
+        for name, transport in (("sync", self._transport), ("async", self._async_transport)):
+            section = _pool_stats(transport)
+            section["requests"] = transport.requests if transport is not None else 0
+            stats[name] = section
+        return stats
+
+    def close(self) -> None:
+        """Close the synchronous client's connections (the async client is closed with aclose)."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._transport = None
+            self._clients.clear()
+
+    async def aclose(self) -> None:
+        """Close the async client's connections."""
+        client = self._async_http_client
+        with self._lock:
+            self._async_http_client = None
+            self._async_transport = None
+            self._async_clients.clear()
+        if client is not None:
+            await client.aclose()
+
+
+def get_shared_client_pool() -> ClientPool:
+    """
+    Get the process-wide client pool, configured from LLM_* environment variables.
+
+    Returns:
+        Shared ClientPool
+    """
+    global _shared_pool
+    if _shared_pool is None:
+        with _shared_pool_lock:
+            if _shared_pool is None:
+                _shared_pool = ClientPool.from_env()
+    return _shared_pool
@@ -0,0 +1,499 @@
+"""
+Deadline-aware LLM calls with hedging and a circuit breaker.
+
+``ResilientCaller`` wraps every completion request:
+
+* each call gets the time left in the turn's latency budget as its timeout
+  and fails with ``DeadlineExceeded`` once the budget is spent;
+* when a call is still running after the provider's recent p95 latency, a
+  duplicate (hedged) request is sent and whichever answers first wins, which
+  cuts the tail latency caused by a single slow upstream replica;
+* a ``CircuitBreaker`` opens when too many recent calls fail or are slow, so
+  callers fail fast (``CircuitOpenError``) and can fall back to templated
+  replies until a probe request succeeds again.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+# Process-wide caller shared by every chatbot session (see get_shared_resilient_caller)
+_shared_caller: Optional["ResilientCaller"] = None
+_shared_caller_lock = threading.Lock()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the LLM while the circuit breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not finish within its latency budget."""
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Latency quantile over the window.
+
+        Args:
+            q: Quantile between 0 and 1 (e.g. 0.95)
+
+        Returns:
+            Latency in seconds, or None if nothing has been recorded
+        """
+        with self._lock:
+            if not self._latencies:
+                return None
+            return float(np.quantile(np.fromiter(self._latencies, dtype=float), q))
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker over a rolling window of call outcomes.
+
+    The breaker opens when, over the last ``window`` calls (and at least
+    ``min_calls``), the share of failures reaches ``failure_rate`` or the share
+    of calls slower than ``slow_call_threshold`` reaches ``slow_call_rate``.
+    After ``cooldown`` seconds one probe call is let through; its outcome
+    closes the breaker again or re-opens it.
+
+    ``admit`` hands every admitted call a ticket naming the breaker generation
+    it was admitted in (the generation changes whenever the breaker opens or
+    closes) and whether it is the probe. Outcomes from calls admitted before
+    the latest transition are ignored, so a call that started before the
+    breaker opened can't close it mid-cooldown or re-open it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_threshold: float = 10.0,
+        slow_call_rate: float = 0.8,
+        cooldown: float = 30.0,
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            window: Number of recent calls considered
+            min_calls: Calls needed in the window before the breaker can open
+            failure_rate: Share of failed calls that opens the breaker
+            slow_call_threshold: Seconds after which a successful call counts as slow
+            slow_call_rate: Share of slow calls that opens the breaker
+            cooldown: Seconds the breaker stays open before letting a probe through
+        """
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_rate = slow_call_rate
+        self.cooldown = cooldown
+
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._generation = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self._state
+
+    def admit(self) -> Optional[Tuple[int, bool]]:
+        """
+        Check whether a call may go to the LLM now.
+
+        Returns:
+            Ticket to pass to record (the admission generation and whether the call is the
+            half-open probe), or None if the call is rejected
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return self._generation, False
+            if time.monotonic() - self._opened_at < self.cooldown or self._probe_in_flight:
+                return None
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            return self._generation, True
+
+    def release(self, ticket: Tuple[int, bool]) -> None:
+        """
+        Give back a ticket whose call never reached the LLM, so a probe slot isn't held forever.
+
+        Args:
+            ticket: Ticket from admit
+        """
+        generation, probe = ticket
+        with self._lock:
+            if probe and generation == self._generation:
+                self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go to the LLM now (see admit, which also returns the ticket).
+
+        Returns:
+            True if the breaker is closed, or if this call is the half-open probe
+        """
+        return self.admit() is not None
+
+    def record(self, ok: bool, latency: float = 0.0, ticket: Optional[Tuple[int, bool]] = None) -> None:
+        """
+        Record a call outcome.
+
+        Args:
+            ok: True if the call succeeded
+            latency: Call duration in seconds
+            ticket: Ticket from admit; outcomes without one only count while the breaker is closed
+        """
+        slow = ok and latency > self.slow_call_threshold
+        generation, probe = ticket if ticket is not None else (self._generation, False)
+        with self._lock:
+            if probe and generation == self._generation:
+                self._probe_in_flight = False
+                if ok and not slow:
+                    self._state = self.CLOSED
+                    self._generation += 1
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            if self._state != self.CLOSED or generation != self._generation:
+                # Admitted before the latest open/close, or not the probe: stale
+                return
+
+            self._outcomes.append((ok, slow))
+            n = len(self._outcomes)
+            if n < self.min_calls:
+                return
+            failures = sum(1 for ok_, _ in self._outcomes if not ok_)
+            slow_calls = sum(1 for _, slow_ in self._outcomes if slow_)
+            if failures / n >= self.failure_rate or slow_calls / n >= self.slow_call_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trips += 1
+
+
+class _Attempt:
+    """When one submitted attempt started running."""
+
+    def __init__(self):
+        self.running = threading.Event()
+        self.started = 0.0
+
+    def begin(self) -> None:
+        self.started = time.monotonic()
+        self.running.set()
+
+
+class ResilientCaller:
+    """Runs LLM calls under a deadline, with hedged requests and a circuit breaker."""
+
+    def __init__(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        default_timeout: float = 30.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_min_delay: float = 0.5,
+        max_workers: int = 32,
+    ):
+        """
+        Initialize the caller.
+
+        Args:
+            breaker: Optional circuit breaker (defaults to a new CircuitBreaker)
+            default_timeout: Timeout for calls made without a deadline
+            hedge: Send a duplicate request when a call outlives the latency quantile
+            hedge_quantile: Latency quantile after which to hedge (e.g. 0.95)
+            hedge_min_samples: Successful calls needed before hedging starts
+            hedge_min_delay: Never hedge sooner than this many seconds
+            max_workers: Threads available to synchronous calls
+        """
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.default_timeout = default_timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._lock = threading.Lock()
+        # Attempts submitted to the executor and not finished yet (running or waiting for a worker)
+        self._in_flight = 0
+        self._counters = {
+            "calls": 0, "hedged": 0, "hedge_wins": 0, "hedges_skipped": 0,
+            "timeouts": 0, "failures": 0, "rejected": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Seconds after which a running call is hedged.
+
+        Returns:
+            Delay in seconds, or None while hedging is off or there are too few samples
+        """
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.quantile(self.hedge_quantile))
+
+    def before_call(self, deadline: Optional[float] = None) -> Tuple[float, Tuple[int, bool]]:
+        """
+        Admit a call and work out its timeout.
+
+        Args:
+            deadline: time.monotonic() by which the call must finish (None for default_timeout)
+
+        Returns:
+            Tuple of (seconds the call may take, breaker ticket to pass to record)
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            DeadlineExceeded: If the deadline has already passed
+        """
+        if deadline is not None and deadline <= time.monotonic():
+            self._count("timeouts")
+            raise DeadlineExceeded("Turn latency budget exhausted")
+        ticket = self.breaker.admit()
+        if ticket is None:
+            self._count("rejected")
+            raise CircuitOpenError("LLM circuit breaker is open")
+        self._count("calls")
+        if deadline is None:
+            return self.default_timeout, ticket
+        return deadline - time.monotonic(), ticket
+
+    def record(self, ok: bool, latency: float, ticket: Optional[Tuple[int, bool]] = None) -> None:
+        """
+        Record the outcome of a call admitted with before_call.
+
+        Args:
+            ok: True if the call succeeded
+            latency: Call duration in seconds
+            ticket: Breaker ticket returned by before_call
+        """
+        if ok:
+            self.latency.record(latency)
+        else:
+            self._count("failures")
+        self.breaker.record(ok, latency, ticket)
+
+    def _submit(self, fn: Callable[[float], T], deadline: float) -> Tuple[Future, "_Attempt"]:
+        attempt = _Attempt()
+        with self._lock:
+            self._in_flight += 1
+
+        def run() -> T:
+            attempt.begin()
+            try:
+                # The attempt gets whatever budget is left once a worker picks it up
+                return fn(max(0.0, deadline - attempt.started))
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        future = self._executor.submit(run)
+        future.add_done_callback(lambda f: f.cancelled() and self._cancelled())
+        return future, attempt
+
+    def _cancelled(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _worker_free(self) -> bool:
+        with self._lock:
+            return self._in_flight < self.max_workers
+
+    def call(self, fn: Callable[[float], T], deadline: Optional[float] = None) -> T:
+        """
+        Run a blocking call under the deadline, hedging it if it runs long.
+
+        Latency (for the breaker, the hedge timer and the latency history) is measured
+        from when an attempt starts running, not from when it was queued for a worker,
+        and no hedge is sent while every worker is busy.
+
+        Args:
+            fn: Function taking the remaining timeout in seconds
+            deadline: time.monotonic() by which the call must finish (None for default_timeout)
+
+        Returns:
+            Result of the first attempt to succeed
+
+        Raises:
+            DeadlineExceeded: If no attempt finishes (or starts) before the deadline
+        """
+        timeout, ticket = self.before_call(deadline)
+        deadline = time.monotonic() + timeout
+
+        first, first_attempt = self._submit(fn, deadline)
+        if not first_attempt.running.wait(max(0.0, deadline - time.monotonic())) and first.cancel():
+            # Never got a worker: the provider wasn't involved, so the breaker doesn't hear of it
+            self._count("timeouts")
+            self.breaker.release(ticket)
+            raise DeadlineExceeded(f"LLM call did not get a worker within {timeout:.1f}s")
+        first_attempt.running.wait()
+        start = first_attempt.started
+        hedge_delay = self.hedge_delay()
+        hedge_at = start + hedge_delay if hedge_delay is not None and start + hedge_delay < deadline else None
+
+        pending: List[Future] = [first]
+        attempts = {first: first_attempt}
+        hedged = False
+        error: Optional[BaseException] = None
+        while pending:
+            wake = hedge_at if hedge_at is not None and not hedged else deadline
+            done, _ = wait(pending, timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                if future.exception() is None:
+                    self.record(True, time.monotonic() - attempts[future].started, ticket)
+                    if future is not first:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+            if not pending and error is not None:
+                break
+            now = time.monotonic()
+            if now >= deadline:
+                for future in pending:
+                    future.cancel()
+                self._count("timeouts")
+                self.record(False, now - start, ticket)
+                raise DeadlineExceeded(f"LLM call did not finish within {timeout:.1f}s")
+            if hedge_at is not None and not hedged and now >= hedge_at and pending:
+                hedged = True
+                if self._worker_free():
+                    future, attempt = self._submit(fn, deadline)
+                    pending.append(future)
+                    attempts[future] = attempt
+                    self._count("hedged")
+                else:
+                    # A queued hedge would only add to the backlog slowing every call down
+                    self._count("hedges_skipped")
+        self.record(False, time.monotonic() - start, ticket)
+        raise error
+
+    async def acall(self, fn: Callable[[float], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        """
+        Async counterpart of call: losing attempts are cancelled.
+
+        Args:
+            fn: Coroutine function taking the remaining timeout in seconds
+            deadline: time.monotonic() by which the call must finish (None for default_timeout)
+
+        Returns:
+            Result of the first attempt to succeed
+        """
+        timeout, ticket = self.before_call(deadline)
+        start = time.monotonic()
+        deadline = start + timeout
+        hedge_delay = self.hedge_delay()
+        hedge_at = start + hedge_delay if hedge_delay is not None and hedge_delay < timeout else None
+
+        first = asyncio.ensure_future(fn(timeout))
+        pending = {first}
+        hedged = False
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                wake = hedge_at if hedge_at is not None and not hedged else deadline
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, wake - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self.record(True, time.monotonic() - start, ticket)
+                        if task is not first:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+                if not pending and error is not None:
+                    break
+                now = time.monotonic()
+                if now >= deadline:
+                    self._count("timeouts")
+                    self.record(False, now - start, ticket)
+                    raise DeadlineExceeded(f"LLM call did not finish within {timeout:.1f}s")
+                if hedge_at is not None and not hedged and now >= hedge_at and pending:
+                    pending.add(asyncio.ensure_future(fn(deadline - now)))
+                    hedged = True
+                    self._count("hedged")
+        finally:
+            for task in pending:
+                task.cancel()
+        self.record(False, time.monotonic() - start, ticket)
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get call counters and latency quantiles.
+
+        Returns:
+            Dictionary with calls, hedged, hedge_wins, hedges_skipped, timeouts, failures,
+            rejected, in_flight (sync attempts running or queued), breaker state and trips,
+            p50 and p95 latency
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["in_flight"] = self._in_flight
+        stats["breaker_state"] = self.breaker.state
+        stats["breaker_trips"] = self.breaker.trips
+        stats["p50"] = self.latency.quantile(0.5)
+        stats["p95"] = self.latency.quantile(0.95)
+        return stats
+
+
+def get_shared_resilient_caller() -> ResilientCaller:
+    """
+    Get the process-wide ResilientCaller, so every session shares one breaker and latency history.
+
+    Returns:
+        Shared ResilientCaller
+    """
+    global _shared_caller
+    if _shared_caller is None:
+        with _shared_caller_lock:
+            if _shared_caller is None:
+                _shared_caller = ResilientCaller()
+    return _shared_caller
@@ -0,0 +1,3 @@
+"""
+Offline load testing for the Real Estate Chatbot (stub LLM server and load-test harness).
+"""
@@ -0,0 +1,458 @@
+"""
+End-to-end load test for RealEstateChatbot against the offline stub server.
+
+Replays scripted multi-turn conversations (buy and sell paths, uncovered and
+mistyped postcodes, NEW-build budgets under £1M, wordy answers that need the
+LLM) at a configurable concurrency, then reports turns/sec, turn latency
+percentiles, per-stage latencies from the metrics registry and memory per
+session. Every run uses its own connection pool, resilience policy, cache and
+metrics, so the process-wide singletons are left untouched.
+
+Example:
+    python -m src.loadtest.load_test --sessions 200 --concurrency 20 --latency lognormal:0.4:0.5
+    python -m src.loadtest.load_test --mode async --sessions 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.async_chatbot import AsyncRealEstateChatbot
+from src.chatbot import RealEstateChatbot
+from src.llm.cache import CompletionCache
+from src.llm.client_pool import ClientPool
+from src.llm.resilience import CircuitBreaker, ResilientCaller
+from src.loadtest.stub_server import LatencyModel, StubServer, create_stub_app
+from src.prompts.templates import LLM_FALLBACK_TEMPLATE
+from src.utils.metrics import MetricsRegistry
+
+STAGES = ("turn", "llm", "postcode_validation", "slot_extraction", "vector_store_write")
+_FALLBACK_PREFIX = LLM_FALLBACK_TEMPLATE.split("{")[0]
+
+
+class Scenario(NamedTuple):
+    """A scripted conversation and a phrase its last response must contain."""
+
+    messages: List[str]
+    expect: str
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "buy_new_ok": Scenario(
+        ["buy", "new", "Jane Smith", "07123 456789", "jane@example.com", "£1.5M", "SW1A 1AA", "no thanks"],
+        "Thank",
+    ),
+    "buy_new_under_1m": Scenario(
+        ["I'd like to buy", "new", "Tom Jones", "07123 456780", "tom@example.com", "750k"],
+        "under 1 million",
+    ),
+    "sell_ok": Scenario(
+        ["sell", "Priya Patel", "07987 654321", "priya@example.com", "£800k", "SW1A 1AA"],
+        "service area",
+    ),
+    "buy_uncovered_postcode": Scenario(
+        ["buy", "resale", "Sam Lee", "07111 222333", "sam@example.com", "2 million", "E1 1AA"],
+        "don't cater",
+    ),
+    "buy_typo_postcode": Scenario(
+        ["buy", "resale", "Ana Cruz", "07111 222334", "ana@example.com", "£2,000,000", "SW1A 1AB"],
+        "SW1A 1AA",
+    ),
+    "sell_invalid_postcode": Scenario(
+        ["sell", "Lee Wong", "07222 333444", "lee@example.com", "950,000", "XX1 1XX"],
+        "don't cater",
+    ),
+    # Wordy answers the local extractors refuse, so every turn goes to the LLM
+    "buy_wordy": Scenario(
+        [
+            "Hi there, we have been thinking about it for ages and we would really like to buy a place",
+            "ideally something brand new please, we don't want an old house",
+            "oh and my name is Olivia Brown",
+            "you can reach me any time on 07123 999888 during the day",
+            "my email address is olivia.brown@example.com if that helps",
+            "we are hoping to spend roughly £1.2M in total on it",
+            "we'd like to live around SW1A 1AA if at all possible",
+        ],
+        "24 hours",
+    ),
+}
+
+
+class SessionResult(NamedTuple):
+    scenario: str
+    latencies: List[float]
+    fallbacks: int
+    passed: bool
+    error: Optional[str]
+
+
+def _check(scenario: Scenario, name: str, responses: List[str], latencies: List[float]) -> SessionResult:
+    fallbacks = sum(1 for r in responses if r.startswith(_FALLBACK_PREFIX))
+    passed = bool(responses) and scenario.expect.lower() in responses[-1].lower()
+    return SessionResult(name, latencies, fallbacks, passed, None)
+
+
+def _schedule(sessions: int, names: List[str]) -> List[str]:
+    return [names[i % len(names)] for i in range(sessions)]
+
+
+class LoadTestContext:
+    """Per-run dependencies shared by every simulated session."""
+
+    def __init__(
+        self,
+        base_url: str,
+        turn_budget: float = 20.0,
+        hedge: bool = True,
+        speculative: bool = False,
+        think_time: float = 0.0,
+    ):
+        """
+        Build the run's pool, resilience policy, cache and metrics.
+
+        Args:
+            base_url: OpenAI-compatible API base URL
+            turn_budget: Seconds a turn may spend on LLM calls
+            hedge: Hedge slow LLM calls
+            speculative: Run chatbots in speculative mode
+            think_time: Seconds each simulated user waits before replying
+        """
+        self.pool = ClientPool(base_url=base_url, max_retries=0)
+        self.caller = ResilientCaller(breaker=CircuitBreaker(), hedge=hedge)
+        self.cache = CompletionCache()
+        self.metrics = MetricsRegistry()
+        self.turn_budget = turn_budget
+        self.speculative = speculative
+        self.think_time = think_time
+
+    def chatbot(self, cls=RealEstateChatbot) -> RealEstateChatbot:
+        return cls(
+            api_key="loadtest",
+            client_pool=self.pool,
+            llm_caller=self.caller,
+            completion_cache=self.cache,
+            turn_budget=self.turn_budget,
+            metrics=self.metrics,
+            speculative=self.speculative,
+        )
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def run_session_sync(context: LoadTestContext, name: str) -> SessionResult:
+    """
+    Replay one scenario on a fresh RealEstateChatbot.
+
+    Args:
+        context: Run context
+        name: Scenario name
+
+    Returns:
+        SessionResult
+    """
+    scenario = SCENARIOS[name]
+    latencies: List[float] = []
+    responses: List[str] = []
+    try:
+        chatbot = context.chatbot()
+        for i, message in enumerate(scenario.messages):
+            if i and context.think_time:
+                time.sleep(context.think_time)
+            start = time.perf_counter()
+            responses.append(chatbot.process_message(message)["assistant_response"])
+            latencies.append(time.perf_counter() - start)
+    except Exception as e:
+        return SessionResult(name, latencies, 0, False, str(e))
+    return _check(scenario, name, responses, latencies)
+
+
+async def run_session_async(context: LoadTestContext, name: str) -> SessionResult:
+    """
+    Replay one scenario on a fresh AsyncRealEstateChatbot.
+
+    Args:
+        context: Run context
+        name: Scenario name
+
+    Returns:
+        SessionResult
+    """
+    scenario = SCENARIOS[name]
+    latencies: List[float] = []
+    responses: List[str] = []
+    try:
+        chatbot = context.chatbot(AsyncRealEstateChatbot)
+        for i, message in enumerate(scenario.messages):
+            if i and context.think_time:
+                await asyncio.sleep(context.think_time)
+            start = time.perf_counter()
+            responses.append((await chatbot.process_message(message))["assistant_response"])
+            latencies.append(time.perf_counter() - start)
+    except Exception as e:
+        return SessionResult(name, latencies, 0, False, str(e))
+    return _check(scenario, name, responses, latencies)
+
+
+def run_sync(context: LoadTestContext, names: List[str], concurrency: int) -> Tuple[List[SessionResult], float]:
+    """
+    Run sessions on a thread pool.
+
+    Args:
+        context: Run context
+        names: Scenario name for each session
+        concurrency: Sessions in flight at once
+
+    Returns:
+        Session results and wall time in seconds
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda name: run_session_sync(context, name), names))
+    return results, time.perf_counter() - start
+
+
+def run_async(context: LoadTestContext, names: List[str], concurrency: int) -> Tuple[List[SessionResult], float]:
+    """
+    Run sessions as asyncio tasks on one event loop.
+
+    Args:
+        context: Run context
+        names: Scenario name for each session
+        concurrency: Sessions in flight at once
+
+    Returns:
+        Session results and wall time in seconds
+    """
+    async def run() -> Tuple[List[SessionResult], float]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(name: str) -> SessionResult:
+            async with semaphore:
+                return await run_session_async(context, name)
+
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(bounded(name) for name in names))
+        finally:
+            await context.pool.aclose()
+        return list(results), time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def measure_session_memory(context: LoadTestContext, sessions: int) -> Dict[str, float]:
+    """
+    Measure memory retained per live chatbot session with tracemalloc.
+
+    Runs one warm-up session (to load shared indexes and clients), then keeps
+    ``sessions`` finished sessions alive and divides the growth by their number.
+
+    Args:
+        context: Run context
+        sessions: Sessions to hold in memory
+
+    Returns:
+        Dictionary with 'bytes_per_session' and 'peak_bytes_per_session'
+    """
+    names = _schedule(sessions, list(SCENARIOS))
+    context.chatbot()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        live = []
+        for name in names:
+            chatbot = context.chatbot()
+            for message in SCENARIOS[name].messages:
+                chatbot.process_message(message)
+            live.append(chatbot)
+        gc.collect()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "bytes_per_session": (after - before) / len(live),
+        "peak_bytes_per_session": (peak - before) / len(live),
+    }
+
+
+def build_report(
+    results: List[SessionResult], elapsed: float, metrics: MetricsRegistry, memory: Optional[Dict[str, float]]
+) -> Dict[str, Any]:
+    """
+    Summarize a run.
+
+    Args:
+        results: Session results
+        elapsed: Wall time of the run in seconds
+        metrics: The run's metrics registry
+        memory: Output of measure_session_memory, if it was run
+
+    Returns:
+        JSON-serializable report
+    """
+    latencies = np.array([latency for r in results for latency in r.latencies], dtype=float)
+    turns = len(latencies)
+    percentiles = (
+        {f"p{q}": float(v) for q, v in zip((50, 95, 99), np.percentile(latencies, (50, 95, 99)))}
+        if turns else {}
+    )
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    for series in metrics.summary()["histograms"]:
+        if series["name"] != "stage_seconds":
+            continue
+        stage = series["labels"].get("stage")
+        if stage not in STAGES:
+            continue
+        entry = stages.setdefault(stage, {"count": 0, "p50": None, "p95": None, "p99": None})
+        entry["count"] += series["count"]
+        # Keep the busiest series' percentiles when a stage is split by label (e.g. cache hit/miss)
+        if series["count"] >= entry.get("_largest", 0):
+            entry.update({"p50": series["p50"], "p95": series["p95"], "p99": series["p99"], "_largest": series["count"]})
+    for entry in stages.values():
+        entry.pop("_largest", None)
+
+    counters = metrics.summary()["counters"]
+    llm_calls = sum(s["value"] for s in counters if s["name"] == "llm_calls_total")
+    speculation = {
+        s["labels"]["outcome"]: int(s["value"]) for s in counters if s["name"] == "speculation_total"
+    }
+    by_scenario: Dict[str, Dict[str, int]] = {}
+    for r in results:
+        entry = by_scenario.setdefault(r.scenario, {"sessions": 0, "passed": 0})
+        entry["sessions"] += 1
+        entry["passed"] += int(r.passed)
+
+    return {
+        "sessions": len(results),
+        "turns": turns,
+        "elapsed_seconds": elapsed,
+        "turns_per_second": turns / elapsed if elapsed else 0.0,
+        "turn_latency": percentiles,
+        "llm_calls": int(llm_calls),
+        "llm_calls_per_turn": llm_calls / turns if turns else 0.0,
+        "fallback_responses": sum(r.fallbacks for r in results),
+        "failed_sessions": sum(1 for r in results if not r.passed),
+        "errors": [r.error for r in results if r.error][:5],
+        "stages": stages,
+        "scenarios": by_scenario,
+        "speculation": speculation,
+        "memory": memory,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Render a report as a readable table.
+
+    Args:
+        report: Output of build_report
+
+    Returns:
+        Multi-line text
+    """
+    ms = lambda v: f"{v * 1000:9.1f}" if v is not None else f"{'-':>9}"
+    lines = [
+        f"Sessions: {report['sessions']}   Turns: {report['turns']}   "
+        f"Elapsed: {report['elapsed_seconds']:.2f}s   Throughput: {report['turns_per_second']:.1f} turns/s",
+        f"LLM calls: {report['llm_calls']} ({report['llm_calls_per_turn']:.2f}/turn)   "
+        f"Fallbacks: {report['fallback_responses']}   Failed sessions: {report['failed_sessions']}",
+        "",
+        f"{'stage':<20} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}",
+    ]
+    latency = report["turn_latency"]
+    lines.append(f"{'turn (client)':<20} {report['turns']:>7} {ms(latency.get('p50'))} {ms(latency.get('p95'))} {ms(latency.get('p99'))}")
+    for stage in STAGES:
+        entry = report["stages"].get(stage)
+        if entry:
+            lines.append(f"{stage:<20} {entry['count']:>7} {ms(entry['p50'])} {ms(entry['p95'])} {ms(entry['p99'])}")
+    if report["speculation"]:
+        outcomes = ", ".join(f"{name} {count}" for name, count in sorted(report["speculation"].items()))
+        lines.append(f"{'speculation':<20} {outcomes}")
+    lines += ["", f"{'scenario':<24} {'passed':>12}"]
+    for name, entry in report["scenarios"].items():
+        lines.append(f"{name:<24} {entry['passed']:>5}/{entry['sessions']:<6}")
+    if report["memory"]:
+        lines += [
+            "",
+            f"Memory per session: {report['memory']['bytes_per_session'] / 1024:.1f} KiB retained, "
+            f"{report['memory']['peak_bytes_per_session'] / 1024:.1f} KiB peak",
+        ]
+    for error in report["errors"]:
+        lines.append(f"Error: {error}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the chatbot against an offline OpenAI-compatible stub.")
+    parser.add_argument("--sessions", type=int, default=100, help="Conversations to replay")
+    parser.add_argument("--concurrency", type=int, default=10, help="Conversations in flight at once")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync",
+                        help="RealEstateChatbot on threads, or AsyncRealEstateChatbot on one event loop")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--base-url", help="Use an already-running stub (or real API) instead of starting one")
+    parser.add_argument("--latency", default="lognormal:0.2:0.5",
+                        help="Stub latency: fixed:S, uniform:LO:HI, normal:MEAN:STD or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of stub requests given extra tail latency")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="Extra seconds for slow stub requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub requests answered with HTTP 503")
+    parser.add_argument("--turn-budget", type=float, default=20.0, help="Seconds a turn may spend on LLM calls")
+    parser.add_argument("--no-hedge", action="store_true", help="Disable hedged LLM requests")
+    parser.add_argument("--speculative", action="store_true", help="Prepare each next turn in the background")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds each user waits before replying")
+    parser.add_argument("--memory-sessions", type=int, default=20,
+                        help="Sessions to hold live when measuring memory (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file as JSON")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        latency = LatencyModel(args.latency, args.slow_rate, args.slow_latency, args.seed)
+        server = StubServer(create_stub_app(latency, args.error_rate)).start()
+        base_url = server.base_url
+        print(f"Stub server on {base_url} (latency {args.latency})")
+
+    try:
+        context = LoadTestContext(
+            base_url,
+            turn_budget=args.turn_budget,
+            hedge=not args.no_hedge,
+            speculative=args.speculative,
+            think_time=args.think_time,
+        )
+        runner = run_async if args.mode == "async" else run_sync
+        results, elapsed = runner(context, _schedule(args.sessions, names), args.concurrency)
+        memory = None
+        if args.memory_sessions:
+            memory = measure_session_memory(LoadTestContext(base_url, turn_budget=args.turn_budget), args.memory_sessions)
+        report = build_report(results, elapsed, context.metrics, memory)
+        report.update({"mode": args.mode, "concurrency": args.concurrency, "latency": args.latency})
+        context.close()
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
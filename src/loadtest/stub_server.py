@@ -0,0 +1,319 @@
+"""
+Offline OpenAI-compatible stub for load tests.
+
+Serves ``POST /v1/chat/completions`` (plain and streamed) with canned replies
+shaped like the real model's: slot-filling requests get a short reply plus a
+``SLOT_VALUES_START`` block extracted from the user's message, intent
+requests get an intent label. Latency is drawn from an injectable
+distribution, and a share of requests can be made to fail, so the bot's own
+overhead and its behaviour under slow or flaky upstreams can be measured
+without API spend.
+
+Run standalone with:
+    python -m src.loadtest.stub_server --port 8100 --latency lognormal:0.6:0.5
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.utils.slot_extractors import extract_budget, extract_email, extract_postcode, extract_uk_phone
+
+_NEXT_FIELD_RE = re.compile(r'Next field to collect:\s*(\w+)')
+_BATCH_LINE_RE = re.compile(r'^(\d+)\. (".*")$', re.MULTILINE)
+_NAME_RE = re.compile(r"(?:my name is|i am|i'm|this is|name's)\s+(.+)", re.IGNORECASE)
+
+# Free-form extraction for the stub: looser than the chatbot's own extractors, which
+# deliberately refuse wordy messages
+_FIELD_EXTRACTORS = {
+    "phone": extract_uk_phone,
+    "email": extract_email,
+    "budget": extract_budget,
+    "postcode": extract_postcode,
+}
+
+
+class LatencyModel:
+    """Latency distribution for stub responses, parsed from a short spec string."""
+
+    def __init__(self, spec: str = "fixed:0", slow_rate: float = 0.0, slow_latency: float = 5.0, seed: Optional[int] = None):
+        """
+        Initialize the model.
+
+        Args:
+            spec: 'fixed:SECONDS', 'uniform:LOW:HIGH', 'normal:MEAN:STD' or
+                'lognormal:MEDIAN:SIGMA'
+            slow_rate: Share of requests that get slow_latency added (tail injection)
+            slow_latency: Extra seconds for slow requests
+            seed: Optional random seed
+        """
+        kind, *params = spec.split(":")
+        values = [float(p) for p in params]
+        samplers = {
+            "fixed": lambda: values[0],
+            "uniform": lambda: self._random.uniform(values[0], values[1]),
+            "normal": lambda: self._random.gauss(values[0], values[1]),
+            "lognormal": lambda: values[0] * self._random.lognormvariate(0.0, values[1]),
+        }
+        if kind not in samplers:
+            raise ValueError(f"Unknown latency distribution '{spec}'")
+        self.spec = spec
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self._random = random.Random(seed)
+        self._sample = samplers[kind]
+
+    def sample(self) -> float:
+        """
+        Draw one response latency.
+
+        Returns:
+            Seconds (never negative)
+        """
+        latency = self._sample()
+        if self.slow_rate and self._random.random() < self.slow_rate:
+            latency += self.slow_latency
+        return max(0.0, latency)
+
+
+def _system_text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+
+
+def _user_text(messages: List[Dict[str, Any]]) -> str:
+    users = [str(m.get("content", "")) for m in messages if m.get("role") == "user"]
+    return users[-1] if users else ""
+
+
+def _intent_label(message: str) -> str:
+    lowered = message.lower()
+    if "sell" in lowered:
+        return "SELL_HOME"
+    return "BUY_HOME" if "buy" in lowered else "GENERAL_QUERY"
+
+
+def canned_reply(messages: List[Dict[str, Any]]) -> str:
+    """
+    Build a realistic reply for a chat request.
+
+    Args:
+        messages: Request messages
+
+    Returns:
+        Completion text
+    """
+    system = _system_text(messages)
+    user = _user_text(messages)
+    lowered = user.lower()
+
+    if "SLOT_VALUES_START" not in system:
+        if "message number" in system:
+            # Batched intents (src.llm.batcher): one label per numbered message
+            labels = {n: _intent_label(json.loads(text)) for n, text in _BATCH_LINE_RE.findall(user)}
+            return json.dumps(labels)
+        if "BUY_PROPERTY" in system or "Intent:" in system:
+            return _intent_label(user)
+        return "Happy to help with buying or selling a property. What would you like to know?"
+
+    match = _NEXT_FIELD_RE.search(system)
+    field = match.group(1) if match else "intent"
+    slots: Dict[str, Any] = {}
+    if "sell" in lowered:
+        slots["intent"] = "SELL_HOME"
+    elif "buy" in lowered:
+        slots["intent"] = "BUY_HOME"
+    if field == "property_type":
+        if "new" in lowered:
+            slots["property_type"] = "NEW"
+        elif "resale" in lowered or "old" in lowered:
+            slots["property_type"] = "RESALE"
+    elif field == "name":
+        name = _NAME_RE.search(user)
+        slots["name"] = (name.group(1) if name else user).strip(" .!").title()
+    elif field in _FIELD_EXTRACTORS:
+        # Try one- and two-word windows so surrounding chatter doesn't hide the value
+        words = user.split()
+        windows = [user] + words + [" ".join(pair) for pair in zip(words, words[1:])]
+        for window in windows:
+            value = _FIELD_EXTRACTORS[field](window.strip(",.!?"))
+            if value is not None:
+                slots[field] = value
+                break
+
+    if field == "chat":
+        reply = "Thanks for chatting with us. Have a wonderful day!"
+    elif slots:
+        reply = "Got it, thank you! Let's carry on."
+    else:
+        reply = f"Sorry, I didn't catch that. Could you tell me your {field.replace('_', ' ')}?"
+    return f"{reply}\n\nSLOT_VALUES_START\n{json.dumps(slots)}\nSLOT_VALUES_END"
+
+
+def _usage(messages: List[Dict[str, Any]], text: str) -> Dict[str, int]:
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion_tokens = len(text) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_stub_app(latency: Optional[LatencyModel] = None, error_rate: float = 0.0, chunk_size: int = 8) -> FastAPI:
+    """
+    Build the stub server application.
+
+    Args:
+        latency: Latency model (defaults to no latency)
+        error_rate: Share of requests answered with HTTP 503
+        chunk_size: Characters per streamed chunk
+
+    Returns:
+        FastAPI app
+    """
+    latency = latency or LatencyModel()
+    failures = random.Random(0)
+    app = FastAPI(title="OpenAI-compatible stub")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        messages = body.get("messages", [])
+        model = body.get("model", "stub")
+        delay = latency.sample()
+
+        if error_rate and failures.random() < error_rate:
+            await asyncio.sleep(delay)
+            return JSONResponse({"error": {"message": "Injected failure", "type": "server_error"}}, status_code=503)
+
+        text = canned_reply(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+                "usage": _usage(messages, text),
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        async def events():
+            # Time to first token is the sampled latency; the rest streams quickly
+            await asyncio.sleep(delay)
+            for i in range(0, len(text), chunk_size):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": text[i:i + chunk_size]}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0)
+            if include_usage:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": _usage(messages, text),
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class StubServer:
+    """Runs the stub app with uvicorn in a background thread."""
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 0):
+        """
+        Prepare the server.
+
+        Args:
+            app: App from create_stub_app
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        import uvicorn
+
+        self._config = uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(self._config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self.host = host
+        self.port = port
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self, timeout: float = 10.0) -> "StubServer":
+        """
+        Start serving and wait until the socket is bound.
+
+        Args:
+            timeout: Seconds to wait for startup
+
+        Returns:
+            self, with port set to the bound port
+        """
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Stub server failed to start")
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        """Stop serving."""
+        self._server.should_exit = True
+        self._thread.join(timeout=5.0)
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve an offline OpenAI-compatible stub for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S, uniform:LO:HI, normal:MEAN:STD or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests given extra tail latency")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="Extra seconds for slow requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 503")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    latency = LatencyModel(args.latency, args.slow_rate, args.slow_latency, args.seed)
+    uvicorn.run(create_stub_app(latency, args.error_rate), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Content-hash cache for document embeddings.
+
+The bot writes the same texts over and over ("yes", "ok", the templated
+"... is in our service area" replies), and embedding is the main CPU cost of
+a vector-store write. Embeddings are keyed on a hash of the text plus the
+embedding function's identifier, so vectors from another embedder are never
+returned. Lookups go to an in-memory LRU tier first and then, when
+configured, to a SQLite tier that survives restarts and can be shared by
+every worker process on the host.
+
+``CachedEmbeddingFunction`` wraps an embedding function with a cache and can
+be passed anywhere an embedding function is accepted. The embedding function
+must have an ``identifier`` (or one must be given), since nothing else tells
+two lambdas, or two models behind the same class, apart.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.metrics import MetricsRegistry, get_metrics
+
+# Most keys per SQLite "IN (...)" lookup (the default variable limit is 999)
+_SQLITE_BATCH = 500
+
+# Process-wide cache shared by every vector store (see get_shared_embedding_cache)
+_shared_cache: Optional["EmbeddingCache"] = None
+_shared_cache_lock = threading.Lock()
+
+
+def embedder_id(embedding_function: Any) -> Optional[str]:
+    """
+    Get the identifier an embedding function's vectors are cached under.
+
+    Args:
+        embedding_function: Embedding function
+
+    Returns:
+        Its ``identifier`` attribute, or None if it has none (it can't be cached safely)
+    """
+    identifier = getattr(embedding_function, "identifier", None)
+    return identifier if isinstance(identifier, str) and identifier else None
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + optional SQLite) embedding cache."""
+
+    def __init__(self, max_entries: int = 100000, db_path: Optional[str] = None, metrics: Optional[MetricsRegistry] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of embeddings kept in memory
+            db_path: Optional SQLite file for the persistent tier
+            metrics: Optional metrics registry (defaults to the process-wide one)
+        """
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.metrics = metrics or get_metrics()
+
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            conn = self._connection()
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(text: str, embedder: str) -> str:
+        """
+        Build the cache key for a text.
+
+        Args:
+            text: Text to embed
+            embedder: Embedding function identifier (see embedder_id)
+
+        Returns:
+            Hex digest identifying the text under that embedder
+        """
+        digest = hashlib.blake2b(embedder.encode("utf-8"), digest_size=16)
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings.
+
+        Args:
+            keys: Keys from make_key
+
+        Returns:
+            One cached vector (read-only float32) or None per key
+        """
+        found: List[Optional[np.ndarray]] = [None] * len(keys)
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[i] = vector
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        disk_hits = 0
+        if self.db_path and missing:
+            rows = []
+            pending = list(missing)
+            try:
+                conn = self._connection()
+                for start in range(0, len(pending), _SQLITE_BATCH):
+                    chunk = pending[start:start + _SQLITE_BATCH]
+                    rows += conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Warning: Embedding cache lookup failed: {e}")
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._remember(key, vector)
+                for i in missing.pop(key):
+                    found[i] = vector
+                disk_hits += 1
+
+        # A text repeated within the batch is embedded once, so only its first lookup is a miss
+        misses = len(missing)
+        hits = len(keys) - disk_hits - misses
+        with self._lock:
+            self._counters["hits"] += hits
+            self._counters["disk_hits"] += disk_hits
+            self._counters["misses"] += misses
+        for result, count in (("hit", hits), ("disk_hit", disk_hits), ("miss", misses)):
+            if count:
+                self.metrics.inc("embedding_cache_total", count, result=result)
+        return found
+
+    def set_many(self, keys: Sequence[str], vectors: Sequence[np.ndarray]) -> None:
+        """
+        Store embeddings in every tier.
+
+        Args:
+            keys: Keys from make_key
+            vectors: One vector per key
+        """
+        arrays = [np.array(vector, dtype=np.float32) for vector in vectors]
+        for key, vector in zip(keys, arrays):
+            self._remember(key, vector)
+        with self._lock:
+            self._counters["sets"] += len(arrays)
+
+        if self.db_path and arrays:
+            try:
+                conn = self._connection()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in zip(keys, arrays)],
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: Embedding cache write failed: {e}")
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        # Shared between callers, so make sure nobody can modify it in place
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """Remove every embedding from both tiers and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+        if self.db_path:
+            conn = self._connection()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters.
+
+        Returns:
+            Dictionary with hits, disk_hits, misses, sets, evictions, size and hit_rate
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+class CachedEmbeddingFunction:
+    """Embedding function that only embeds texts missing from an EmbeddingCache."""
+
+    def __init__(
+        self,
+        embedding_function: Callable[[List[str]], Any],
+        cache: Optional[EmbeddingCache] = None,
+        identifier: Optional[str] = None,
+    ):
+        """
+        Wrap an embedding function.
+
+        Args:
+            embedding_function: Function computing embeddings for cache misses
+            cache: Optional cache (defaults to the process-wide one)
+            identifier: Id of the embedding function's output (model and settings); required
+                if the function has no ``identifier`` attribute
+
+        Raises:
+            ValueError: If no identifier is given or available
+        """
+        self.identifier = identifier or embedder_id(embedding_function)
+        if not self.identifier:
+            raise ValueError(
+                "Embedding function has no identifier; pass identifier= naming its model and settings"
+            )
+        self.embedding_function = embedding_function
+        self.cache = cache or get_shared_embedding_cache()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts, computing only the ones not already cached.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dimensions)
+        """
+        keys = [EmbeddingCache.make_key(text, self.identifier) for text in texts]
+        vectors = self.cache.get_many(keys)
+        # Embed each missing text once, even if it repeats within the batch
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            computed = np.asarray(self.embedding_function(list(missing.values())), dtype=np.float32)
+            self.cache.set_many(list(missing), computed)
+            by_key = dict(zip(missing, computed))
+            vectors = [by_key[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        """
+        Embed texts (Chroma's EmbeddingFunction interface).
+
+        Args:
+            input: Texts to embed
+
+        Returns:
+            One float32 vector per text
+        """
+        return list(self.embed(input))
+
+
+def get_shared_embedding_cache() -> EmbeddingCache:
+    """
+    Get the process-wide embedding cache (in-memory tier only).
+
+    Returns:
+        Shared EmbeddingCache
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = EmbeddingCache()
+    return _shared_cache
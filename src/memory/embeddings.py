@@ -0,0 +1,183 @@
+"""
+Local embedding functions for the vector store.
+
+Chroma's ``DefaultEmbeddingFunction`` downloads and loads an ONNX model on
+first use, which makes the first session slow and fails without internet
+access. ``HashingEmbeddingFunction`` needs neither: it hashes word unigrams,
+word bigrams and character trigrams into a fixed number of buckets, weights
+them by sublinear term frequency times inverse document frequency, and
+L2-normalises each row, so a batch of chat turns embeds in a few microseconds
+per text.
+
+Any callable that takes a list of texts and returns one vector per text can be
+used instead. Both Chroma collections and ``InMemoryVectorStore`` accept it.
+Embedding functions may expose an ``identifier`` string that changes whenever
+their output would, so cached or persisted vectors from another embedder are
+never mixed in.
+"""
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.intent_classifier import DEFAULT_EXAMPLES_PATH, load_examples
+
+_WORD_RE = re.compile(r"[a-z0-9£']+")
+
+# Process-wide embedder shared by every store (see get_default_embedding_function)
+_default_embedding_function: Optional["HashingEmbeddingFunction"] = None
+_default_embedding_function_lock = threading.Lock()
+
+
+@lru_cache(maxsize=65536)
+def _gram_bucket(gram: str, dimensions: int) -> int:
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(gram.encode("utf-8")) % dimensions
+
+
+@lru_cache(maxsize=65536)
+def _word_buckets(word: str, dimensions: int) -> tuple:
+    padded = f"<{word}>"
+    grams = [f"w:{word}"] + [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return tuple(_gram_bucket(gram, dimensions) for gram in grams)
+
+
+class HashingEmbeddingFunction:
+    """TF-IDF weighted hashed n-gram embeddings computed in NumPy."""
+
+    def __init__(self, dimensions: int = 1024, idf: Optional[np.ndarray] = None):
+        """
+        Initialize the embedder.
+
+        Args:
+            dimensions: Size of the hashed feature space (the embedding length)
+            idf: Optional inverse document frequency per bucket (see fit); all ones if omitted
+        """
+        self.dimensions = dimensions
+        self.idf = np.ones(dimensions, dtype=np.float32) if idf is None else np.asarray(idf, dtype=np.float32)
+        if self.idf.shape != (dimensions,):
+            raise ValueError(f"idf must have shape ({dimensions},), got {self.idf.shape}")
+
+    @property
+    def identifier(self) -> str:
+        """Stable id of this embedder's output: changes with the dimensions or IDF weights."""
+        return f"hashing-tfidf-{self.dimensions}-{zlib.crc32(self.idf.tobytes()):08x}"
+
+    def _indices(self, text: str) -> List[int]:
+        words = _WORD_RE.findall(text.lower())
+        indices: List[int] = []
+        for word in words:
+            indices.extend(_word_buckets(word, self.dimensions))
+        indices.extend(_gram_bucket(f"b:{a} {b}", self.dimensions) for a, b in zip(words, words[1:]))
+        return indices
+
+    def _counts(self, texts: Sequence[str]) -> np.ndarray:
+        rows = [self._indices(text) for text in texts]
+        lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+        flat = np.fromiter((index for row in rows for index in row), dtype=np.int64, count=int(lengths.sum()))
+        # One bincount over (row, bucket) pairs builds the whole term-frequency matrix
+        offsets = np.repeat(np.arange(len(rows), dtype=np.int64) * self.dimensions, lengths)
+        counts = np.bincount(offsets + flat, minlength=len(rows) * self.dimensions)
+        return counts.reshape(len(rows), self.dimensions).astype(np.float32)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dimensions) with L2-normalised rows (all zeros for
+            texts without words)
+        """
+        counts = self._counts(texts)
+        present = counts > 0
+        # Sublinear tf (1 + log tf), so a repeated word doesn't drown the rest
+        weights = np.zeros_like(counts)
+        weights[present] = 1.0 + np.log(counts[present])
+        weights *= self.idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        return weights / np.where(norms > 0, norms, 1.0)
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        """
+        Embed texts (Chroma's EmbeddingFunction interface).
+
+        Args:
+            input: Texts to embed
+
+        Returns:
+            One float32 vector per text
+        """
+        return list(self.embed(input))
+
+    def fit(self, corpus: Iterable[str]) -> "HashingEmbeddingFunction":
+        """
+        Set the IDF weights from a representative corpus.
+
+        Args:
+            corpus: Texts to count document frequencies over
+
+        Returns:
+            self
+        """
+        texts = list(corpus)
+        if not texts:
+            return self
+        document_frequency = np.count_nonzero(self._counts(texts), axis=0)
+        # Smoothed idf: buckets never seen in the corpus get the largest weight
+        self.idf = (np.log((1.0 + len(texts)) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+        return self
+
+    def save(self, path: str) -> None:
+        """
+        Save the IDF weights as a compressed .npz file.
+
+        Args:
+            path: Output file
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, idf=self.idf)
+
+    @classmethod
+    def load(cls, path: str) -> "HashingEmbeddingFunction":
+        """
+        Load an embedder written by save.
+
+        Args:
+            path: Weights file
+
+        Returns:
+            HashingEmbeddingFunction
+        """
+        with np.load(path) as data:
+            idf = data["idf"].astype(np.float32)
+        return cls(dimensions=idf.shape[0], idf=idf)
+
+
+def get_default_embedding_function(dimensions: int = 1024) -> HashingEmbeddingFunction:
+    """
+    Get the process-wide local embedder, with IDF weights fitted on the intent examples.
+
+    Args:
+        dimensions: Embedding length (only used on the first call)
+
+    Returns:
+        Shared HashingEmbeddingFunction
+    """
+    global _default_embedding_function
+    if _default_embedding_function is None:
+        with _default_embedding_function_lock:
+            if _default_embedding_function is None:
+                embedder = HashingEmbeddingFunction(dimensions)
+                try:
+                    embedder.fit(message for message, _ in load_examples(DEFAULT_EXAMPLES_PATH))
+                except Exception as e:
+                    print(f"Warning: Could not fit embedding IDF weights, using plain term frequency: {e}")
+                _default_embedding_function = embedder
+    return _default_embedding_function
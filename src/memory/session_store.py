@@ -0,0 +1,297 @@
+"""
+Per-session chatbot state for the HTTP API.
+
+Each request rebuilds a chatbot from the session's stored state (slot values
+and conversation history) and saves it back when the turn is done. Stores are
+pluggable: ``InMemorySessionStore`` is fastest but private to one worker
+process, while ``SQLiteSessionStore`` is shared by every worker on the host.
+
+Every save bumps the session's version. ``get_versioned`` and ``set_if_version``
+let a caller save only if nobody else saved the session since it was loaded,
+so two workers running turns for the same session can't silently overwrite
+each other's history.
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class SessionConflict(RuntimeError):
+    """Raised when a session was saved by someone else since it was loaded."""
+
+
+class SessionStore(ABC):
+    """Interface for session state stores."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a session's state.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            State saved with set, or None if the session is unknown or expired
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, session_id: str, state: Dict[str, Any]) -> None:
+        """
+        Save a session's state and refresh its expiry.
+
+        Args:
+            session_id: Session identifier
+            state: JSON-serializable state
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_versioned(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Load a session's state with its version.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Tuple of (state or None, version); unknown and expired sessions have version 0
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_if_version(self, session_id: str, state: Dict[str, Any], version: int) -> bool:
+        """
+        Save a session's state only if its version is still the one it was loaded with.
+
+        Args:
+            session_id: Session identifier
+            state: JSON-serializable state
+            version: Version returned by get_versioned
+
+        Returns:
+            True if saved (the version is bumped), False if the session changed in between
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """
+        Forget a session.
+
+        Args:
+            session_id: Session identifier
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def states(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the state of every live session (e.g. to mine logged conversations).
+
+        Yields:
+            Session states
+        """
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store; sessions expire after ttl seconds idle, oldest evicted first."""
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 3600.0):
+        """
+        Initialize the store.
+
+        Args:
+            max_sessions: Maximum number of sessions kept
+            ttl: Seconds a session survives without a turn
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # session_id -> (expires_at, JSON state, version)
+        self._sessions: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live_entry(self, session_id: str) -> Optional[Tuple[float, str, int]]:
+        # Call with the lock held
+        entry = self._sessions.get(session_id)
+        if entry is not None and entry[0] <= time.time():
+            del self._sessions[session_id]
+            return None
+        return entry
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_versioned(session_id)[0]
+
+    def get_versioned(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        with self._lock:
+            entry = self._live_entry(session_id)
+            if entry is None:
+                return None, 0
+            self._sessions.move_to_end(session_id)
+        # Stored as JSON so callers can't mutate the saved state in place
+        return json.loads(entry[1]), entry[2]
+
+    def set(self, session_id: str, state: Dict[str, Any]) -> None:
+        value = json.dumps(state, ensure_ascii=False)
+        with self._lock:
+            entry = self._live_entry(session_id)
+            self._store(session_id, value, (entry[2] if entry else 0) + 1)
+
+    def set_if_version(self, session_id: str, state: Dict[str, Any], version: int) -> bool:
+        value = json.dumps(state, ensure_ascii=False)
+        with self._lock:
+            entry = self._live_entry(session_id)
+            if (entry[2] if entry else 0) != version:
+                return False
+            self._store(session_id, value, version + 1)
+            return True
+
+    def _store(self, session_id: str, value: str, version: int) -> None:
+        # Call with the lock held
+        self._sessions[session_id] = (time.time() + self.ttl, value, version)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def states(self) -> Iterator[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            values = [value for expires_at, value, _ in self._sessions.values() if expires_at > now]
+        for value in values:
+            yield json.loads(value)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite-backed store shared by every worker process on the host."""
+
+    def __init__(self, db_path: str, ttl: float = 3600.0):
+        """
+        Open (and create if needed) the session database.
+
+        Args:
+            db_path: Path to the SQLite file
+            ttl: Seconds a session survives without a turn
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, state TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, version INTEGER NOT NULL DEFAULT 1)"
+        )
+        # Databases created before sessions were versioned
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+        if "version" not in columns:
+            conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_versioned(session_id)[0]
+
+    def get_versioned(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        row = self._connection().execute(
+            "SELECT state, version FROM sessions WHERE session_id = ? AND expires_at > ?", (session_id, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row is not None else (None, 0)
+
+    def set(self, session_id: str, state: Dict[str, Any]) -> None:
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO sessions (session_id, state, expires_at, version) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT(session_id) DO UPDATE SET state = excluded.state, expires_at = excluded.expires_at, "
+            "version = CASE WHEN sessions.expires_at > ? THEN sessions.version + 1 ELSE 1 END",
+            (session_id, json.dumps(state, ensure_ascii=False), now + self.ttl, now),
+        )
+        conn.commit()
+
+    def set_if_version(self, session_id: str, state: Dict[str, Any], version: int) -> bool:
+        now = time.time()
+        value = json.dumps(state, ensure_ascii=False)
+        conn = self._connection()
+        if version == 0:
+            # New (or expired) session: only succeeds if no live row has appeared meanwhile
+            saved = conn.execute(
+                "INSERT INTO sessions (session_id, state, expires_at, version) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(session_id) DO UPDATE SET state = excluded.state, "
+                "expires_at = excluded.expires_at, version = 1 WHERE sessions.expires_at <= ?",
+                (session_id, value, now + self.ttl, now),
+            ).rowcount
+        else:
+            saved = conn.execute(
+                "UPDATE sessions SET state = ?, expires_at = ?, version = version + 1 "
+                "WHERE session_id = ? AND version = ? AND expires_at > ?",
+                (value, now + self.ttl, session_id, version, now),
+            ).rowcount
+        conn.commit()
+        return saved == 1
+
+    def delete(self, session_id: str) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        conn.commit()
+
+    def states(self) -> Iterator[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT state FROM sessions WHERE expires_at > ?", (time.time(),)
+        ).fetchall()
+        for (state,) in rows:
+            yield json.loads(state)
+
+    def purge_expired(self) -> int:
+        """
+        Drop expired sessions.
+
+        Returns:
+            Number of sessions removed
+        """
+        conn = self._connection()
+        removed = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+        conn.commit()
+        return removed
+
+
+def create_session_store(spec: Optional[str] = None, ttl: float = 3600.0) -> SessionStore:
+    """
+    Build a session store from a short spec string.
+
+    Args:
+        spec: 'memory' (the default) or 'sqlite:///path/to/sessions.db'
+        ttl: Seconds a session survives without a turn
+
+    Returns:
+        SessionStore instance
+    """
+    spec = spec or "memory"
+    if spec == "memory":
+        return InMemorySessionStore(ttl=ttl)
+    if spec.startswith("sqlite:///"):
+        return SQLiteSessionStore(spec[len("sqlite:///"):], ttl=ttl)
+    raise ValueError(f"Unknown session store '{spec}' (expected 'memory' or 'sqlite:///path')")
@@ -1,47 +1,822 @@
 """
 Vector store implementation using Chroma or in-memory fallback.
+
+Writes are write-behind by default: ``add_documents`` only enqueues the
+documents, and a background thread drains the queue into large batched
+Chroma writes, so embedding and disk I/O stay off the chat
+critical path. The queue is bounded; when it is full, writers wait up to
+``put_timeout`` seconds and the documents are dropped (and counted) after
+that. Pending documents are flushed on ``close()`` and at interpreter exit.
+
+Without ChromaDB, documents go to ``InMemoryVectorStore``, a NumPy cosine
+index that takes the same ``where`` filters and returns results in the same
+shape as a Chroma collection.
+
+Every turn is stored with its ``session_id``. ``query(..., session_id=...)``
+only searches that session's turns. Chroma resolves the filter through its
+metadata index, and the in-memory store uses inverted indexes and NumPy
+columns on ``session_id``, ``type``, ``slot_state_intent`` and ``turn``.
+Either way, a session-scoped query costs about the same however many other
+sessions are stored.
+
+Both backends embed with the local ``HashingEmbeddingFunction`` (see
+``src.memory.embeddings``) unless another embedding function is passed, so
+no model has to be downloaded. Embeddings go through a content-hash cache
+(``src.memory.embedding_cache``), so repeated texts are embedded once.
 """
-from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Dict, Any, Optional, Tuple, Callable, Sequence
+import argparse
+import atexit
+import json
 import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from src.memory.embedding_cache import CachedEmbeddingFunction, EmbeddingCache, embedder_id
+from src.memory.embeddings import get_default_embedding_function
+
+# Metadata keys InMemoryVectorStore indexes by default (as written by RealEstateChatbot._store_turn)
+DEFAULT_INDEXED_KEYS = ("session_id", "type", "slot_state_intent", "turn")
+
+# Comparison operators accepted in query `where` filters (Chroma's syntax)
+_WHERE_OPERATORS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+# Range operators evaluated on an indexed key's numeric column (NaN never matches)
+_RANGE_OPERATORS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+def _is_scalar(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _single_equality(where: Dict[str, Any]) -> bool:
+    # Whether the filter is one plain/$eq/$in condition (possibly wrapped in $and), so the
+    # rows from its posting list are exactly the matches
+    if len(where) != 1:
+        return False
+    key, condition = next(iter(where.items()))
+    if key == "$and":
+        return len(condition) == 1 and _single_equality(condition[0])
+    if key.startswith("$"):
+        return False
+    return not isinstance(condition, dict) or (len(condition) == 1 and next(iter(condition)) in ("$eq", "$in"))
+
+
+def _equality_constraints(where: Optional[Dict[str, Any]]) -> List[Tuple[str, List[Any]]]:
+    # (key, allowed values) pairs that every match must satisfy: plain and $eq/$in
+    # conditions, at the top level or inside $and
+    constraints: List[Tuple[str, List[Any]]] = []
+    for key, condition in (where or {}).items():
+        if key == "$and":
+            for clause in condition:
+                constraints += _equality_constraints(clause)
+        elif key.startswith("$"):
+            continue
+        elif not isinstance(condition, dict):
+            constraints.append((key, [condition]))
+        else:
+            for operator, target in condition.items():
+                if operator == "$eq":
+                    constraints.append((key, [target]))
+                elif operator == "$in":
+                    constraints.append((key, list(target)))
+    return constraints
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check a metadata dictionary against a Chroma-style `where` filter.
+
+    Supports {"key": value}, {"key": {"$eq"|"$ne"|"$gt"|"$gte"|"$lt"|"$lte"|"$in"|"$nin": target}}
+    and {"$and"|"$or": [filter, ...]}.
+
+    Args:
+        metadata: Document metadata
+        where: Filter (None or empty matches everything)
+
+    Returns:
+        True if the metadata passes the filter
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, target in condition.items():
+                if operator not in _WHERE_OPERATORS:
+                    raise ValueError(f"Unsupported where operator '{operator}'")
+                try:
+                    if not _WHERE_OPERATORS[operator](value, target):
+                        return False
+                except TypeError:
+                    # Mismatched types (e.g. "3" > 2) never match, as in Chroma
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+@contextmanager
+def _replace_file(path: str, mode: str = "wb") -> Iterator[IO]:
+    # Write to a temporary file next to path and rename it into place, so a store loaded
+    # (memory-mapped) from path keeps reading the old file while it is saved over
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    with _replace_file(path) as f:
+        np.save(f, array)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # Positions of the k highest scores, best first
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class _Postings:
+    """Rows holding one value of an indexed key, in a growable int64 array."""
+
+    __slots__ = ("_rows", "_size")
 
-class InMemoryVectorStore:
-    """Simple in-memory vector store implementation."""
     def __init__(self):
-        self.documents = []
-        self.metadatas = []
-    
-    def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]]):
-        """Add documents to in-memory store."""
-        self.documents.extend(documents)
-        self.metadatas.extend(metadatas)
-    
-    def query(self, query_text: str, n_results: int = 5) -> Optional[List[Dict[str, Any]]]:
-        """Simple keyword-based search."""
-        if not self.documents:
+        self._rows = np.empty(8, dtype=np.int64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, row: int) -> None:
+        if self._size == len(self._rows):
+            self._rows = np.concatenate([self._rows, np.empty(len(self._rows), dtype=np.int64)])
+        self._rows[self._size] = row
+        self._size += 1
+
+    def remove(self, row: int) -> None:
+        i = int(np.flatnonzero(self._rows[:self._size] == row)[0])
+        self._rows[i:self._size - 1] = self._rows[i + 1:self._size]
+        self._size -= 1
+
+    def view(self) -> np.ndarray:
+        return self._rows[:self._size]
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Cluster unit vectors by cosine similarity (k-means with normalised centroids).
+
+    Args:
+        vectors: L2-normalised float32 vectors, one per row
+        n_clusters: Number of centroids
+        n_iter: Assignment/update rounds
+        seed: Random seed for the initial centroids
+
+    Returns:
+        Array of shape (n_clusters, dimensions) with L2-normalised centroids
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = (vectors @ centroids.T).argmax(axis=1)
+        members = np.zeros((n_clusters, len(vectors)), dtype=np.float32)
+        members[assignments, np.arange(len(vectors))] = 1.0
+        sums = members @ vectors
+        # Reseed empty clusters from random vectors so every list gets used
+        empty = members.sum(axis=1) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms > 0, norms, 1.0)
+    return centroids.astype(np.float32)
+
+
+class InMemoryVectorStore:
+    """
+    In-memory vector index searched by cosine similarity.
+
+    Embeddings live in one preallocated float32 matrix that doubles when full, and
+    rows are L2-normalised on insert, so a query is a single matrix-vector product
+    followed by argpartition for the top k. Metadata keys in ``indexed_keys`` get an
+    inverted index (value -> row array) plus per-row columns of value codes and numbers.
+    A filter that only uses indexed keys is evaluated with NumPy on those columns,
+    starting from the rows of its most selective equality condition; other filters are
+    checked document by document with matches_where.
+
+    With ``index="ivf"``, queries are approximate: once ``ivf_train_size`` documents are
+    stored, spherical k-means splits them into ``n_lists`` inverted lists, new documents
+    join the list of their nearest centroid, and a query scores only the documents in its
+    ``n_probe`` nearest lists. A filter on indexed keys that matches more rows than the
+    probed lists hold is applied to the probed rows; narrower filters (e.g. one session)
+    are searched exactly. ``evaluate_index`` reports recall and latency against brute
+    force, and ``save``/``load`` persist the store to .npy files that are memory-mapped
+    on load.
+    """
+    def __init__(
+        self,
+        embedding_function: Optional[Callable[[List[str]], Any]] = None,
+        initial_capacity: int = 1024,
+        indexed_keys: Sequence[str] = DEFAULT_INDEXED_KEYS,
+        index: str = "flat",
+        n_lists: int = 256,
+        n_probe: int = 16,
+        ivf_train_size: int = 10000,
+    ):
+        """
+        Initialize an empty store.
+
+        Args:
+            embedding_function: Callable turning a list of texts into one vector per text
+                (defaults to the shared local HashingEmbeddingFunction)
+            initial_capacity: Rows preallocated before the first resize
+            indexed_keys: Metadata keys whose equality filters are answered from an index
+            index: 'flat' (exact brute-force search) or 'ivf' (approximate inverted-file search)
+            n_lists: Number of IVF lists (k-means centroids)
+            n_probe: IVF lists scored per query; higher is slower and more accurate
+            ivf_train_size: Documents stored before the IVF index is trained
+        """
+        if index not in ("flat", "ivf"):
+            raise ValueError(f"Unknown index '{index}' (expected 'flat' or 'ivf')")
+        self.embedding_function = embedding_function or get_default_embedding_function()
+        self.index = index
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.ivf_train_size = ivf_train_size
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._capacity = initial_capacity
+        self._embeddings: Optional[np.ndarray] = None
+        # key -> value -> rows holding that value
+        self._index: Dict[str, Dict[Any, _Postings]] = {key: {} for key in indexed_keys}
+        # Per indexed key: value -> code, each row's code (-1 if missing) and each row's
+        # numeric value (NaN if not a number), so filters can be evaluated with NumPy
+        self._value_codes: Dict[str, Dict[Any, int]] = {key: {} for key in indexed_keys}
+        self._codes: Dict[str, np.ndarray] = {key: np.empty(0, dtype=np.int32) for key in indexed_keys}
+        self._numbers: Dict[str, np.ndarray] = {key: np.empty(0, dtype=np.float64) for key in indexed_keys}
+        # IVF state: centroids, each row's list, and each list's rows (a compacted array plus
+        # rows appended since). A row moved by an upsert stays listed under its old list too;
+        # once that has happened (_moved), queries skip entries whose list no longer matches
+        # _assignments.
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._list_rows: List[np.ndarray] = []
+        self._list_tails: List[List[int]] = []
+        self._moved = False
+        self._training = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def trained(self) -> bool:
+        """Whether the IVF index has centroids and answers unfiltered queries."""
+        return self._centroids is not None
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.embedding_function(list(texts)), dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+    def _reserve(self, rows: int, dimensions: int) -> None:
+        if self._embeddings is None:
+            self._capacity = max(self._capacity, rows)
+            self._embeddings = np.empty((self._capacity, dimensions), dtype=np.float32)
+        elif rows > self._capacity or not self._embeddings.flags.writeable:
+            # Also copies memory-mapped arrays from load() into memory before the first write
+            while self._capacity < rows:
+                self._capacity *= 2
+            grown = np.empty((self._capacity, dimensions), dtype=np.float32)
+            grown[:len(self.ids)] = self._embeddings[:len(self.ids)]
+            self._embeddings = grown
+        if self._assignments is not None and (len(self._assignments) < self._capacity or not self._assignments.flags.writeable):
+            assignments = np.full(self._capacity, -1, dtype=np.int32)
+            assignments[:len(self.ids)] = self._assignments[:len(self.ids)]
+            self._assignments = assignments
+
+    def _index_row(self, row: int, metadata: Dict[str, Any], remove: bool = False) -> None:
+        for key, postings in self._index.items():
+            codes, numbers = self._codes[key], self._numbers[key]
+            if row >= len(codes):
+                size = max(2 * len(codes), row + 1, 1024)
+                codes = self._codes[key] = np.concatenate([codes, np.full(size - len(codes), -1, dtype=np.int32)])
+                numbers = self._numbers[key] = np.concatenate([numbers, np.full(size - len(numbers), np.nan)])
+            value = metadata.get(key)
+            if value is None or isinstance(value, (dict, list)):
+                continue
+            if remove:
+                postings[value].remove(row)
+                if not postings[value]:
+                    del postings[value]
+                codes[row] = -1
+                numbers[row] = np.nan
+            else:
+                postings.setdefault(value, _Postings()).append(row)
+                value_codes = self._value_codes[key]
+                codes[row] = value_codes.setdefault(value, len(value_codes))
+                if isinstance(value, (int, float)):
+                    numbers[row] = value
+
+    def _candidates(self, where: Dict[str, Any]) -> Optional[np.ndarray]:
+        # Rows allowed by the most selective indexed equality condition (None if no
+        # condition is indexed); the rest of the filter is checked on these rows only
+        best: Optional[List[np.ndarray]] = None
+        for key, values in _equality_constraints(where):
+            postings = self._index.get(key)
+            # None and non-scalar values aren't indexed, so their rows can't be looked up
+            if postings is None or not all(map(_is_scalar, values)):
+                continue
+            matched = [postings[value].view() for value in values if value in postings]
+            if best is None or sum(map(len, matched)) < sum(map(len, best)):
+                best = matched
+        if best is None:
             return None
-        # Return most recent documents as fallback
+        if len(best) == 1:
+            return best[0]
+        return np.unique(np.concatenate(best)) if best else np.empty(0, dtype=np.int64)
+
+    def _vectorizable(self, where: Dict[str, Any]) -> bool:
+        # Whether _where_mask can evaluate the filter: only indexed keys, scalar targets
+        # and numeric range bounds
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                if not all(self._vectorizable(clause) for clause in condition):
+                    return False
+            elif key.startswith("$") or key not in self._index:
+                return False
+            elif not isinstance(condition, dict):
+                if not _is_scalar(condition):
+                    return False
+            else:
+                for operator, target in condition.items():
+                    if operator in ("$eq", "$ne"):
+                        supported = _is_scalar(target)
+                    elif operator in ("$in", "$nin"):
+                        supported = isinstance(target, (list, tuple, set)) and all(map(_is_scalar, target))
+                    else:
+                        supported = operator in _RANGE_OPERATORS and _is_number(target)
+                    if not supported:
+                        return False
+        return True
+
+    def _where_mask(self, where: Dict[str, Any], rows: np.ndarray) -> np.ndarray:
+        # Which of rows pass a filter accepted by _vectorizable (same results as matches_where)
+        mask = np.ones(len(rows), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._where_mask(clause, rows)
+            elif key == "$or":
+                either = np.zeros(len(rows), dtype=bool)
+                for clause in condition:
+                    either |= self._where_mask(clause, rows)
+                mask &= either
+            else:
+                for operator, target in (condition.items() if isinstance(condition, dict) else [("$eq", condition)]):
+                    if operator in _RANGE_OPERATORS:
+                        mask &= _RANGE_OPERATORS[operator](self._numbers[key][rows], target)
+                        continue
+                    targets = [target] if operator in ("$eq", "$ne") else target
+                    value_codes = self._value_codes[key]
+                    known = [value_codes[t] for t in targets if t in value_codes]
+                    codes = self._codes[key][rows]
+                    hit = codes == known[0] if len(known) == 1 else np.isin(codes, known)
+                    mask &= hit if operator in ("$eq", "$in") else ~hit
+        return mask
+
+    def _filter(
+        self, query_vector: np.ndarray, n_results: int, where: Dict[str, Any], exact: bool
+    ) -> np.ndarray:
+        # Rows passing a filter (call with the lock held)
+        count = len(self.ids)
+        seed = self._candidates(where)
+        if not self._vectorizable(where):
+            rows = range(count) if seed is None else seed.tolist()
+            return np.fromiter((row for row in rows if matches_where(self.metadatas[row], where)), dtype=np.int64)
+        if self.index == "ivf" and self.trained and not exact:
+            # Probing beats scanning the filter's rows when they outnumber the probed lists
+            probed = count * min(self.n_probe, len(self._centroids)) / len(self._centroids)
+            if seed is None or len(seed) > probed:
+                rows = self._probe(query_vector, self.n_probe)
+                rows = rows[self._where_mask(where, rows)]
+                if len(rows) >= n_results:
+                    return rows
+        if seed is None:
+            rows = np.arange(count, dtype=np.int64)
+        elif _single_equality(where):
+            return seed
+        else:
+            rows = seed
+        return rows[self._where_mask(where, rows)]
+
+    def _assign(self, rows: np.ndarray) -> None:
+        # Put rows on the list of their nearest centroid (call with the lock held)
+        lists = (self._embeddings[rows] @ self._centroids.T).argmax(axis=1).astype(np.int32)
+        for row, list_id in zip(rows.tolist(), lists.tolist()):
+            if self._assignments[row] == list_id:
+                continue
+            self._moved = self._moved or self._assignments[row] != -1
+            self._assignments[row] = list_id
+            tail = self._list_tails[list_id]
+            tail.append(row)
+            # Fold long tails into the compacted array so queries don't convert big lists
+            if len(tail) > max(1024, len(self._list_rows[list_id])):
+                self._list_rows[list_id] = np.concatenate([self._list_rows[list_id], np.asarray(tail, dtype=np.int64)])
+                tail.clear()
+
+    def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: Optional[List[str]] = None):
+        """
+        Embed and add documents. A document whose id is already stored replaces it (upsert).
+
+        Args:
+            documents: List of document texts
+            metadatas: List of metadata dictionaries
+            ids: Optional unique document ids (random ids are generated if omitted)
+        """
+        if not documents:
+            return
+        ids = ids or [uuid.uuid4().hex for _ in documents]
+        # Embed outside the lock so queries aren't held up
+        vectors = self._embed(documents)
+        with self._lock:
+            self._reserve(len(self.ids) + len(documents), vectors.shape[1])
+            written = []
+            for doc_id, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = len(self.ids)
+                    self._rows[doc_id] = row
+                    self.ids.append(doc_id)
+                    self.documents.append(document)
+                    self.metadatas.append(metadata)
+                else:
+                    self._index_row(row, self.metadatas[row], remove=True)
+                    self.documents[row] = document
+                    self.metadatas[row] = metadata
+                self._index_row(row, metadata)
+                self._embeddings[row] = vector
+                written.append(row)
+            if self.trained:
+                self._assign(np.asarray(written, dtype=np.int64))
+            train = self.index == "ivf" and not self.trained and not self._training and len(self.ids) >= self.ivf_train_size
+            if train:
+                self._training = True
+        if train:
+            self.train_index()
+
+    def train_index(self, sample_size: Optional[int] = None, n_iter: int = 20, seed: int = 0) -> None:
+        """
+        (Re)build the IVF index: cluster a sample of the stored embeddings and assign every
+        document to its nearest centroid. Queries keep working while the centroids are computed.
+
+        Args:
+            sample_size: Documents to cluster (defaults to 64 per list)
+            n_iter: k-means rounds
+            seed: Random seed for sampling and initial centroids
+        """
+        try:
+            with self._lock:
+                count = len(self.ids)
+                if count == 0:
+                    return
+                rng = np.random.default_rng(seed)
+                size = min(count, sample_size or 64 * self.n_lists)
+                sample = self._embeddings[np.sort(rng.choice(count, size, replace=False))]
+            centroids = spherical_kmeans(sample, self.n_lists, n_iter, seed)
+            with self._lock:
+                count = len(self.ids)
+                self._centroids = centroids
+                self._assignments = np.full(self._capacity, -1, dtype=np.int32)
+                for start in range(0, count, 65536):
+                    block = self._embeddings[start:min(start + 65536, count)]
+                    self._assignments[start:start + len(block)] = (block @ centroids.T).argmax(axis=1)
+                order = np.argsort(self._assignments[:count], kind="stable")
+                bounds = np.searchsorted(self._assignments[:count][order], np.arange(len(centroids) + 1))
+                self._list_rows = [order[bounds[i]:bounds[i + 1]].astype(np.int64) for i in range(len(centroids))]
+                self._list_tails = [[] for _ in range(len(centroids))]
+                self._moved = False
+        finally:
+            self._training = False
+
+    def _probe(self, query_vector: np.ndarray, n_probe: int) -> np.ndarray:
+        # Rows in the n_probe lists whose centroids are nearest the query (call with the lock held)
+        lists = _top_k(self._centroids @ query_vector, n_probe)
+        parts = []
+        for list_id in lists.tolist():
+            rows = self._list_rows[list_id]
+            if self._list_tails[list_id]:
+                rows = np.concatenate([rows, np.asarray(self._list_tails[list_id], dtype=np.int64)])
+            parts.append(rows[self._assignments[rows] == list_id] if self._moved else rows)
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        # A row that moved away and back is listed twice under the same list
+        return np.unique(np.concatenate(parts)) if self._moved else np.concatenate(parts)
+
+    def _search(
+        self, query_vector: np.ndarray, n_results: int, where: Optional[Dict[str, Any]] = None, exact: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Best rows and their cosine scores (call with the lock held)
+        count = len(self.ids)
+        if where:
+            candidates = self._filter(query_vector, n_results, where, exact)
+        elif self.index == "ivf" and self.trained and not exact:
+            candidates = self._probe(query_vector, self.n_probe)
+        else:
+            candidates = None
+        if candidates is None:
+            scores = self._embeddings[:count] @ query_vector if count else np.empty(0, np.float32)
+        elif len(candidates) > count // 4:
+            # Scoring every row beats gathering a large share of them into a copy first
+            scores = (self._embeddings[:count] @ query_vector)[candidates]
+        else:
+            scores = self._embeddings[candidates] @ query_vector if len(candidates) else np.empty(0, np.float32)
+        top = _top_k(scores, n_results)
+        return (candidates[top] if candidates is not None else top), scores[top]
+
+    def query(self, query_text: str, n_results: int = 5, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Find the stored documents most similar to a query.
+
+        Args:
+            query_text: Query text
+            n_results: Number of results to return
+            where: Optional metadata filter applied before scoring (Chroma syntax, see matches_where);
+                equality on an indexed key only visits the rows holding that value, and filters
+                on indexed keys alone are evaluated with NumPy
+
+        Returns:
+            Chroma-shaped results: "ids", "documents", "metadatas" and "distances" each hold one
+            list (for the single query) ordered nearest first
+        """
+        query_vector = self._embed([query_text])[0]
+        with self._lock:
+            rows, scores = self._search(query_vector, n_results, where)
+            # Squared L2 between unit vectors, matching Chroma's default "l2" space
+            distances = np.maximum(2.0 - 2.0 * scores, 0.0)
+            return {
+                "ids": [[self.ids[row] for row in rows]],
+                "embeddings": None,
+                "documents": [[self.documents[row] for row in rows]],
+                "metadatas": [[self.metadatas[row] for row in rows]],
+                "distances": [distances.tolist()],
+            }
+
+    def evaluate_index(
+        self, k: int = 10, n_queries: int = 200, queries: Optional[Sequence[str]] = None, seed: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Measure the IVF index against exact brute-force search.
+
+        Args:
+            k: Results per query
+            n_queries: Stored documents used as queries when no queries are given
+            queries: Optional query texts
+            seed: Random seed for picking query documents
+
+        Returns:
+            Dictionary with recall_at_k (share of the exact top k the index also returned),
+            exact_ms and ivf_ms latency percentiles, speedup (exact p50 / ivf p50), mean
+            rows scored per IVF query, and the index settings
+        """
+        if self.index != "ivf":
+            raise ValueError("evaluate_index needs a store created with index='ivf'")
+        if not self.trained:
+            self.train_index()
+        if not self.trained:
+            raise ValueError("evaluate_index needs at least one stored document")
+        if queries:
+            vectors = self._embed(list(queries))
+        else:
+            with self._lock:
+                rng = np.random.default_rng(seed)
+                picks = rng.choice(len(self.ids), min(n_queries, len(self.ids)), replace=False)
+                vectors = self._embeddings[picks].copy()
+
+        recalls, exact_ms, ivf_ms, scanned = [], [], [], []
+        with self._lock:
+            for vector in vectors:
+                start = time.perf_counter()
+                exact_rows, _ = self._search(vector, k, exact=True)
+                exact_ms.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                ivf_rows, _ = self._search(vector, k)
+                ivf_ms.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(np.intersect1d(exact_rows, ivf_rows)) / max(len(exact_rows), 1))
+                scanned.append(len(self._probe(vector, self.n_probe)))
+
+        def percentiles(values: List[float]) -> Dict[str, float]:
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+        exact, ivf = percentiles(exact_ms), percentiles(ivf_ms)
         return {
-            "documents": self.documents[-n_results:],
-            "metadatas": self.metadatas[-n_results:]
+            "documents": len(self.ids),
+            "queries": len(vectors),
+            "k": k,
+            "n_lists": len(self._centroids),
+            "n_probe": self.n_probe,
+            "recall_at_k": float(np.mean(recalls)),
+            "mean_rows_scanned": float(np.mean(scanned)),
+            "exact_ms": exact,
+            "ivf_ms": ivf,
+            "speedup": exact["p50"] / ivf["p50"] if ivf["p50"] else None,
         }
 
+    def save(self, directory: str) -> None:
+        """
+        Write the store to a directory: embeddings and IVF arrays as .npy files (memory-mapped
+        by load), documents and metadata as JSON lines. Each file is replaced atomically, so a
+        store can be saved back to the directory it was loaded from.
+
+        Args:
+            directory: Output directory (created if missing)
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            count = len(self.ids)
+            dimensions = self._embeddings.shape[1] if self._embeddings is not None else 0
+            embeddings = self._embeddings[:count] if self._embeddings is not None else np.empty((0, 0), np.float32)
+            _save_array(os.path.join(directory, "embeddings.npy"), embeddings)
+            with _replace_file(os.path.join(directory, "records.jsonl"), "w") as f:
+                for doc_id, document, metadata in zip(self.ids, self.documents, self.metadatas):
+                    f.write(json.dumps({"id": doc_id, "document": document, "metadata": metadata}, ensure_ascii=False) + "\n")
+            if self.trained:
+                # Lists in CSR form: rows of list i are list_rows[offsets[i]:offsets[i + 1]]
+                lists = [
+                    rows[self._assignments[rows] == list_id]
+                    for list_id, rows in enumerate(
+                        np.concatenate([base, np.asarray(tail, dtype=np.int64)])
+                        for base, tail in zip(self._list_rows, self._list_tails)
+                    )
+                ]
+                offsets = np.cumsum([0] + [len(rows) for rows in lists]).astype(np.int64)
+                _save_array(os.path.join(directory, "ivf_centroids.npy"), self._centroids)
+                _save_array(os.path.join(directory, "ivf_assignments.npy"), self._assignments[:count])
+                _save_array(os.path.join(directory, "ivf_offsets.npy"), offsets)
+                _save_array(os.path.join(directory, "ivf_rows.npy"), np.concatenate(lists) if lists else np.empty(0, np.int64))
+            config = {
+                "index": self.index,
+                "n_lists": self.n_lists,
+                "n_probe": self.n_probe,
+                "ivf_train_size": self.ivf_train_size,
+                "indexed_keys": list(self._index),
+                "dimensions": dimensions,
+                "trained": self.trained,
+                "embedding_function": getattr(self.embedding_function, "identifier", None),
+            }
+        with _replace_file(os.path.join(directory, "config.json"), "w") as f:
+            json.dump(config, f, indent=2)
+
+    @classmethod
+    def load(
+        cls, directory: str, embedding_function: Optional[Callable[[List[str]], Any]] = None
+    ) -> "InMemoryVectorStore":
+        """
+        Load a store written by save. Embeddings and IVF lists are memory-mapped, so loading
+        is fast and pages are read on demand; the first insert copies the embeddings into memory.
+
+        Args:
+            directory: Directory passed to save
+            embedding_function: Embedding function for new documents and queries (should be
+                the one the store was built with)
+
+        Returns:
+            InMemoryVectorStore
+        """
+        with open(os.path.join(directory, "config.json"), encoding="utf-8") as f:
+            config = json.load(f)
+        store = cls(
+            embedding_function,
+            indexed_keys=config["indexed_keys"],
+            index=config["index"],
+            n_lists=config["n_lists"],
+            n_probe=config["n_probe"],
+            ivf_train_size=config["ivf_train_size"],
+        )
+        saved_id = config.get("embedding_function")
+        current_id = getattr(store.embedding_function, "identifier", None)
+        if saved_id and current_id and saved_id != current_id:
+            print(f"Warning: vector store in {directory} was embedded with {saved_id}, not {current_id}")
+
+        with open(os.path.join(directory, "records.jsonl"), encoding="utf-8") as f:
+            for row, line in enumerate(f):
+                record = json.loads(line)
+                store._rows[record["id"]] = row
+                store.ids.append(record["id"])
+                store.documents.append(record["document"])
+                store.metadatas.append(record["metadata"])
+                store._index_row(row, record["metadata"])
+        if store.ids:
+            store._embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+            store._capacity = len(store.ids)
+        if config["trained"]:
+            store._centroids = np.load(os.path.join(directory, "ivf_centroids.npy"))
+            store._assignments = np.load(os.path.join(directory, "ivf_assignments.npy"), mmap_mode="r")
+            offsets = np.load(os.path.join(directory, "ivf_offsets.npy"))
+            rows = np.load(os.path.join(directory, "ivf_rows.npy"), mmap_mode="r")
+            store._list_rows = [rows[offsets[i]:offsets[i + 1]] for i in range(len(store._centroids))]
+            store._list_tails = [[] for _ in range(len(store._centroids))]
+        return store
+
+
 class VectorStore:
-    def __init__(self, persist_directory: str = "data/chroma_db"):
+    def __init__(
+        self,
+        persist_directory: str = "data/chroma_db",
+        embedding_function: Optional[Callable[[List[str]], Any]] = None,
+        collection_name: str = "real_estate_chat",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        index: str = "flat",
+        write_behind: bool = True,
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        put_timeout: float = 0.05,
+    ):
         """
         Initialize the vector store.
-        
+
         Args:
             persist_directory: Directory to persist the vector store
+            embedding_function: Callable turning a list of texts into one vector per text
+                (defaults to the shared local HashingEmbeddingFunction; pass Chroma's
+                DefaultEmbeddingFunction() to use its ONNX model instead)
+            collection_name: Chroma collection to write to
+            embedding_cache: Optional embedding cache (defaults to the process-wide in-memory one;
+                pass EmbeddingCache(db_path=...) to keep embeddings across restarts). Embedding
+                functions without an ``identifier`` aren't cached unless a cache is passed,
+                which then raises ValueError
+            index: Search used by the in-memory fallback: 'flat' (exact) or 'ivf' (approximate,
+                see InMemoryVectorStore)
+            write_behind: Queue writes and apply them from a background thread in batches
+            max_queue: Most documents waiting to be written before writers are held back
+            batch_size: Most documents per batched write
+            flush_interval: Seconds a queued document may wait for its batch to fill
+            put_timeout: Seconds add_documents waits for room in a full queue before dropping
         """
+        embedding_function = embedding_function or get_default_embedding_function()
+        if not isinstance(embedding_function, CachedEmbeddingFunction):
+            if embedding_cache is not None or embedder_id(embedding_function):
+                # Raises if an explicit cache is asked for but the function has no identifier
+                embedding_function = CachedEmbeddingFunction(embedding_function, embedding_cache)
+            else:
+                print("Warning: embedding function has no identifier; its embeddings won't be cached")
+        self.embedding_function = embedding_function
+        # Stored with the collection so vectors from different embedders aren't mixed
+        current_id = embedder_id(self.embedding_function)
         try:
             import chromadb
             from chromadb.config import Settings
-            from chromadb.utils import embedding_functions
-            
+
             # Create persist directory if it doesn't exist
             os.makedirs(persist_directory, exist_ok=True)
-            
-            # Initialize ChromaDB client with default embedding function
+
+            # Initialize ChromaDB client
             self.client = chromadb.PersistentClient(
                 path=persist_directory,
                 settings=Settings(
@@ -49,85 +824,328 @@ class VectorStore:
                     allow_reset=True
                 )
             )
-            
-            # Use default embedding function
-            self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
-            
+
             # Get or create collection
             self.collection = self.client.get_or_create_collection(
-                name="real_estate_chat",
-                embedding_function=self.embedding_function
+                name=collection_name,
+                embedding_function=self.embedding_function,
+                metadata={"embedding_function": current_id} if current_id else None
             )
+            stored_id = (self.collection.metadata or {}).get("embedding_function")
+            if current_id and stored_id != current_id and self.collection.count():
+                print(
+                    f"Warning: collection '{collection_name}' was embedded with {stored_id or 'another embedding function'}, "
+                    f"not {current_id}; use a new collection_name or results will be meaningless"
+                )
             self.use_chroma = True
-            
+
         except (ImportError, RuntimeError) as e:
             print(f"Warning: ChromaDB not available, using in-memory store: {e}")
-            self.store = InMemoryVectorStore()
+            self.store = InMemoryVectorStore(self.embedding_function, index=index)
             self.use_chroma = False
 
-    def _flatten_metadata(self, metadata: Dict[str, Any]) -> Dict[str, str]:
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Tuple[str, str, Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        # Queued documents not yet written (or dropped); flush() waits for this to reach zero
+        self._unfinished = 0
+        self._idle = threading.Condition(self._stats_lock)
+        self._stats = {
+            "enqueued": 0, "written": 0, "batches": 0, "dropped": 0, "failed": 0,
+            "blocked": 0, "blocked_seconds": 0.0, "max_depth": 0,
+        }
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+        if write_behind:
+            self._writer = threading.Thread(target=self._write_loop, name="vector-store-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    @staticmethod
+    def _scalar(value: Any) -> Any:
+        # Chroma accepts str, int, float and bool; keep those so range filters (e.g. on turn) work
+        if value is None:
+            return "None"
+        return value if isinstance(value, (str, int, float, bool)) else str(value)
+
+    def _flatten_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Flatten metadata dictionary to ensure all values are strings.
-        
+        Flatten metadata dictionary to ensure all values are scalars.
+
         Args:
             metadata: Original metadata dictionary
-            
+
         Returns:
-            Flattened metadata dictionary with string values
+            Flattened metadata dictionary with str, int, float or bool values
         """
         flattened = {}
         for key, value in metadata.items():
             if isinstance(value, dict):
                 # If value is a dict (like slot_state), flatten it
                 for subkey, subvalue in value.items():
-                    flattened[f"{key}_{subkey}"] = str(subvalue) if subvalue is not None else "None"
+                    flattened[f"{key}_{subkey}"] = self._scalar(subvalue)
             else:
-                # Convert other values to string
-                flattened[key] = str(value) if value is not None else "None"
+                flattened[key] = self._scalar(value)
         return flattened
-    
-    def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]]):
+
+    def _write(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]) -> bool:
         """
-        Add documents to the vector store.
-        
+        Write documents to the backend immediately.
+
         Args:
             documents: List of document texts
             metadatas: List of metadata dictionaries
+            ids: Unique document ids
+
+        Returns:
+            True if the documents were written, False if ChromaDB rejected them (counted as failed)
         """
+        # Flatten metadata for both backends so filters and results look the same
+        flattened_metadatas = [self._flatten_metadata(meta) for meta in metadatas]
         if self.use_chroma:
             try:
-                # Flatten metadata for ChromaDB
-                flattened_metadatas = [self._flatten_metadata(meta) for meta in metadatas]
-                self.collection.add(
+                # Upsert so a retried write can't duplicate ids
+                self.collection.upsert(
                     documents=documents,
                     metadatas=flattened_metadatas,
-                    ids=[str(i) for i in range(len(documents))]
+                    ids=ids
                 )
             except Exception as e:
+                with self._stats_lock:
+                    self._stats["failed"] += len(documents)
                 print(f"Warning: Failed to add documents to ChromaDB: {e}")
+                return False
         else:
-            self.store.add_documents(documents, metadatas)
-    
-    def query(self, query_text: str, n_results: int = 5) -> Optional[List[Dict[str, Any]]]:
+            self.store.add_documents(documents, flattened_metadatas, ids)
+        return True
+
+    def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: Optional[List[str]] = None):
+        """
+        Add documents to the vector store.
+
+        With write-behind on, the documents are queued and this returns at once;
+        they become searchable after the next batched write.
+
+        Args:
+            documents: List of document texts
+            metadatas: List of metadata dictionaries
+            ids: Optional unique document ids (random ids are generated if omitted)
+        """
+        ids = ids or [uuid.uuid4().hex for _ in documents]
+        if not self.write_behind or self._closed:
+            self._write(documents, metadatas, ids)
+            return
+
+        for item in zip(ids, documents, metadatas):
+            with self._stats_lock:
+                self._unfinished += 1
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                start = time.monotonic()
+                try:
+                    self._queue.put(item, timeout=self.put_timeout)
+                    dropped = False
+                except queue.Full:
+                    dropped = True
+                with self._idle:
+                    self._stats["blocked"] += 1
+                    self._stats["blocked_seconds"] += time.monotonic() - start
+                    if dropped:
+                        self._stats["dropped"] += 1
+                        self._unfinished -= 1
+                        self._idle.notify_all()
+                if dropped:
+                    print(f"Warning: vector store write queue is full; dropped document {item[0]}")
+                    continue
+            with self._stats_lock:
+                self._stats["enqueued"] += 1
+                self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            if batch[0] is None:
+                return
+            flush_at = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            ids, documents, metadatas = (list(column) for column in zip(*batch))
+            try:
+                ok = self._write(documents, metadatas, ids)
+            except Exception as e:
+                print(f"Warning: Failed to write documents to the vector store: {e}")
+                ok = False
+                with self._stats_lock:
+                    self._stats["failed"] += len(batch)
+            with self._idle:
+                if ok:
+                    self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+                self._unfinished -= len(batch)
+                self._idle.notify_all()
+            if stop:
+                return
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued document has been written.
+
+        Args:
+            timeout: Most seconds to wait (None to wait indefinitely)
+
+        Returns:
+            True if the queue was drained, False on timeout
+        """
+        if self._writer is not None and self._writer.is_alive():
+            with self._idle:
+                return self._idle.wait_for(lambda: self._unfinished == 0, timeout)
+        return self._unfinished == 0
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Flush pending documents and stop the writer thread.
+
+        Later add_documents calls write synchronously.
+
+        Args:
+            timeout: Most seconds to wait for the flush
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self.flush(timeout)
+            self._queue.put(None)
+            self._writer.join(timeout)
+            # The exit hook holds a reference to this store, so drop it once it has nothing to do
+            atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get write-behind queue statistics.
+
+        Returns:
+            Dictionary with queue depth and capacity, documents enqueued, written,
+            dropped and failed, batches, how often (and how long) writers were
+            held back by a full queue, and the embedding cache's counters
+        """
+        with self._stats_lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats["depth"] = self._queue.qsize()
+        stats["max_queue"] = self._queue.maxsize
+        stats["write_behind"] = self.write_behind
+        cache = getattr(self.embedding_function, "cache", None)
+        stats["embedding_cache"] = cache.stats() if cache is not None else None
+        return stats
+
+    def query(
+        self,
+        query_text: str,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
         """
         Query the vector store.
-        
+
         Args:
             query_text: Query text
             n_results: Number of results to return
-            
+            where: Optional metadata filter, e.g. {"slot_state_intent": "SELL_HOME"} or {"turn": {"$gte": 3}}
+            session_id: Only search turns stored by this session
+
         Returns:
-            List of results with documents and metadata, or None if query fails
+            Chroma-shaped results ("ids", "documents", "metadatas", "distances", each a list
+            per query), or None if the query fails
         """
+        if session_id is not None:
+            scope = {"session_id": session_id}
+            where = {"$and": [scope, where]} if where else scope
         if self.use_chroma:
             try:
                 results = self.collection.query(
                     query_texts=[query_text],
-                    n_results=n_results
+                    n_results=n_results,
+                    where=where or None
                 )
                 return results
             except Exception as e:
                 print(f"Warning: Failed to query ChromaDB: {e}")
                 return None
         else:
-            return self.store.query(query_text, n_results)
+            try:
+                return self.store.query(query_text, n_results, where)
+            except Exception as e:
+                print(f"Warning: Failed to query in-memory vector store: {e}")
+                return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Report IVF recall@k and latency against brute force, on a saved store or synthetic clustered vectors."
+    )
+    parser.add_argument("--load", help="Directory written by InMemoryVectorStore.save (otherwise synthetic data is used)")
+    parser.add_argument("--documents", type=int, default=100000, help="Synthetic documents")
+    parser.add_argument("--dimensions", type=int, default=256, help="Synthetic embedding length")
+    parser.add_argument("--clusters", type=int, default=1000, help="Topics the synthetic documents are drawn around")
+    parser.add_argument("--lists", type=int, default=256, help="IVF lists")
+    parser.add_argument("--probe", type=int, default=16, help="IVF lists scored per query")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--save", help="Save the synthetic store to this directory")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    queries = None
+    if args.load:
+        start = time.perf_counter()
+        store = InMemoryVectorStore.load(args.load)
+        store.n_probe = args.probe
+        print(f"Loaded {len(store)} documents in {time.perf_counter() - start:.2f}s")
+    else:
+        rng = np.random.default_rng(args.seed)
+        topics = rng.standard_normal((args.clusters, args.dimensions)).astype(np.float32)
+
+        def sample(n: int) -> np.ndarray:
+            return topics[rng.integers(0, args.clusters, n)] + 0.5 * rng.standard_normal((n, args.dimensions)).astype(np.float32)
+
+        vectors = {"doc": sample(args.documents), "query": sample(args.queries)}
+
+        def synthetic_embedding(texts: List[str]) -> np.ndarray:
+            # Texts are "doc-<i>" or "query-<i>"; look up their pregenerated vectors
+            return np.stack([vectors[kind][int(i)] for kind, i in (text.split("-") for text in texts)])
+
+        store = InMemoryVectorStore(
+            synthetic_embedding, index="ivf", n_lists=args.lists, n_probe=args.probe, ivf_train_size=args.documents
+        )
+        start = time.perf_counter()
+        for first in range(0, args.documents, 10000):
+            batch = [f"doc-{i}" for i in range(first, min(first + 10000, args.documents))]
+            store.add_documents(batch, [{} for _ in batch], batch)
+        print(f"Built {len(store)} documents (including IVF training) in {time.perf_counter() - start:.2f}s")
+        queries = [f"query-{i}" for i in range(args.queries)]
+        if args.save:
+            store.save(args.save)
+            print(f"Saved {args.save}")
+
+    print(json.dumps(store.evaluate_index(k=args.k, n_queries=args.queries, queries=queries, seed=args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Branch-specific slot-filling prompt compiler.
+
+``SLOT_PROMPT_TEMPLATE`` sends the whole BUY and SELL rule set on every turn,
+embeds the slot state twice and puts the user's message in the middle of the
+system prompt, so no two turns share a prompt prefix. ``compile_slot_prompt``
+assembles only the rules for the current intent and next field into a
+static system prefix (identical for every session on the same branch, so the
+provider's prompt cache can reuse it), followed by a small dynamic message
+carrying the slot state once, and the user's message as its own turn.
+
+Run ``python -m src.prompts.compiler`` to compare token counts with the
+legacy template on every branch.
+"""
+import argparse
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from src.prompts.templates import (
+    SLOT_PROMPT_BASE,
+    SLOT_PROMPT_STATE,
+    SLOT_PROMPT_TEMPLATE,
+    SLOT_RULES_BUDGET,
+    SLOT_RULES_BUY,
+    SLOT_RULES_CHAT,
+    SLOT_RULES_POSTCODE,
+    SLOT_RULES_SELL,
+    SLOT_RULES_UNKNOWN_INTENT,
+)
+
+DEFAULT_PHONE = "1800 111 222"
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional; fall back to an estimate
+    _ENCODING = None
+
+
+class CompiledPrompt(NamedTuple):
+    """A compiled slot-filling prompt and its token counts."""
+
+    messages: List[Dict[str, str]]
+    static_prefix: str
+    dynamic_suffix: str
+    prefix_tokens: int
+    suffix_tokens: int
+    total_tokens: int
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with tiktoken's GPT-4o encoding, or estimate them (~4 characters per token).
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Token count
+    """
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=64)
+def static_prefix(intent: Optional[str], next_field: str, phone: str = DEFAULT_PHONE) -> str:
+    """
+    Build the cacheable system prompt for one branch.
+
+    Args:
+        intent: BUY_HOME, SELL_HOME or None if not known yet
+        next_field: Slot being collected ('chat' once every slot is filled)
+        phone: Office phone number quoted in refusals
+
+    Returns:
+        System prompt holding only the rules that apply to this branch
+    """
+    parts = [SLOT_PROMPT_BASE]
+    if intent == "BUY_HOME":
+        parts.append(SLOT_RULES_BUY)
+        if next_field == "budget":
+            parts.append(SLOT_RULES_BUDGET.format(phone=phone))
+    elif intent == "SELL_HOME":
+        parts.append(SLOT_RULES_SELL)
+    else:
+        parts.append(SLOT_RULES_UNKNOWN_INTENT)
+    if next_field == "postcode":
+        parts.append(SLOT_RULES_POSTCODE.format(phone=phone))
+    elif next_field == "chat":
+        parts.append(SLOT_RULES_CHAT)
+    return "\n\n".join(part.strip("\n") for part in parts).strip()
+
+
+def compile_slot_prompt(
+    slot_state: Dict[str, Any], next_field: str, user_message: str, phone: str = DEFAULT_PHONE
+) -> CompiledPrompt:
+    """
+    Compile the slot-filling messages for a turn.
+
+    Args:
+        slot_state: Current slot values
+        next_field: Slot to collect next
+        user_message: User's message
+        phone: Office phone number quoted in refusals
+
+    Returns:
+        CompiledPrompt with the chat messages and token counts
+    """
+    prefix = static_prefix(slot_state.get("intent"), next_field, phone)
+    suffix = SLOT_PROMPT_STATE.format(
+        state=json.dumps(slot_state, separators=(",", ":"), ensure_ascii=False, default=str),
+        next_field=next_field,
+    )
+    messages = [
+        {"role": "system", "content": prefix},
+        {"role": "system", "content": suffix},
+        {"role": "user", "content": user_message},
+    ]
+    prefix_tokens = count_tokens(prefix)
+    suffix_tokens = count_tokens(suffix)
+    return CompiledPrompt(
+        messages=messages,
+        static_prefix=prefix,
+        dynamic_suffix=suffix,
+        prefix_tokens=prefix_tokens,
+        suffix_tokens=suffix_tokens,
+        total_tokens=prefix_tokens + suffix_tokens + count_tokens(user_message),
+    )
+
+
+def legacy_prompt_tokens(slot_state: Dict[str, Any], next_field: str, user_message: str) -> int:
+    """
+    Token count of the same turn built with SLOT_PROMPT_TEMPLATE, for comparison.
+
+    Args:
+        slot_state: Current slot values
+        next_field: Slot to collect next
+        user_message: User's message
+
+    Returns:
+        Token count of the legacy system prompt plus the user message
+    """
+    prompt = SLOT_PROMPT_TEMPLATE.format(
+        state="\n".join(f"{k}: {v}" for k, v in slot_state.items()),
+        next_field=next_field,
+        user_message=user_message,
+        json=json.dumps(slot_state),
+    )
+    return count_tokens(prompt) + count_tokens(user_message)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare compiled slot prompts with the legacy template.")
+    parser.add_argument("--message", default="My name is Jane Smith", help="User message to compile with")
+    args = parser.parse_args(argv)
+
+    branches = [(None, "intent")]
+    branches += [("BUY_HOME", f) for f in ("property_type", "name", "phone", "email", "budget", "postcode", "chat")]
+    branches += [("SELL_HOME", f) for f in ("name", "phone", "email", "postcode", "chat")]
+
+    print(f"Token counts ({'tiktoken o200k_base' if _ENCODING is not None else 'estimated'})")
+    print(f"{'intent':<10} {'next field':<14} {'legacy':>7} {'compiled':>9} {'static':>7} {'saved':>6}")
+    for intent, field in branches:
+        state = {"intent": intent, "property_type": None, "name": None, "phone": None,
+                 "email": None, "budget": None, "postcode": None}
+        compiled = compile_slot_prompt(state, field, args.message)
+        legacy = legacy_prompt_tokens(state, field, args.message)
+        saved = 1 - compiled.total_tokens / legacy
+        print(f"{str(intent):<10} {field:<14} {legacy:>7} {compiled.total_tokens:>9} "
+              f"{compiled.prefix_tokens:>7} {saved:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
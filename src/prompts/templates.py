@@ -98,6 +98,19 @@ Hello! To help you best, please let me know if you’re looking to BUY_PROPERTY
 Message: {message}
 Intent:"""
 
+#──────────────────────────────────────────────────────────────────────────────
+# 📦 Batched intent prompt (several users' messages in one request)
+#──────────────────────────────────────────────────────────────────────────────
+INTENT_BATCH_TEMPLATE = """
+Classify the intent of each numbered message below as one of:
+- BUY_HOME: the user wants to buy a property
+- SELL_HOME: the user wants to sell a property
+- GENERAL_QUERY: a question or greeting about our property services
+- INVALID: anything unrelated to buying or selling property
+
+Each message comes from a different user; classify them independently.
+Reply with only a JSON object mapping every message number to its label, e.g. {"1": "BUY_HOME", "2": "GENERAL_QUERY"}."""
+
 #──────────────────────────────────────────────────────────────────────────────
 # 💬 Simple intent prompt
 #──────────────────────────────────────────────────────────────────────────────
@@ -169,3 +182,85 @@ SLOT_VALUES_END
 Only include slot fields you are confident about. Do not guess uncertain values.
 """
 
+
+#──────────────────────────────────────────────────────────────────────────────
+# ❓ Templated slot questions (used when a slot is filled without the LLM)
+#──────────────────────────────────────────────────────────────────────────────
+SLOT_QUESTIONS: Dict[str, str] = {
+    "intent": "Are you looking to buy or sell a property today?",
+    "property_type": "Are you interested in a new-build (NEW) or a resale (RESALE) property?",
+    "name": "May I have your full name, please?",
+    "phone": "Could I get your phone number next?",
+    "email": "What's your email address?",
+    "budget": "What's your budget for the property?",
+    "postcode": "What's the postcode of the area you're interested in (e.g., SW1A 1AA)?",
+    "chat": "Is there anything else I can help you with?",
+}
+
+SLOT_ACKNOWLEDGEMENTS: Dict[str, str] = {
+    "intent": "Great, you're looking to {value}.",
+    "property_type": "Got it, a {value} property.",
+    "phone": "Got it, your phone number is {value}.",
+    "email": "Got it—{value}.",
+    "budget": "Got it, a budget of £{value:,}.",
+}
+
+INTENT_LABELS: Dict[str, str] = {"BUY_HOME": "buy a property", "SELL_HOME": "sell a property"}
+PROPERTY_TYPE_LABELS: Dict[str, str] = {"NEW": "new-build", "RESALE": "resale"}
+
+BUDGET_TOO_LOW_TEMPLATE = (
+    "Sorry, we don't cater to any properties under 1 million. Please call the office on {phone} "
+    "to get help. Thank you for chatting with us. Goodbye."
+)
+
+# Used when the LLM is unavailable (errors, latency budget spent, circuit breaker open)
+LLM_FALLBACK_TEMPLATE = "Sorry, I'm having a little trouble on my side right now. {question}"
+
+#──────────────────────────────────────────────────────────────────────────────
+# 🧩 Slot-filling prompt fragments (assembled by src/prompts/compiler.py)
+#──────────────────────────────────────────────────────────────────────────────
+# Static parts come first and never contain per-turn data, so providers can cache the prefix
+SLOT_PROMPT_BASE = """
+You are a helpful real estate assistant collecting information from a user to assist with their property needs.
+
+Instructions:
+1. If the user provides valid info in their message, extract it confidently and briefly acknowledge it (e.g., "Got it, your phone number is...").
+2. Always ask clearly and naturally for the next missing field — only one at a time.
+3. If the user's message is vague (like "ok", "yes", "alright"), do not confirm anything — just move forward to the next question.
+
+At the end of your response, include the slot values from the user's message like this:
+
+SLOT_VALUES_START
+{"<field>": "<value>"}
+SLOT_VALUES_END
+
+Fields: intent (BUY_HOME or SELL_HOME), property_type (NEW or RESALE), name, phone, email, budget, postcode.
+Only include slot fields you are confident about. Do not guess uncertain values."""
+
+SLOT_RULES_UNKNOWN_INTENT = """
+The user hasn't said yet whether they want to buy or sell. Find out which, and record it as intent."""
+
+SLOT_RULES_BUY = """
+The user wants to buy (intent == BUY_HOME). Collect, in order: property_type (NEW or RESALE), name, phone, email, budget, then postcode."""
+
+SLOT_RULES_SELL = """
+The user wants to sell (intent == SELL_HOME). Collect, in order: name, phone, email, then postcode."""
+
+SLOT_RULES_BUDGET = """
+If property_type == NEW and budget < 1 million, stop and say:
+"Sorry, we don't cater to any properties under 1 million. Please call the office on {phone} to get help. Thank you for chatting with us. Goodbye."
+Otherwise, ask for the postcode."""
+
+SLOT_RULES_POSTCODE = """
+If the postcode is not covered, say:
+"Sorry, we don't cater to the postcode you provided. Please call the office on {phone} to get help."
+Else, say:
+"You can expect someone to get in touch with you within 24 hours via phone or email. Do you need help with anything else?\""""
+
+SLOT_RULES_CHAT = """
+All details are collected. If the user says they need more help, ask "How can I help you?"
+If not, end the chat with a polite thank-you message."""
+
+# Dynamic suffix: the only part that changes between turns
+SLOT_PROMPT_STATE = """Known details: {state}
+Next field to collect: {next_field}"""
@@ -0,0 +1,318 @@
+"""
+HTTP API for the Real Estate Chatbot.
+
+A lean alternative to the Streamlit app for the website chat widget: each
+request rebuilds an AsyncRealEstateChatbot from the session's stored state,
+runs one turn and saves the state back, so any worker can serve any session
+as long as the store is shared (see src.memory.session_store). Saves are
+compare-and-set on the session's version: if another worker saved the same
+session while this turn ran, the turn is not saved and the client gets a 409
+(or an 'error' event when streaming) and should resend the message.
+
+Run with:
+    python -m src.server --workers 4 --session-store sqlite:///data/sessions.db
+or directly with uvicorn:
+    uvicorn src.server:create_app --factory --workers 4
+
+Configuration is read from the environment so every uvicorn worker sees it:
+    OPENAI_API_KEY          API key for OpenRouter
+    CHATBOT_SESSION_STORE   'memory' or 'sqlite:///path' (default 'memory')
+    CHATBOT_SESSION_TTL     Seconds a session survives without a turn (default 3600)
+    CHATBOT_INTENT_THRESHOLD  Local intent classifier confidence needed to skip the LLM (default 0.8)
+    CHATBOT_INTENT_BATCH_SIZE  Most intent LLM calls packed into one request by the worker's shared
+                            AsyncIntentBatcher (default 0: no batching)
+    CHATBOT_INTENT_BATCH_WAIT  Seconds a batched intent call waits for others to join it (default 0.005)
+    CHATBOT_COMPLETION_CACHE_DB  Optional SQLite file for the completion cache, shared by all workers
+                            (default: in-memory per worker)
+    LLM_*                   HTTP connection pool settings (see src.llm.client_pool.ClientPool.from_env)
+    CHATBOT_METRICS_JSONL   Optional file every metrics event is appended to (GET /metrics serves Prometheus text)
+"""
+import argparse
+import asyncio
+import json
+import os
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from src.async_chatbot import AsyncRealEstateChatbot
+from src.chatbot import shutdown_speculation
+from src.llm.batcher import AsyncIntentBatcher
+from src.llm.cache import get_shared_completion_cache
+from src.llm.client_pool import get_shared_client_pool
+from src.llm.resilience import get_shared_resilient_caller
+from src.memory.session_store import SessionConflict, SessionStore, create_session_store
+from src.utils.metrics import get_metrics
+from src.utils.postcode_validator import get_shared_postcode_index
+
+GREETING = "I'm real estate chatbot. How can I help you with buying or selling a property?"
+
+
+class ChatRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    session_id: str
+    response: str
+    slots: Dict[str, Any]
+
+
+class SessionResponse(BaseModel):
+    session_id: str
+    slots: Dict[str, Any]
+    history: List[Dict[str, Any]]
+
+
+class ChatService:
+    """Runs chat turns against a session store, one turn per session at a time."""
+
+    def __init__(
+        self,
+        api_key: str,
+        store: SessionStore,
+        intent_threshold: float = 0.8,
+        intent_batch_size: int = 0,
+        intent_batch_wait: float = 0.005,
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            api_key: OpenAI API key
+            store: Session state store
+            intent_threshold: Minimum local classifier confidence to skip the LLM for intents
+            intent_batch_size: Most intent LLM calls packed into one request (0 or 1 disables batching)
+            intent_batch_wait: Seconds a batched intent call waits for others to join it
+        """
+        self.api_key = api_key
+        self.store = store
+        self.intent_threshold = intent_threshold
+        # One API client (and so one connection pool) per worker, shared by every session
+        self.client = get_shared_client_pool().async_openai_client(api_key)
+        # Likewise one batcher, so concurrent sessions' intent calls can share a request
+        self.intent_batcher: Optional[AsyncIntentBatcher] = None
+        if intent_batch_size > 1:
+            self.intent_batcher = AsyncIntentBatcher(
+                self.client, max_batch_size=intent_batch_size, max_wait=intent_batch_wait
+            )
+        # Serializes concurrent turns for the same session within this worker
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    async def load(self, session_id: str) -> Tuple[AsyncRealEstateChatbot, int]:
+        """
+        Build a chatbot holding a session's state.
+
+        Args:
+            session_id: Session identifier (unknown sessions start empty)
+
+        Returns:
+            Tuple of (chatbot ready for the next turn, stored version to pass to save)
+        """
+        chatbot = AsyncRealEstateChatbot(
+            api_key=self.api_key,
+            client=self.client,
+            intent_threshold=self.intent_threshold,
+            intent_batcher=self.intent_batcher,
+            session_id=session_id,
+        )
+        state, version = await asyncio.to_thread(self.store.get_versioned, session_id)
+        if state is not None:
+            chatbot.load_state(state)
+        return chatbot, version
+
+    async def save(self, session_id: str, chatbot: AsyncRealEstateChatbot, version: int) -> None:
+        """
+        Save a chatbot's state unless the session changed since it was loaded.
+
+        Args:
+            session_id: Session identifier
+            chatbot: Chatbot after its turn
+            version: Version returned by load
+
+        Raises:
+            SessionConflict: Another worker saved the session in between
+        """
+        saved = await asyncio.to_thread(self.store.set_if_version, session_id, chatbot.export_state(), version)
+        if not saved:
+            raise SessionConflict(f"Session {session_id} was updated by another request")
+
+    async def close(self) -> None:
+        """Finish the intent batches in flight."""
+        if self.intent_batcher is not None:
+            await self.intent_batcher.close()
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+
+
+def create_app(service: Optional[ChatService] = None) -> FastAPI:
+    """
+    Build the FastAPI application.
+
+    Args:
+        service: Optional ChatService (defaults to one configured from the environment)
+
+    Returns:
+        FastAPI app
+    """
+    if service is None:
+        store = create_session_store(
+            os.getenv("CHATBOT_SESSION_STORE"), ttl=float(os.getenv("CHATBOT_SESSION_TTL", "3600"))
+        )
+        service = ChatService(
+            os.getenv("OPENAI_API_KEY", ""),
+            store,
+            intent_threshold=float(os.getenv("CHATBOT_INTENT_THRESHOLD", "0.8")),
+            intent_batch_size=int(os.getenv("CHATBOT_INTENT_BATCH_SIZE", "0")),
+            intent_batch_wait=float(os.getenv("CHATBOT_INTENT_BATCH_WAIT", "0.005")),
+        )
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        # Load the postcode data before serving, so the first requests don't pay for it
+        await asyncio.to_thread(AsyncRealEstateChatbot.warm_up)
+        yield
+        shutdown_speculation()
+        await service.close()
+        await get_shared_client_pool().aclose()
+
+    api = FastAPI(title="Real Estate Chatbot API", lifespan=lifespan)
+    api.state.service = service
+
+    @api.exception_handler(SessionConflict)
+    async def session_conflict(_: Request, exc: SessionConflict) -> JSONResponse:
+        return JSONResponse(status_code=409, content={"detail": f"{exc}; resend the message"})
+
+    @api.get("/health")
+    async def health() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @api.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        return {
+            "http_pool": get_shared_client_pool().stats(),
+            "completion_cache": get_shared_completion_cache().stats(),
+            "llm_calls": get_shared_resilient_caller().stats(),
+            "postcode_index": get_shared_postcode_index().stats(),
+            "intent_batcher": service.intent_batcher.stats() if service.intent_batcher else None,
+            "metrics": get_metrics().summary(),
+        }
+
+    @api.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(get_metrics().export_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+    @api.post("/sessions", response_model=ChatResponse)
+    async def create_session() -> ChatResponse:
+        session_id = uuid.uuid4().hex
+        chatbot, version = await service.load(session_id)
+        await service.save(session_id, chatbot, version)
+        return ChatResponse(session_id=session_id, response=GREETING, slots=chatbot.slot_state)
+
+    @api.get("/sessions/{session_id}", response_model=SessionResponse)
+    async def get_session(session_id: str) -> SessionResponse:
+        state = await asyncio.to_thread(service.store.get, session_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Unknown session")
+        return SessionResponse(
+            session_id=session_id, slots=state["slot_state"], history=state["conversation_history"]
+        )
+
+    @api.delete("/sessions/{session_id}")
+    async def delete_session(session_id: str) -> Dict[str, str]:
+        await asyncio.to_thread(service.store.delete, session_id)
+        return {"session_id": session_id}
+
+    @api.post("/chat", response_model=ChatResponse)
+    async def chat(request: ChatRequest) -> ChatResponse:
+        session_id = request.session_id or uuid.uuid4().hex
+        async with service.lock(session_id):
+            chatbot, version = await service.load(session_id)
+            entry = await chatbot.process_message(request.message)
+            await service.save(session_id, chatbot, version)
+        return ChatResponse(session_id=session_id, response=entry["assistant_response"], slots=entry["slots"])
+
+    @api.post("/chat/stream")
+    async def chat_stream(request: ChatRequest) -> StreamingResponse:
+        """
+        Stream a turn as server-sent events.
+
+        'delta' events carry response text as it is generated; a final 'done'
+        event carries the complete response (postcode checks may have replaced
+        the streamed text) and the slot values.
+        """
+        session_id = request.session_id or uuid.uuid4().hex
+
+        async def events() -> AsyncIterator[str]:
+            async with service.lock(session_id):
+                chatbot, version = await service.load(session_id)
+                try:
+                    async for piece in chatbot.process_message_stream(request.message):
+                        yield _sse({"text": piece}, "delta")
+                except Exception as e:
+                    print(f"Error streaming response: {e}")
+                    yield _sse({"session_id": session_id, "detail": "Error generating response"}, "error")
+                    return
+                try:
+                    await service.save(session_id, chatbot, version)
+                except SessionConflict as e:
+                    yield _sse({"session_id": session_id, "detail": f"{e}; resend the message"}, "error")
+                    return
+                entry = chatbot.conversation_history[-1]
+                yield _sse(
+                    {"session_id": session_id, "response": entry["assistant_response"], "slots": entry["slots"]},
+                    "done",
+                )
+
+        return StreamingResponse(
+            events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    return api
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the Real Estate Chatbot over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Number of uvicorn worker processes")
+    parser.add_argument(
+        "--session-store",
+        help="'memory' or 'sqlite:///path' (defaults to $CHATBOT_SESSION_STORE, "
+        "or data/sessions.db when running more than one worker)",
+    )
+    args = parser.parse_args(argv)
+
+    store = args.session_store or os.getenv("CHATBOT_SESSION_STORE")
+    if store is None and args.workers > 1:
+        # In-memory sessions would be private to each worker, so share them through SQLite
+        store = "sqlite:///" + os.path.join("data", "sessions.db")
+    if store == "memory" and args.workers > 1:
+        print("Warning: In-memory sessions are not shared between workers; use a sqlite:/// store")
+    if store:
+        os.environ["CHATBOT_SESSION_STORE"] = store
+
+    uvicorn.run("src.server:create_app", host=args.host, port=args.port, workers=args.workers, factory=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Service-area coverage engine.
+
+Coverage is configured per branch office in ``data/coverage.json`` as postcode
+areas (``"SW"``), districts (``"SW1A"``, ``"SW1"`` or ranges like
+``"SW1-SW20"``) and sectors (``"SW1A 1"``). Each office is compiled into a
+bitset over every possible outward code plus a set of sectors, so a coverage
+check is one regex split and two constant-time lookups. The config file is
+re-read when it changes on disk, without restarting the app.
+"""
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from src.utils.data_loader import load_config
+
+# Outward codes are encoded as ((area letter 1, area letter 2) * 100 + district number) * 27 + district letter,
+# with 0 standing for "no letter", so one office's coverage fits in a ~240 KB bitset
+_LETTERS = 27
+_DISTRICT_NUMBERS = 100
+_AREA_BLOCK = _DISTRICT_NUMBERS * _LETTERS
+_BITSET_SIZE = _LETTERS * _LETTERS * _AREA_BLOCK
+
+_OUTWARD_RE = re.compile(r'^([A-Z])([A-Z]?)([0-9]{1,2})([A-Z]?)$')
+_AREA_RE = re.compile(r'^[A-Z]{1,2}$')
+# Hyphen, en dash or em dash between the ends ('SW1-SW20', 'SW1–SW20')
+_DISTRICT_RANGE_RE = re.compile(r'^([A-Z]{1,2})([0-9]{1,2})\s*[-\u2013\u2014]\s*([A-Z]{1,2})?([0-9]{1,2})$')
+_SECTOR_RE = re.compile(r'^([A-Z]{1,2}[0-9][A-Z0-9]?)\s*([0-9])$')
+
+DEFAULT_COVERAGE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'coverage.json'
+)
+
+# Process-wide coverage engines, keyed by config path (see get_shared_coverage_engine)
+_shared_engines: Dict[str, "CoverageEngine"] = {}
+_shared_engines_lock = threading.Lock()
+
+DEFAULT_COVERAGE_CONFIG: Dict[str, Any] = {
+    "default_office": "south_west_london",
+    "offices": {
+        "south_west_london": {
+            "name": "South West London",
+            "description": "the SW (South West London) area",
+            "phone": "1800 111 222",
+            "areas": ["SW"],
+        }
+    },
+}
+
+
+def _letter(ch: str) -> int:
+    return ord(ch) - ord("A") + 1 if ch else 0
+
+
+def _area_slot(area: str) -> int:
+    return _letter(area[0]) * _LETTERS + _letter(area[1:2])
+
+
+def outward_slot(outward: str) -> Optional[int]:
+    """
+    Position of an outward code in the coverage bitset.
+
+    Args:
+        outward: Outward code (e.g. 'SW1A')
+
+    Returns:
+        Bit index, or None if the string is not a valid outward code
+    """
+    match = _OUTWARD_RE.match(outward)
+    if match is None:
+        return None
+    a1, a2, number, suffix = match.groups()
+    return ((_letter(a1) * _LETTERS + _letter(a2)) * _DISTRICT_NUMBERS + int(number)) * _LETTERS + _letter(suffix)
+
+
+def split_postcode(postcode: str) -> Tuple[str, str]:
+    """
+    Split a postcode into outward and inward codes.
+
+    Args:
+        postcode: Postcode in any spacing or case (an outward code on its own is allowed)
+
+    Returns:
+        Tuple of (outward, inward); inward is empty for a bare outward code
+    """
+    compact = "".join(postcode.split()).upper()
+    # Outward codes are at most 4 characters and full postcodes at least 5
+    if len(compact) >= 5:
+        return compact[:-3], compact[-3:]
+    return compact, ""
+
+
+class OfficeCoverage:
+    """Compiled coverage for one branch office."""
+
+    def __init__(self, key: str, config: Dict[str, Any]):
+        """
+        Compile an office's coverage.
+
+        Args:
+            key: Office key in the config file
+            config: Office section with name, description, phone, areas, districts and sectors
+        """
+        self.key = key
+        self.name: str = config.get("name", key)
+        self.description: str = config.get("description", self.name)
+        self.phone: str = config.get("phone", "")
+
+        self._bits = bytearray(_BITSET_SIZE // 8 + 1)
+        for area in config.get("areas", []):
+            area = area.strip().upper()
+            if not _AREA_RE.match(area):
+                raise ValueError(f"Invalid postcode area '{area}' for office '{key}'")
+            start = _area_slot(area) * _AREA_BLOCK
+            self._set_range(start, start + _AREA_BLOCK)
+
+        for district in config.get("districts", []):
+            for outward, whole_district in self._expand_district(district.strip().upper()):
+                slot = outward_slot(outward)
+                if slot is None:
+                    raise ValueError(f"Invalid district '{district}' for office '{key}'")
+                # 'SW1' also covers its lettered sub-districts (SW1A, SW1E, ...)
+                self._set_range(slot, slot + (_LETTERS if whole_district else 1))
+
+        sectors = set()
+        for sector in config.get("sectors", []):
+            match = _SECTOR_RE.match(sector.strip().upper())
+            if match is None:
+                raise ValueError(f"Invalid sector '{sector}' for office '{key}'")
+            sectors.add(f"{match.group(1)} {match.group(2)}")
+        self.sectors: FrozenSet[str] = frozenset(sectors)
+
+    @staticmethod
+    def _expand_district(district: str) -> Iterable[Tuple[str, bool]]:
+        match = _DISTRICT_RANGE_RE.match(district)
+        # A range can't span areas ('SW1-E20') or run backwards ('SW20-SW1'); left as is,
+        # it fails as an invalid outward code
+        if (
+            match is not None
+            and match.group(3) in (None, match.group(1))
+            and int(match.group(2)) <= int(match.group(4))
+        ):
+            area, first, last = match.group(1), int(match.group(2)), int(match.group(4))
+            return [(f"{area}{n}", True) for n in range(first, last + 1)]
+        return [(district, not district[-1].isalpha())]
+
+    def _set_range(self, start: int, stop: int) -> None:
+        for i in range(start, stop):
+            self._bits[i >> 3] |= 1 << (i & 7)
+
+    def covers_outward(self, outward: str) -> bool:
+        """
+        Check whether a whole outward code is covered.
+
+        Args:
+            outward: Outward code (e.g. 'SW1A')
+
+        Returns:
+            True if every postcode in the outward code is covered
+        """
+        slot = outward_slot(outward.strip().upper())
+        return slot is not None and bool(self._bits[slot >> 3] & (1 << (slot & 7)))
+
+    def covers(self, postcode: str) -> bool:
+        """
+        Check whether a postcode is covered.
+
+        Args:
+            postcode: Postcode in any spacing or case
+
+        Returns:
+            True if the postcode's outward code or sector is covered
+        """
+        outward, inward = split_postcode(postcode)
+        if self.covers_outward(outward):
+            return True
+        return bool(inward) and f"{outward} {inward[0]}" in self.sectors
+
+
+class CoverageEngine:
+    """
+    Coverage lookups for every branch office, hot-reloaded from a config file.
+    """
+
+    def __init__(self, config_path: str = None, reload_interval: float = 1.0):
+        """
+        Load and compile the coverage config.
+
+        Args:
+            config_path: Optional path to the config file (defaults to data/coverage.json)
+            reload_interval: Minimum seconds between checks of the file's modification time
+        """
+        self.config_path = config_path or DEFAULT_COVERAGE_FILE
+        self.reload_interval = reload_interval
+
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[float, int]] = None
+        self._last_check = 0.0
+        # (offices, default office key), replaced as one object so readers never see a half-swapped config
+        self._state: Tuple[Dict[str, OfficeCoverage], str] = ({}, "")
+        # Office keys already warned about in office(), so each is reported once
+        self._unknown_offices: Set[str] = set()
+
+        if not self.reload():
+            print(f"Warning: Using built-in coverage (SW area only), could not load {self.config_path}")
+            self._install(DEFAULT_COVERAGE_CONFIG)
+
+    def _install(self, config: Dict[str, Any]) -> None:
+        offices_config = config.get("offices") or {"default": config}
+        offices = {key: OfficeCoverage(key, section) for key, section in offices_config.items()}
+        default_office = config.get("default_office") or next(iter(offices))
+        if default_office not in offices:
+            raise ValueError(f"Unknown default office '{default_office}'")
+        self._state = (offices, default_office)
+
+    def _file_stamp(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def reload(self) -> bool:
+        """
+        Re-read and recompile the config file.
+
+        A config that fails to load or compile is reported and ignored, so the
+        previous coverage stays in effect.
+
+        Returns:
+            True if new coverage was installed, False otherwise
+        """
+        with self._lock:
+            stamp = self._file_stamp()
+            self._stamp = stamp
+            if stamp is None:
+                return False
+            config = load_config(self.config_path)
+            if not config:
+                return False
+            try:
+                self._install(config)
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"Error compiling coverage config: {e}")
+                return False
+            return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        stamp = self._file_stamp()
+        if stamp is not None and stamp != self._stamp:
+            self.reload()
+
+    @property
+    def default_office(self) -> str:
+        self._maybe_reload()
+        return self._state[1]
+
+    def office(self, name: str = None) -> OfficeCoverage:
+        """
+        Get an office's compiled coverage.
+
+        Args:
+            name: Office key (defaults to the configured default office)
+
+        Returns:
+            OfficeCoverage for the office, or the default office's if the office is not
+            configured (e.g. a reload removed it while sessions still refer to it)
+        """
+        self._maybe_reload()
+        offices, default_office = self._state
+        coverage = offices.get(name or default_office)
+        if coverage is None:
+            if name not in self._unknown_offices:
+                self._unknown_offices.add(name)
+                print(f"Warning: Unknown office '{name}', using the default office '{default_office}'")
+            coverage = offices[default_office]
+        return coverage
+
+    def offices(self) -> List[str]:
+        """
+        List the configured office keys.
+
+        Returns:
+            Office keys in config order
+        """
+        self._maybe_reload()
+        return list(self._state[0])
+
+    def is_covered(self, postcode: str, office: str = None) -> bool:
+        """
+        Check whether an office covers a postcode.
+
+        Args:
+            postcode: Postcode in any spacing or case
+            office: Office key (defaults to the configured default office)
+
+        Returns:
+            True if the postcode is covered, False otherwise
+        """
+        return self.office(office).covers(postcode)
+
+    def covering_offices(self, postcode: str) -> List[str]:
+        """
+        Find every office that covers a postcode.
+
+        Args:
+            postcode: Postcode in any spacing or case
+
+        Returns:
+            Keys of the offices covering the postcode
+        """
+        self._maybe_reload()
+        return [key for key, coverage in self._state[0].items() if coverage.covers(postcode)]
+
+
+def get_shared_coverage_engine(config_path: str = None) -> CoverageEngine:
+    """
+    Get the process-wide CoverageEngine for a config file.
+
+    Engines hot-reload their config, so one per process is enough for every
+    chatbot session.
+
+    Args:
+        config_path: Optional path to the config file (defaults to data/coverage.json)
+
+    Returns:
+        Shared CoverageEngine
+    """
+    key = os.path.abspath(config_path or DEFAULT_COVERAGE_FILE)
+    engine = _shared_engines.get(key)
+    if engine is not None:
+        return engine
+
+    with _shared_engines_lock:
+        engine = _shared_engines.get(key)
+        if engine is None:
+            engine = CoverageEngine(key)
+            _shared_engines[key] = engine
+        return engine
@@ -1,6 +1,8 @@
 """
 Data loading utilities.
 """
+import json
+import os
 import pandas as pd
 from typing import Dict, Any, Optional
 
@@ -22,13 +24,22 @@ def load_csv_data(file_path: str) -> Optional[pd.DataFrame]:
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """
-    Load configuration from a file.
+    Load configuration from a JSON or TOML file.
     
     Args:
-        config_path: Path to the configuration file
+        config_path: Path to the configuration file (.json or .toml)
         
     Returns:
-        Dictionary containing configuration
+        Dictionary containing configuration, or an empty dictionary if loading fails
     """
-    # TODO: Implement configuration loading
-    return {} 
\ No newline at end of file
+    try:
+        if os.path.splitext(config_path)[1].lower() == ".toml":
+            import tomllib
+
+            with open(config_path, "rb") as f:
+                return tomllib.load(f)
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading config: {e}")
+        return {} 
\ No newline at end of file
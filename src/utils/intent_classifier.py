@@ -0,0 +1,291 @@
+"""
+Local intent classifier: hashed n-gram features and a softmax linear model in NumPy.
+
+Filling the intent slot (and ``detect_intent``) only has to pick one of four
+labels, so a gpt-4o round trip is overkill for most messages. ``IntentClassifier`` hashes word
+unigrams, word bigrams and character trigrams into a fixed-size feature
+vector and scores it with one weight matrix; a prediction takes under
+100 microseconds. Messages it isn't confident about still go to the LLM.
+
+The model is trained from labelled examples (``src/data/intent_examples.jsonl``)
+plus intents harvested from logged conversations, and saved next to the code
+as ``src/data/intent_model.npz``:
+
+    python -m src.utils.intent_classifier --sessions sqlite:///data/sessions.db
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INTENT_LABELS = ("BUY_HOME", "SELL_HOME", "GENERAL_QUERY", "INVALID")
+
+_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+DEFAULT_MODEL_PATH = os.path.join(_DATA_DIR, "intent_model.npz")
+DEFAULT_EXAMPLES_PATH = os.path.join(_DATA_DIR, "intent_examples.jsonl")
+
+_WORD_RE = re.compile(r"[a-z0-9£']+")
+
+# Process-wide classifier shared by every chatbot session (see get_shared_intent_classifier)
+_shared_classifier: Optional["IntentClassifier"] = None
+_shared_classifier_loaded = False
+_shared_classifier_lock = threading.Lock()
+
+
+def _features(text: str) -> List[str]:
+    words = _WORD_RE.findall(text.lower())
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return grams
+
+
+@lru_cache(maxsize=65536)
+def _bucket(gram: str, n_features: int) -> int:
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(gram.encode("utf-8")) % n_features
+
+
+class IntentClassifier:
+    """Multinomial logistic regression over hashed n-gram features."""
+
+    def __init__(self, n_features: int = 4096, labels: Sequence[str] = INTENT_LABELS):
+        """
+        Initialize an untrained classifier.
+
+        Args:
+            n_features: Size of the hashed feature space
+            labels: Class labels, in output order
+        """
+        self.n_features = n_features
+        self.labels = tuple(labels)
+        self.weights = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+
+    def _indices(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        counts: Dict[int, int] = {}
+        for gram in _features(text):
+            index = _bucket(gram, self.n_features)
+            counts[index] = counts.get(index, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        norm = np.sqrt(np.dot(values, values))
+        return indices, values / norm if norm else values
+
+    def vectorize(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Turn messages into L2-normalised hashed feature vectors.
+
+        Args:
+            texts: Messages
+
+        Returns:
+            Dense array of shape (len(texts), n_features)
+        """
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, values = self._indices(text)
+            matrix[row, indices] = values
+        return matrix
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        epochs: int = 1000,
+        learning_rate: float = 1.0,
+        l2: float = 1e-4,
+    ) -> "IntentClassifier":
+        """
+        Train with full-batch gradient descent on the cross-entropy loss.
+
+        Args:
+            texts: Training messages
+            labels: Intent label for each message
+            epochs: Gradient steps
+            learning_rate: Step size
+            l2: L2 regularisation strength
+
+        Returns:
+            self
+        """
+        x = self.vectorize(texts)
+        y = np.zeros((len(labels), len(self.labels)), dtype=np.float32)
+        y[np.arange(len(labels)), [self.labels.index(label) for label in labels]] = 1.0
+        # Weight classes inversely to their frequency so BUY_HOME examples don't dominate
+        class_weights = len(labels) / (len(self.labels) * np.maximum(y.sum(axis=0), 1.0))
+        sample_weights = (y * class_weights).sum(axis=1, keepdims=True) / len(labels)
+
+        for _ in range(epochs):
+            probabilities = self._softmax(x @ self.weights + self.bias)
+            error = (probabilities - y) * sample_weights
+            self.weights -= learning_rate * (x.T @ error + l2 * self.weights)
+            self.bias -= learning_rate * error.sum(axis=0)
+        return self
+
+    @staticmethod
+    def _softmax(scores: np.ndarray) -> np.ndarray:
+        scores = scores - scores.max(axis=-1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """
+        Get the probability of each intent.
+
+        Args:
+            text: User's message
+
+        Returns:
+            Dictionary mapping each label to its probability
+        """
+        indices, values = self._indices(text)
+        probabilities = self._softmax(values @ self.weights[indices] + self.bias)
+        return dict(zip(self.labels, probabilities.tolist()))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Classify a message.
+
+        Args:
+            text: User's message
+
+        Returns:
+            Tuple of (most likely intent, its probability)
+        """
+        indices, values = self._indices(text)
+        probabilities = self._softmax(values @ self.weights[indices] + self.bias)
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path: str = DEFAULT_MODEL_PATH) -> None:
+        """
+        Save the model as a compressed .npz file.
+
+        Args:
+            path: Output file
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "IntentClassifier":
+        """
+        Load a model written by save.
+
+        Args:
+            path: Model file
+
+        Returns:
+            IntentClassifier
+        """
+        with np.load(path) as data:
+            classifier = cls(n_features=data["weights"].shape[0], labels=[str(label) for label in data["labels"]])
+            classifier.weights = data["weights"].astype(np.float32)
+            classifier.bias = data["bias"].astype(np.float32)
+        return classifier
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """
+    Read labelled examples from a JSONL file of {"message": ..., "intent": ...} lines.
+
+    Args:
+        path: JSONL file
+
+    Returns:
+        List of (message, intent) pairs
+    """
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                examples.append((record["message"], record["intent"]))
+    return examples
+
+
+def harvest_examples(states: Iterable[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """
+    Label logged conversations: the message that first set a session's intent slot
+    is an example of that intent, if the LLM labelled it.
+
+    Intents filled by this classifier or the keyword extractor are skipped, so the
+    model isn't retrained on its own predictions (and histories logged before turns
+    recorded their intent_source are skipped too, since their labels can't be told apart).
+
+    Args:
+        states: Session states as saved by RealEstateChatbot.export_state
+
+    Returns:
+        List of (message, intent) pairs
+    """
+    examples = []
+    for state in states:
+        for entry in state.get("conversation_history", []):
+            intent = (entry.get("slots") or {}).get("intent")
+            if intent is not None:
+                if intent in INTENT_LABELS and entry.get("intent_source") == "llm":
+                    examples.append((entry["user_message"], intent))
+                break
+    return examples
+
+
+def get_shared_intent_classifier(path: str = DEFAULT_MODEL_PATH) -> Optional[IntentClassifier]:
+    """
+    Get the process-wide intent classifier.
+
+    Args:
+        path: Model file
+
+    Returns:
+        Shared IntentClassifier, or None if no model has been trained
+    """
+    global _shared_classifier, _shared_classifier_loaded
+    if not _shared_classifier_loaded:
+        with _shared_classifier_lock:
+            if not _shared_classifier_loaded:
+                try:
+                    if os.path.exists(path):
+                        _shared_classifier = IntentClassifier.load(path)
+                except Exception as e:
+                    print(f"Error loading intent classifier: {e}")
+                _shared_classifier_loaded = True
+    return _shared_classifier
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from src.memory.session_store import create_session_store
+
+    parser = argparse.ArgumentParser(description="Train the local intent classifier.")
+    parser.add_argument("--examples", default=DEFAULT_EXAMPLES_PATH, help="JSONL file of labelled messages")
+    parser.add_argument("--sessions", help="Session store to harvest logged conversations from (e.g. sqlite:///data/sessions.db)")
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH, help="Where to save the model")
+    parser.add_argument("--features", type=int, default=4096, help="Size of the hashed feature space")
+    parser.add_argument("--epochs", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    examples = load_examples(args.examples)
+    if args.sessions:
+        harvested = harvest_examples(create_session_store(args.sessions).states())
+        print(f"Harvested {len(harvested)} examples from {args.sessions}")
+        examples += harvested
+    texts, labels = zip(*examples)
+
+    classifier = IntentClassifier(n_features=args.features).fit(texts, labels, epochs=args.epochs)
+    correct = sum(classifier.predict(text)[0] == label for text, label in examples)
+    print(f"Trained on {len(examples)} examples; training accuracy {correct / len(examples):.1%}")
+    classifier.save(args.output)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+In-process metrics for the chatbot: stage latencies, token usage and cache hits.
+
+``MetricsRegistry`` keeps labelled counters and histograms. Histograms keep
+Prometheus-style cumulative buckets for export plus a window of recent
+samples for exact p50/p95/p99. Every observation can also be appended to a
+JSONL file as an event, for offline analysis.
+
+Instrumented stages (see RealEstateChatbot):
+    turn                   whole process_message call
+    llm                    one chat completion (labels: model, cache=hit/miss/batched)
+    intent_classification  local intent classifier (intent slot and detect_intent)
+    postcode_validation    validate_user_postcode
+    slot_extraction        extract_slot_block on a completion
+    vector_store_write     one turn written to the vector store
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRIC_HELP = {
+    "stage_seconds": "Wall time per chatbot stage",
+    "llm_calls_total": "Chat completion requests, by cache outcome",
+    "llm_tokens_total": "Tokens reported by completion.usage",
+    "intent_predictions_total": "Intent answers, by source (local classifier, keyword extractor or LLM)",
+    "intent_batch_size": "Messages per batched intent request",
+    "speculation_total": "Prepared next turns, by outcome (hit, prompt, stale, pending, skipped)",
+    "embedding_cache_total": "Embedding lookups, by result (hit, disk_hit, miss)",
+}
+
+# Process-wide registry shared by every chatbot session (see get_metrics)
+_shared_registry: Optional["MetricsRegistry"] = None
+_shared_registry_lock = threading.Lock()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Histogram:
+    """Cumulative buckets plus a sliding window of samples for quantiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, window: int = 4096):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self._samples.append(value)
+
+    def quantiles(self, qs: Tuple[float, ...] = QUANTILES) -> Dict[str, Optional[float]]:
+        """
+        Quantiles over the recent sample window.
+
+        Args:
+            qs: Quantiles between 0 and 1
+
+        Returns:
+            Dictionary like {'p50': ..., 'p95': ..., 'p99': ...} (None when empty)
+        """
+        if not self._samples:
+            return {f"p{round(q * 100):g}": None for q in qs}
+        values = np.quantile(np.fromiter(self._samples, dtype=float), qs)
+        return {f"p{round(q * 100):g}": float(v) for q, v in zip(qs, values)}
+
+
+class MetricsRegistry:
+    """Labelled counters and histograms with Prometheus and JSONL export."""
+
+    def __init__(self, jsonl_path: Optional[str] = None, namespace: str = "chatbot"):
+        """
+        Initialize the registry.
+
+        Args:
+            jsonl_path: Optional file every observation is appended to as a JSON line
+            namespace: Prefix for exported metric names
+        """
+        self.namespace = namespace
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = dict(METRIC_HELP)
+        self._jsonl = None
+        if jsonl_path:
+            os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+            self._jsonl = open(jsonl_path, "a", buffering=1, encoding="utf-8")
+
+    def describe(self, name: str, help_text: str) -> None:
+        """
+        Set the HELP text exported for a metric.
+
+        Args:
+            name: Metric name (without namespace)
+            help_text: One-line description
+        """
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """
+        Add a sample to a histogram.
+
+        Args:
+            name: Histogram name (without namespace)
+            value: Sample value
+            **labels: Label values
+        """
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(name, {}).get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name: Counter name (without namespace)
+            amount: Amount to add
+            **labels: Label values
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """
+        Append an event to the JSONL log, if one is configured.
+
+        Args:
+            event: JSON-serializable event (a 'ts' timestamp is added)
+        """
+        if self._jsonl is None:
+            return
+        line = json.dumps({"ts": time.time(), **event}, ensure_ascii=False, default=str)
+        with self._lock:
+            self._jsonl.write(line + "\n")
+
+    @contextmanager
+    def timer(self, stage: str, **labels) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block as one observation of a stage.
+
+        The yielded dictionary can be filled with extra fields for the JSONL
+        event (e.g. token counts); they are not used as labels.
+
+        Args:
+            stage: Stage name
+            **labels: Label values
+
+        Yields:
+            Dictionary of extra event fields
+        """
+        extra: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_seconds", elapsed, stage=stage, **labels)
+            self.emit({"stage": stage, "seconds": elapsed, **labels, **extra})
+
+    def quantiles(self, name: str, **labels) -> Dict[str, Optional[float]]:
+        """
+        p50/p95/p99 of one histogram series.
+
+        Args:
+            name: Histogram name
+            **labels: Label values identifying the series
+
+        Returns:
+            Dictionary of quantiles (None when there are no samples)
+        """
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            return histogram.quantiles() if histogram is not None else Histogram().quantiles()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Snapshot every series.
+
+        Returns:
+            {'histograms': [...], 'counters': [...]}, each series with its name and labels;
+            histograms carry count, sum and p50/p95/p99
+        """
+        with self._lock:
+            histograms = [
+                {"name": name, "labels": dict(key), "count": h.count, "sum": h.sum, **h.quantiles()}
+                for name, series in self._histograms.items()
+                for key, h in series.items()
+            ]
+            counters = [
+                {"name": name, "labels": dict(key), "value": value}
+                for name, series in self._counters.items()
+                for key, value in series.items()
+            ]
+        return {"histograms": histograms, "counters": counters}
+
+    def export_prometheus(self) -> str:
+        """
+        Render every series in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {full} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in series.items():
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {full} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{full}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{full}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def export_jsonl(self, path: str) -> None:
+        """
+        Write the current summary to a file, one series per line.
+
+        Args:
+            path: Output file (overwritten)
+        """
+        summary = self.summary()
+        with open(path, "w", encoding="utf-8") as f:
+            for kind in ("histograms", "counters"):
+                for series in summary[kind]:
+                    f.write(json.dumps({"kind": kind[:-1], **series}, ensure_ascii=False) + "\n")
+
+    def reset(self) -> None:
+        """Drop every series."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def close(self) -> None:
+        """Close the JSONL event log."""
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Get the process-wide registry; set CHATBOT_METRICS_JSONL to also log every event to a file.
+
+    Returns:
+        Shared MetricsRegistry
+    """
+    global _shared_registry
+    if _shared_registry is None:
+        with _shared_registry_lock:
+            if _shared_registry is None:
+                _shared_registry = MetricsRegistry(jsonl_path=os.getenv("CHATBOT_METRICS_JSONL") or None)
+    return _shared_registry
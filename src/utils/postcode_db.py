@@ -0,0 +1,328 @@
+"""
+Compiled, memory-mapped UK postcode database.
+
+``compile_postcode_db`` turns a postcode CSV into a sorted binary file of
+fixed-width 7-byte postcodes (outward code padded to 4 characters followed by
+the 3-character inward code, e.g. ``b"E1  1AA"``) plus an outward-code offset
+table. ``MappedPostcodeDB`` mmaps that file and answers lookups with a dict
+hit on the outward code and a binary search inside its block, so every worker
+process shares the same pages instead of parsing the CSV into its own
+DataFrame.
+
+File layout (little endian):
+    header:  magic b"UKPC", uint16 version, uint16 reserved,
+             uint32 outward count, uint32 postcode count
+    table:   outward count x (4-byte outward code, uint32 start, uint32 count)
+    records: postcode count x 7-byte postcode
+"""
+import argparse
+import bisect
+import csv
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"UKPC"
+VERSION = 1
+RECORD_SIZE = 7
+OUTWARD_SIZE = 4
+HEADER = struct.Struct("<4sHHII")
+OUTWARD_ENTRY = struct.Struct("<4sII")
+
+POSTCODE_COLUMNS = ("postcode", "pcds", "pcd", "pcd2")
+
+
+def normalize_postcode_key(postcode: str) -> Optional[bytes]:
+    """
+    Normalize a postcode to its fixed-width 7-byte key.
+
+    Args:
+        postcode: Postcode in any spacing or case
+
+    Returns:
+        7-byte key (e.g. b"SW1A1AA", b"E1  1AA"), or None if it cannot be a UK postcode
+    """
+    compact = "".join(postcode.split()).upper()
+    outward, inward = compact[:-3], compact[-3:]
+    if not 2 <= len(outward) <= OUTWARD_SIZE or len(inward) != 3 or not compact.isascii():
+        return None
+    return (outward.ljust(OUTWARD_SIZE) + inward).encode("ascii")
+
+
+def format_postcode_key(key: bytes) -> str:
+    """
+    Turn a 7-byte key back into the standard 'SW1A 1AA' format.
+
+    Args:
+        key: 7-byte postcode key
+
+    Returns:
+        Formatted postcode string
+    """
+    text = key.decode("ascii")
+    return f"{text[:OUTWARD_SIZE].rstrip()} {text[OUTWARD_SIZE:]}"
+
+
+def default_db_path(csv_path: str) -> str:
+    """
+    Path of the compiled database that sits next to a postcode CSV.
+
+    Args:
+        csv_path: Path to the source CSV file
+
+    Returns:
+        Path with the extension replaced by '.bin'
+    """
+    return os.path.splitext(csv_path)[0] + ".bin"
+
+
+def _read_csv_keys(csv_path: str, column: Optional[str] = None) -> List[bytes]:
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return []
+        lowered = [h.strip().lower() for h in header]
+        if column is not None:
+            col = lowered.index(column.lower())
+        else:
+            col = next((lowered.index(c) for c in POSTCODE_COLUMNS if c in lowered), 0)
+
+        keys = set()
+        for row in reader:
+            if len(row) > col:
+                key = normalize_postcode_key(row[col])
+                if key is not None:
+                    keys.add(key)
+    return sorted(keys)
+
+
+def compile_postcode_db(csv_path: str, db_path: Optional[str] = None, column: Optional[str] = None) -> str:
+    """
+    Compile a postcode CSV into the binary database format.
+
+    The file is written to a temporary name and atomically renamed, so
+    workers compiling concurrently never see a partial file.
+
+    Args:
+        csv_path: Path to the source CSV file
+        db_path: Optional output path (defaults to the CSV path with a '.bin' extension)
+        column: Optional postcode column name (defaults to 'postcode'/'pcds'/'pcd', else the first column)
+
+    Returns:
+        Path to the compiled database
+    """
+    db_path = db_path or default_db_path(csv_path)
+    keys = _read_csv_keys(csv_path, column)
+
+    outward_table: List[Tuple[bytes, int, int]] = []
+    for i, key in enumerate(keys):
+        outward = key[:OUTWARD_SIZE]
+        if outward_table and outward_table[-1][0] == outward:
+            prev = outward_table[-1]
+            outward_table[-1] = (outward, prev[1], prev[2] + 1)
+        else:
+            outward_table.append((outward, i, 1))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(db_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(outward_table), len(keys)))
+            for entry in outward_table:
+                f.write(OUTWARD_ENTRY.pack(*entry))
+            f.write(b"".join(keys))
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return db_path
+
+
+def ensure_postcode_db(csv_path: str, db_path: Optional[str] = None) -> str:
+    """
+    Compile the database if it is missing or older than its CSV.
+
+    Args:
+        csv_path: Path to the source CSV file
+        db_path: Optional database path (defaults to the CSV path with a '.bin' extension)
+
+    Returns:
+        Path to an up-to-date compiled database
+    """
+    db_path = db_path or default_db_path(csv_path)
+    if not os.path.exists(db_path) or (
+        os.path.exists(csv_path) and os.path.getmtime(db_path) < os.path.getmtime(csv_path)
+    ):
+        compile_postcode_db(csv_path, db_path)
+    return db_path
+
+
+class _Records:
+    """Sequence view over the fixed-width records, for use with bisect."""
+
+    def __init__(self, buf: mmap.mmap, offset: int, count: int):
+        self._buf = buf
+        self._offset = offset
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> bytes:
+        start = self._offset + i * RECORD_SIZE
+        return self._buf[start:start + RECORD_SIZE]
+
+
+class MappedPostcodeDB:
+    """Read-only, memory-mapped view of a compiled postcode database."""
+
+    def __init__(self, db_path: str):
+        """
+        Open and map a compiled database.
+
+        Args:
+            db_path: Path to a file produced by compile_postcode_db
+        """
+        self.path = db_path
+        with open(db_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{db_path} is not a compiled postcode database")
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, n_outward, n_postcodes = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{db_path} is not a compiled postcode database (version {VERSION})")
+
+        # The outward table is tiny (~3k entries for the full UK list), so keep it in a dict
+        self._outward: Dict[bytes, Tuple[int, int]] = {}
+        for i in range(n_outward):
+            outward, start, count = OUTWARD_ENTRY.unpack_from(self._buf, HEADER.size + i * OUTWARD_ENTRY.size)
+            self._outward[outward] = (start, count)
+
+        self.records_offset = HEADER.size + n_outward * OUTWARD_ENTRY.size
+        self._records = _Records(self._buf, self.records_offset, n_postcodes)
+        self._array: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the mapped file in bytes."""
+        return len(self._buf)
+
+    def __contains__(self, postcode: str) -> bool:
+        key = normalize_postcode_key(postcode)
+        return key is not None and self.contains_key(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self._records)):
+            yield format_postcode_key(self._records[i])
+
+    def __enter__(self) -> "MappedPostcodeDB":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def contains_key(self, key: bytes) -> bool:
+        """
+        Binary-search a normalized 7-byte key.
+
+        Args:
+            key: Key as returned by normalize_postcode_key
+
+        Returns:
+            True if the postcode is in the database, False otherwise
+        """
+        block = self._outward.get(key[:OUTWARD_SIZE])
+        if block is None:
+            return False
+        start, count = block
+        i = bisect.bisect_left(self._records, key, start, start + count)
+        return i < start + count and self._records[i] == key
+
+    def records_array(self) -> np.ndarray:
+        """
+        Zero-copy NumPy view of the sorted records.
+
+        Returns:
+            Array of dtype 'S7' backed by the mapped file
+        """
+        if self._array is None:
+            self._array = np.frombuffer(
+                self._buf, dtype=f"S{RECORD_SIZE}", count=len(self._records), offset=self.records_offset
+            )
+        return self._array
+
+    def contains_keys(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Vectorized lookup of many normalized keys.
+
+        Args:
+            keys: Array of 7-byte keys (dtype 'S7')
+
+        Returns:
+            Boolean array, True where the key is in the database
+        """
+        records = self.records_array()
+        if not len(records):
+            return np.zeros(len(keys), dtype=bool)
+        pos = np.searchsorted(records, keys)
+        return records[np.minimum(pos, len(records) - 1)] == keys
+
+    def outward_codes(self) -> List[str]:
+        """
+        List the outward codes present in the database, in sorted order.
+
+        Returns:
+            Outward codes (e.g. 'SW1A')
+        """
+        return [o.decode("ascii").rstrip() for o in self._outward]
+
+    def postcodes_in_outward(self, outward: str) -> List[str]:
+        """
+        List every postcode in one outward code.
+
+        Args:
+            outward: Outward code (e.g. 'SW1A')
+
+        Returns:
+            Formatted postcodes in sorted order
+        """
+        block = self._outward.get(outward.upper().ljust(OUTWARD_SIZE).encode("ascii"))
+        if block is None:
+            return []
+        start, count = block
+        return [format_postcode_key(self._records[i]) for i in range(start, start + count)]
+
+    def close(self) -> None:
+        """Unmap the database file."""
+        self._array = None
+        try:
+            self._buf.close()
+        except BufferError:
+            # A records_array() view is still referenced; the map is released with it
+            pass
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile a UK postcode CSV into a memory-mappable database.")
+    parser.add_argument("csv_path", help="Source CSV file (e.g. data/uk_postcodes.csv)")
+    parser.add_argument("db_path", nargs="?", help="Output file (defaults to the CSV path with a .bin extension)")
+    parser.add_argument("--column", help="Postcode column name (defaults to postcode/pcds/pcd)")
+    args = parser.parse_args(argv)
+
+    db_path = compile_postcode_db(args.csv_path, args.db_path, args.column)
+    with MappedPostcodeDB(db_path) as db:
+        print(f"Compiled {len(db)} postcodes in {len(db.outward_codes())} outward codes to {db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Nearest-valid-postcode suggestions for mistyped postcodes.
+
+``PostcodeSuggester`` is a deletion-neighbourhood index (the SymSpell idea):
+every postcode is stored under itself and under each string obtained by
+deleting up to ``max_distance`` characters. Two strings within edit distance
+``max_distance`` always share one of those variants, so a query only needs to
+look up its own handful of deletion variants and verify the few candidates
+it finds. Postcodes are packed into 64-bit integers (6 bits per character)
+and the variants are kept in one sorted NumPy array, so the index is built
+with vectorized operations and searched with ``np.searchsorted``.
+"""
+import threading
+import weakref
+from itertools import combinations
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.postcode_validator import PostcodeIndex
+
+MAX_LENGTH = 7
+_BITS = 6
+_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+_INVALID = (1 << _BITS) - 1
+
+# Code point -> 6-bit symbol (0 is padding, _INVALID for characters that never appear in a postcode)
+_SYMBOLS = np.full(128, _INVALID, dtype=np.int64)
+_SYMBOLS[[ord(c) for c in _ALPHABET]] = np.arange(1, len(_ALPHABET) + 1)
+
+_suggesters: "weakref.WeakKeyDictionary[PostcodeIndex, PostcodeSuggester]" = weakref.WeakKeyDictionary()
+_suggesters_lock = threading.Lock()
+
+
+def _pack(symbols: np.ndarray) -> np.ndarray:
+    """Pack an (n, MAX_LENGTH) symbol matrix into one uint64 key per row."""
+    shifts = np.arange(MAX_LENGTH - 1, -1, -1, dtype=np.int64) * _BITS
+    return (symbols[:, :MAX_LENGTH] << shifts).sum(axis=1).astype(np.uint64)
+
+
+def _unpack(key: int) -> str:
+    chars = []
+    for shift in range((MAX_LENGTH - 1) * _BITS, -1, -_BITS):
+        symbol = (key >> shift) & _INVALID
+        if symbol:
+            chars.append(_ALPHABET[symbol - 1])
+    compact = "".join(chars)
+    return f"{compact[:-3]} {compact[-3:]}"
+
+
+def _deletion_positions(max_distance: int) -> List[Tuple[int, ...]]:
+    return [
+        positions
+        for d in range(1, max_distance + 1)
+        for positions in combinations(range(MAX_LENGTH + max_distance), d)
+    ]
+
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+
+    Args:
+        a: First string
+        b: Second string
+
+    Returns:
+        Number of edits needed to turn a into b
+    """
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[len(b)]
+
+
+class PostcodeSuggester:
+    """Deletion-neighbourhood index returning the nearest valid postcodes."""
+
+    def __init__(self, postcodes: Iterable[str], max_distance: int = 1):
+        """
+        Build the index.
+
+        Memory grows with the number of deletion variants: about 100 bytes per
+        postcode for max_distance=1 (~170 MB for the full UK list) and roughly
+        three times that for max_distance=2.
+
+        Args:
+            postcodes: Postcodes in any spacing or case
+            max_distance: Largest edit distance a suggestion may be from the input
+        """
+        self.max_distance = max_distance
+
+        compact = np.asarray(list(postcodes), dtype=str)
+        if len(compact):
+            compact = np.char.upper(np.char.replace(compact, " ", ""))
+            lengths = np.char.str_len(compact)
+            compact = compact[(lengths >= 5) & (lengths <= MAX_LENGTH)]
+        codes = np.ascontiguousarray(compact.astype(f"U{MAX_LENGTH}")).view(np.uint32).reshape(-1, MAX_LENGTH)
+        symbols = _SYMBOLS[np.minimum(codes, 127)]
+        symbols[codes == 0] = 0
+        lengths = (symbols != 0).sum(axis=1)
+
+        self._postcodes = _pack(symbols)
+        row_ids = np.arange(len(symbols), dtype=np.uint32)
+
+        variant_keys = [self._postcodes]
+        variant_rows = [row_ids]
+        padded = np.hstack([symbols, np.zeros((len(symbols), max_distance), dtype=np.int64)])
+        for positions in _deletion_positions(max_distance):
+            if positions[-1] >= MAX_LENGTH:
+                continue
+            keep = [i for i in range(MAX_LENGTH + max_distance) if i not in positions]
+            # Only delete real characters; deleting padding would just repeat the postcode itself
+            mask = lengths > positions[-1]
+            variant_keys.append(_pack(padded[mask][:, keep]))
+            variant_rows.append(row_ids[mask])
+
+        keys = np.concatenate(variant_keys)
+        rows = np.concatenate(variant_rows)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._rows = rows[order]
+
+    @classmethod
+    def for_index(cls, index: PostcodeIndex, max_distance: int = 1) -> "PostcodeSuggester":
+        """
+        Get the process-wide suggester for a PostcodeIndex, building it on first use.
+
+        Args:
+            index: PostcodeIndex to suggest from
+            max_distance: Largest edit distance a suggestion may be from the input
+
+        Returns:
+            Shared PostcodeSuggester
+        """
+        suggester = _suggesters.get(index)
+        if suggester is not None and suggester.max_distance == max_distance:
+            return suggester
+        with _suggesters_lock:
+            suggester = _suggesters.get(index)
+            if suggester is None or suggester.max_distance != max_distance:
+                suggester = cls(index.compact_array(), max_distance)
+                _suggesters[index] = suggester
+            return suggester
+
+    def __len__(self) -> int:
+        return len(self._postcodes)
+
+    def _query_keys(self, compact: str) -> np.ndarray:
+        symbols = [_SYMBOLS[ord(c)] if ord(c) < 128 else _INVALID for c in compact]
+        variants = {tuple(symbols)}
+        for positions in _deletion_positions(self.max_distance):
+            if positions[-1] < len(symbols):
+                variants.add(tuple(s for i, s in enumerate(symbols) if i not in positions))
+        rows = [list(v) + [0] * (MAX_LENGTH - len(v)) for v in variants if len(v) <= MAX_LENGTH]
+        if not rows:
+            return np.zeros(0, dtype=np.uint64)
+        return _pack(np.array(rows, dtype=np.int64))
+
+    def suggest(
+        self, postcode: str, k: int = 3, where: Optional[Callable[[str], bool]] = None
+    ) -> List[str]:
+        """
+        Find the valid postcodes nearest to a (possibly mistyped) postcode.
+
+        Args:
+            postcode: User input in any spacing or case
+            k: Maximum number of suggestions
+            where: Optional filter; only postcodes for which it returns True are suggested
+
+        Returns:
+            Up to k formatted postcodes, nearest first (ties prefer the same outward code)
+        """
+        compact = "".join(ch for ch in postcode.upper() if ch.isalnum())
+        if not compact or len(compact) > MAX_LENGTH + self.max_distance or not len(self._keys):
+            return []
+
+        query = self._query_keys(compact)
+        starts = np.searchsorted(self._keys, query, side="left")
+        stops = np.searchsorted(self._keys, query, side="right")
+        hits = [self._rows[a:b] for a, b in zip(starts, stops) if b > a]
+        if not hits:
+            return []
+
+        outward = compact[:-3]
+        ranked = []
+        for row in np.unique(np.concatenate(hits)):
+            candidate = _unpack(int(self._postcodes[row]))
+            distance = edit_distance(compact, candidate.replace(" ", ""))
+            if distance > self.max_distance or (where is not None and not where(candidate)):
+                continue
+            ranked.append((distance, not candidate.startswith(outward + " "), candidate))
+        ranked.sort()
+        return [candidate for _, _, candidate in ranked[:k]]
@@ -1,11 +1,195 @@
 """
 Postcode validation utilities for UK postcodes.
 """
+import numpy as np
 import pandas as pd
 import re
-from typing import List, Optional, Tuple
+import sys
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
 import os
 
+from src.utils.coverage import CoverageEngine
+from src.utils.postcode_db import OUTWARD_SIZE, MappedPostcodeDB, default_db_path, ensure_postcode_db
+
+UK_POSTCODE_PATTERN = r'^[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}$'
+
+DEFAULT_POSTCODE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'uk_postcodes.csv'
+)
+
+# Process-wide postcode indexes, keyed by CSV path, with the stamps of the files they were
+# loaded from (see get_shared_postcode_index)
+_shared_indexes: Dict[str, Tuple["PostcodeIndex", Tuple[Optional[Tuple[float, int]], ...]]] = {}
+_shared_indexes_lock = threading.Lock()
+
+
+class PostcodeIndex:
+    """
+    Hashed lookup over a set of UK postcodes.
+
+    Every entry is normalized with ``format_postcode`` once, at build time, so
+    existence and service-area checks are O(1) set lookups per call instead of
+    a scan over the raw postcode list. An index can also be backed by a
+    compiled, memory-mapped postcode database (see ``from_db``), which answers
+    the same checks with an O(log n) binary search.
+    """
+
+    def __init__(self, postcodes: Iterable[str] = (), service_areas: Iterable[str] = ("SW",)):
+        """
+        Build the index.
+
+        Args:
+            postcodes: Raw postcode strings (any spacing or case)
+            service_areas: Postcode areas we cover (e.g. 'SW')
+        """
+        self._postcodes: FrozenSet[str] = frozenset(
+            format_postcode(p) for p in postcodes if isinstance(p, str) and p.strip()
+        )
+        self.service_areas: FrozenSet[str] = frozenset(a.upper() for a in service_areas)
+        # Set by load_postcode_index
+        self.load_seconds: Optional[float] = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, **kwargs) -> "PostcodeIndex":
+        """
+        Build an index from a DataFrame with a postcode column.
+
+        The column is matched case-insensitively ('Postcode' or 'postcode');
+        if there is none, the first column is used.
+
+        Args:
+            df: DataFrame as returned by load_uk_postcodes
+            **kwargs: Passed through to PostcodeIndex
+
+        Returns:
+            PostcodeIndex over the DataFrame's postcodes
+        """
+        if df is None or df.empty:
+            return cls(**kwargs)
+        column = next((c for c in df.columns if str(c).strip().lower() == "postcode"), df.columns[0])
+        return cls(df[column].dropna().astype(str), **kwargs)
+
+    @classmethod
+    def from_csv(cls, file_path: str = None, **kwargs) -> "PostcodeIndex":
+        """
+        Build an index from a postcode CSV file.
+
+        Args:
+            file_path: Optional path to the CSV file (defaults to data/uk_postcodes.csv)
+            **kwargs: Passed through to PostcodeIndex
+
+        Returns:
+            PostcodeIndex over the file's postcodes
+        """
+        return cls.from_dataframe(load_uk_postcodes(file_path), **kwargs)
+
+    @classmethod
+    def from_db(cls, db_path: str, **kwargs) -> "PostcodeIndex":
+        """
+        Build an index backed by a compiled postcode database.
+
+        Args:
+            db_path: Path to a file produced by compile_postcode_db
+            **kwargs: Passed through to PostcodeIndex
+
+        Returns:
+            PostcodeIndex that binary-searches the memory-mapped file
+        """
+        index = cls(**kwargs)
+        index._postcodes = MappedPostcodeDB(db_path)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._postcodes)
+
+    def __contains__(self, postcode: str) -> bool:
+        return self.exists(postcode)
+
+    def exists(self, postcode: str) -> bool:
+        """
+        Check whether a postcode is in the index.
+
+        Args:
+            postcode: Postcode in any spacing or case
+
+        Returns:
+            True if the postcode exists, False otherwise
+        """
+        return format_postcode(postcode) in self._postcodes
+
+    def contains_many(self, formatted_postcodes: np.ndarray) -> np.ndarray:
+        """
+        Vectorized existence check.
+
+        Args:
+            formatted_postcodes: Array of well-formed postcodes in 'SW1A 1AA' format
+
+        Returns:
+            Boolean array, True where the postcode exists
+        """
+        formatted_postcodes = np.asarray(formatted_postcodes, dtype=str)
+        if not len(formatted_postcodes):
+            return np.zeros(0, dtype=bool)
+        if isinstance(self._postcodes, MappedPostcodeDB):
+            width = OUTWARD_SIZE + 3
+            outward, _, inward = np.char.partition(formatted_postcodes, " ").T
+            keys = np.char.add(np.char.ljust(outward, OUTWARD_SIZE), inward).astype(f"U{width}")
+            # ASCII-only input, so narrowing each code point to a byte gives the 7-byte keys
+            key_bytes = np.ascontiguousarray(keys).view(np.uint32).astype(np.uint8).view(f"S{width}").ravel()
+            return self._postcodes.contains_keys(key_bytes)
+        return np.isin(formatted_postcodes, list(self._postcodes))
+
+    def compact_array(self) -> np.ndarray:
+        """
+        All postcodes in the index without spaces (e.g. 'SW1A1AA').
+
+        Returns:
+            Array of dtype 'U7'
+        """
+        if isinstance(self._postcodes, MappedPostcodeDB):
+            records = self._postcodes.records_array()
+        else:
+            records = np.array(sorted(self._postcodes), dtype=str)
+        if not len(records):
+            return np.zeros(0, dtype=f"U{OUTWARD_SIZE + 3}")
+        return np.char.replace(records.astype(str), " ", "").astype(f"U{OUTWARD_SIZE + 3}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the index's size and load cost.
+
+        Returns:
+            Dictionary with postcodes, backend ('mmap' or 'set'), resident_bytes (mapped
+            file size, or the set plus its strings) and load_seconds (None if not loaded
+            with load_postcode_index)
+        """
+        if isinstance(self._postcodes, MappedPostcodeDB):
+            backend, resident_bytes = "mmap", self._postcodes.nbytes
+        else:
+            backend = "set"
+            resident_bytes = sys.getsizeof(self._postcodes) + sum(sys.getsizeof(p) for p in self._postcodes)
+        return {
+            "postcodes": len(self),
+            "backend": backend,
+            "resident_bytes": resident_bytes,
+            "load_seconds": self.load_seconds,
+        }
+
+    def in_service_area(self, postcode: str) -> bool:
+        """
+        Check whether a postcode falls in one of our service areas.
+
+        Args:
+            postcode: Postcode in any spacing or case
+
+        Returns:
+            True if the postcode's area is covered, False otherwise
+        """
+        return get_postcode_area(postcode) in self.service_areas
+
+
 def load_uk_postcodes(file_path: str = None) -> pd.DataFrame:
     """
     Load UK postcodes from CSV file.
@@ -18,9 +202,8 @@ def load_uk_postcodes(file_path: str = None) -> pd.DataFrame:
         DataFrame containing UK postcodes
     """
     if file_path is None:
-        # Look for uk_postcodes.csv in the data directory
-        current_dir = os.path.dirname(os.path.dirname(__file__))
-        file_path = os.path.join(current_dir, 'data', 'uk_postcodes.csv')
+        # Look for uk_postcodes.csv in the project's data directory
+        file_path = DEFAULT_POSTCODE_FILE
     
     try:
         df = pd.read_csv(file_path)
@@ -29,6 +212,75 @@ def load_uk_postcodes(file_path: str = None) -> pd.DataFrame:
         print(f"Error loading UK postcodes: {e}")
         return pd.DataFrame()
 
+def load_postcode_index(file_path: str = None, **kwargs) -> PostcodeIndex:
+    """
+    Load UK postcodes into a PostcodeIndex.
+
+    The CSV is compiled once into a memory-mapped binary database next to it
+    (recompiled when the CSV is newer), so processes share the data through
+    the page cache instead of each parsing the CSV with pandas. If the
+    database cannot be compiled or opened, the CSV is indexed in memory.
+
+    Args:
+        file_path: Optional path to the CSV file (defaults to data/uk_postcodes.csv)
+        **kwargs: Passed through to PostcodeIndex
+
+    Returns:
+        PostcodeIndex over the UK postcodes
+    """
+    if file_path is None:
+        file_path = DEFAULT_POSTCODE_FILE
+
+    start = time.perf_counter()
+    try:
+        index = PostcodeIndex.from_db(ensure_postcode_db(file_path), **kwargs)
+    except Exception as e:
+        print(f"Warning: Compiled postcode database not available, indexing CSV in memory: {e}")
+        index = PostcodeIndex.from_csv(file_path, **kwargs)
+    index.load_seconds = time.perf_counter() - start
+    return index
+
+def _file_stamp(path: str) -> Optional[Tuple[float, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+def _source_stamps(file_path: str) -> Tuple[Optional[Tuple[float, int]], ...]:
+    return _file_stamp(file_path), _file_stamp(default_db_path(file_path))
+
+def get_shared_postcode_index(file_path: str = None, reload: bool = False) -> PostcodeIndex:
+    """
+    Get the process-wide PostcodeIndex for a postcode CSV.
+
+    The first caller loads the index with load_postcode_index; every later
+    caller (e.g. each Streamlit session's chatbot) gets the same object, so the
+    dataset is loaded and held once per process. When the CSV or its compiled
+    database has changed since the index was loaded, it is loaded again; callers
+    already holding the old index keep using it until they let it go.
+
+    Args:
+        file_path: Optional path to the CSV file (defaults to data/uk_postcodes.csv)
+        reload: Load the index again even if its files haven't changed
+
+    Returns:
+        Shared PostcodeIndex
+    """
+    key = os.path.abspath(file_path or DEFAULT_POSTCODE_FILE)
+    entry = _shared_indexes.get(key)
+    if entry is not None and not reload and entry[1] == _source_stamps(key):
+        return entry[0]
+
+    with _shared_indexes_lock:
+        entry = _shared_indexes.get(key)
+        if entry is None or reload or entry[1] != _source_stamps(key):
+            index = load_postcode_index(key)
+            # Stamp after loading: loading may have recompiled the database
+            entry = (index, _source_stamps(key))
+            _shared_indexes[key] = entry
+        return entry[0]
+
 def format_postcode(postcode: str) -> str:
     """
     Format postcode to standard UK format (e.g., 'SW1A 1AA').
@@ -58,17 +310,18 @@ def validate_uk_postcode_format(postcode: str) -> bool:
     Returns:
         True if postcode format is valid, False otherwise
     """
-    # UK Postcode regex pattern
-    pattern = r'^[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}$'
-    return bool(re.match(pattern, postcode.upper()))
+    return bool(re.match(UK_POSTCODE_PATTERN, postcode.upper()))
 
-def validate_postcode(postcode: str, valid_postcodes: List[str] = None) -> Tuple[bool, str, str]:
+def validate_postcode(
+    postcode: str, valid_postcodes: Union[PostcodeIndex, List[str], pd.DataFrame] = None
+) -> Tuple[bool, str, str]:
     """
     Validate if a postcode exists in UK and is in our service area.
     
     Args:
         postcode: Postcode to validate
-        valid_postcodes: Optional list of valid postcodes for our service area
+        valid_postcodes: Optional PostcodeIndex (preferred), list or DataFrame of valid postcodes.
+            Lists and DataFrames are indexed on every call, so build a PostcodeIndex once instead.
         
     Returns:
         Tuple of (is_valid, formatted_postcode, area)
@@ -82,22 +335,26 @@ def validate_postcode(postcode: str, valid_postcodes: List[str] = None) -> Tuple
     
     # Load UK postcodes if not provided
     if valid_postcodes is None:
-        uk_postcodes_df = load_uk_postcodes()
-        if uk_postcodes_df.empty:
+        index = get_shared_postcode_index()
+        if not len(index):
             return False, formatted_postcode, ""
         
         # Check if postcode exists in UK
-        is_valid_uk = formatted_postcode in uk_postcodes_df['postcode'].str.upper().values
-        if not is_valid_uk:
+        if not index.exists(formatted_postcode):
             return False, formatted_postcode, ""
+    elif isinstance(valid_postcodes, PostcodeIndex):
+        index = valid_postcodes
+    elif isinstance(valid_postcodes, pd.DataFrame):
+        index = PostcodeIndex.from_dataframe(valid_postcodes)
+    else:
+        index = PostcodeIndex(valid_postcodes)
     
     # Get the area code
     area = get_postcode_area(formatted_postcode)
     
-    # If we have a list of valid postcodes, check if it's in our service area
-    if valid_postcodes:
-        is_valid = formatted_postcode in [p.upper() for p in valid_postcodes]
-        return is_valid, formatted_postcode, area
+    # If we have valid postcodes, check the postcode is one of them
+    if len(index):
+        return index.exists(formatted_postcode), formatted_postcode, area
     
     return True, formatted_postcode, area
 
@@ -113,4 +370,117 @@ def get_postcode_area(postcode: str) -> str:
     """
     # Remove spaces and get the first part before any numbers
     area = re.match(r'^[A-Z]+', postcode.replace(" ", "").upper())
-    return area.group(0) if area else "" 
\ No newline at end of file
+    return area.group(0) if area else "" 
+
+def _char_classes(chars: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (is_letter, is_digit) masks for an array of code points."""
+    return (chars >= ord("A")) & (chars <= ord("Z")), (chars >= ord("0")) & (chars <= ord("9"))
+
+def validate_postcodes_bulk(
+    postcodes: Union[Sequence[str], np.ndarray, pd.Series],
+    index: PostcodeIndex = None,
+    coverage: CoverageEngine = None,
+    office: str = None,
+) -> pd.DataFrame:
+    """
+    Validate many postcodes at once with the same rules as validate_postcode.
+
+    Formatting runs as NumPy string operations, and the format regex and area
+    extraction are evaluated on a fixed-width code-point matrix (one row per
+    postcode), so large lead imports avoid a Python-level loop per row.
+    Existence is checked in one vectorized index lookup.
+
+    Args:
+        postcodes: List, NumPy array or pandas Series of raw postcodes (missing values allowed)
+        index: Optional PostcodeIndex (defaults to the shared index from get_shared_postcode_index())
+        coverage: Optional coverage engine; when given, in_service_area follows the office's
+            coverage (as in the chatbot) instead of the index's service areas
+        office: Optional office key for the coverage engine (defaults to its default office)
+
+    Returns:
+        DataFrame aligned with the input, with columns postcode, formatted_postcode,
+        format_valid, exists, area and in_service_area
+    """
+    if index is None:
+        index = get_shared_postcode_index()
+
+    raw = postcodes if isinstance(postcodes, pd.Series) else pd.Series(postcodes)
+    values = raw.where(raw.notna(), "").astype(str).to_numpy(dtype=str)
+    n = len(values)
+    if not n:
+        columns = ["postcode", "formatted_postcode", "format_valid", "exists", "area", "in_service_area"]
+        return pd.DataFrame(columns=columns, index=raw.index)
+
+    # Same steps as format_postcode: drop spaces and upper-case
+    compact = np.char.upper(np.char.replace(values, " ", ""))
+    lengths = np.char.str_len(compact)
+
+    # Every well-formed postcode is 5-7 ASCII characters once compacted; view those as a code-point matrix
+    width = 7
+    codes = np.ascontiguousarray(compact.astype(f"U{width}")).view(np.uint32).reshape(n, width)
+    candidate = (lengths >= 5) & (lengths <= width) & (codes < 128).all(axis=1)
+    matrix = np.where(candidate[:, None], codes, 0)
+    letter, digit = _char_classes(matrix)
+    alnum = letter | digit
+
+    # Inward code: the last three characters, digit + two letters
+    rows = np.arange(n)[:, None]
+    inward_cols = np.clip(lengths[:, None] - 3 + np.arange(3), 0, width - 1)
+    inward_ok = digit[rows, inward_cols[:, :1]][:, 0] & letter[rows, inward_cols[:, 1:]].all(axis=1)
+
+    # Outward code: A9, A99, AA9, A9A, AA99 or AA9A (the regex [A-Z]{1,2}[0-9][A-Z0-9]?)
+    outward_len = lengths - 3
+    outward_ok = np.select(
+        [outward_len == 2, outward_len == 3, outward_len == 4],
+        [
+            letter[:, 0] & digit[:, 1],
+            letter[:, 0] & ((letter[:, 1] & digit[:, 2]) | (digit[:, 1] & alnum[:, 2])),
+            letter[:, 0] & letter[:, 1] & digit[:, 2] & alnum[:, 3],
+        ],
+        default=False,
+    )
+    format_valid = candidate & inward_ok & outward_ok
+
+    # Insert the space before the inward code by shifting the inward columns one to the right
+    spaced = np.zeros((n, width + 1), dtype=np.uint32)
+    shift = (np.arange(width) >= outward_len[:, None]).astype(int)
+    spaced[rows, np.arange(width) + shift] = matrix
+    spaced[np.flatnonzero(candidate), outward_len[candidate]] = ord(" ")
+    formatted = spaced.view(f"U{width + 1}").ravel().astype(object)
+    # Anything that is not 5-7 ASCII characters is invalid anyway; format those few rows one by one
+    for i in np.flatnonzero(~candidate):
+        formatted[i] = format_postcode(values[i])
+
+    # Area: the leading one or two letters
+    leading = matrix[:, :2] * np.stack([format_valid, format_valid & letter[:, 1]], axis=1)
+    area = np.ascontiguousarray(leading, dtype=np.uint32).view("U2").ravel().astype(object)
+
+    exists = np.zeros(n, dtype=bool)
+    if len(index):
+        exists[format_valid] = index.contains_many(formatted[format_valid])
+    else:
+        # No postcode data loaded: like validate_postcode, accept any well-formed postcode
+        exists = format_valid.copy()
+
+    if coverage is not None and format_valid.any():
+        # Coverage is decided per outward code or sector, so only distinct postcodes need a lookup
+        unique, inverse = np.unique(formatted[format_valid].astype(str), return_inverse=True)
+        covered = np.array([coverage.is_covered(p, office) for p in unique], dtype=bool)
+        in_service_area = np.zeros(n, dtype=bool)
+        in_service_area[format_valid] = covered[inverse]
+    elif coverage is not None:
+        in_service_area = np.zeros(n, dtype=bool)
+    else:
+        in_service_area = format_valid & np.isin(area, list(index.service_areas))
+
+    return pd.DataFrame(
+        {
+            "postcode": raw,
+            "formatted_postcode": formatted,
+            "format_valid": format_valid,
+            "exists": exists,
+            "area": area,
+            "in_service_area": in_service_area,
+        },
+        index=raw.index,
+    )
@@ -0,0 +1,184 @@
+"""
+Deterministic slot extraction for simple answers.
+
+Most slot-filling turns are a bare answer to the question just asked
+("jane@example.com", "07123 456789", "£1.5M", "SW1A 1AA", "buy"). These
+extractors recognise such answers with compiled regexes so the chatbot can
+fill the slot and ask the next question without an LLM call. They only
+return a value when the answer is unambiguous and the message contains
+little else; anything longer or less certain is left to the LLM.
+"""
+import re
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.postcode_validator import format_postcode
+
+# Messages with more than this many words besides the value may carry
+# information the LLM should see (questions, corrections, other slots)
+MAX_EXTRA_WORDS = 6
+
+_EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}')
+_PHONE_RE = re.compile(r'(?<![\d+])(?:\+|00)?[\d(][\d\s().-]{8,}\d(?!\d)')
+_POSTCODE_RE = re.compile(r'\b[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}\b', re.IGNORECASE)
+_BUDGET_RE = re.compile(
+    r'£?\s*(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(million|mil|mn|m|thousand|k|grand)?(?![a-z])',
+    re.IGNORECASE,
+)
+_BUY_RE = re.compile(r'\b(buy|buying|purchase|purchasing)\b', re.IGNORECASE)
+_SELL_RE = re.compile(r'\b(sell|selling)\b', re.IGNORECASE)
+_NEW_RE = re.compile(r'\b(new|new[- ]build|newly built|brand new)\b', re.IGNORECASE)
+_RESALE_RE = re.compile(r'\b(resale|re-sale|second[- ]hand|existing|old)\b', re.IGNORECASE)
+_NEGATION_RE = re.compile(r"\b(not|no|don'?t|doesn'?t|never|neither|nor)\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[A-Za-z0-9']+")
+
+_MULTIPLIERS = {
+    "million": 1_000_000, "mil": 1_000_000, "mn": 1_000_000, "m": 1_000_000,
+    "thousand": 1_000, "k": 1_000, "grand": 1_000,
+}
+
+
+def _extra_words(message: str, value_text: str) -> int:
+    return len(_WORD_RE.findall(message.replace(value_text, " ", 1)))
+
+
+def _single_match(pattern: re.Pattern, message: str) -> Optional[re.Match]:
+    matches = list(pattern.finditer(message))
+    if len(matches) != 1 or _extra_words(message, matches[0].group(0)) > MAX_EXTRA_WORDS:
+        return None
+    return matches[0]
+
+
+def extract_email(message: str) -> Optional[str]:
+    """
+    Extract an email address.
+
+    Args:
+        message: User's message
+
+    Returns:
+        Email address with the domain lower-cased, or None
+    """
+    match = _single_match(_EMAIL_RE, message)
+    if match is None:
+        return None
+    local, domain = match.group(0).rsplit("@", 1)
+    return f"{local}@{domain.lower()}"
+
+
+def extract_uk_phone(message: str) -> Optional[str]:
+    """
+    Extract a UK phone number (national or +44 format).
+
+    Args:
+        message: User's message
+
+    Returns:
+        Phone number in national format (e.g. '07123 456789'), or None
+    """
+    match = _single_match(_PHONE_RE, message)
+    if match is None:
+        return None
+    digits = re.sub(r'\D', '', match.group(0))
+    if digits.startswith("0044"):
+        digits = "0" + digits[4:]
+    elif digits.startswith("44") and match.group(0).lstrip().startswith("+"):
+        digits = "0" + digits[2:]
+    if not digits.startswith("0") or digits.startswith("00") or len(digits) not in (10, 11):
+        return None
+    if len(digits) == 11 and digits.startswith("07"):
+        return f"{digits[:5]} {digits[5:]}"
+    return digits
+
+
+def extract_budget(message: str) -> Optional[int]:
+    """
+    Extract a budget amount such as '£1.5M', '750k', '2 million' or '1,200,000'.
+
+    Args:
+        message: User's message
+
+    Returns:
+        Budget in pounds, or None (also for bare small numbers like '2', which are ambiguous)
+    """
+    matches = [m for m in _BUDGET_RE.finditer(message) if m.group(1)]
+    if len(matches) != 1 or _extra_words(message, matches[0].group(0)) > MAX_EXTRA_WORDS:
+        return None
+    number, unit = matches[0].group(1), matches[0].group(2)
+    amount = float(number.replace(",", ""))
+    if unit:
+        amount *= _MULTIPLIERS[unit.lower()]
+    elif amount < 1_000:
+        return None
+    return int(round(amount))
+
+
+def extract_postcode(message: str) -> Optional[str]:
+    """
+    Extract a full UK postcode.
+
+    Args:
+        message: User's message
+
+    Returns:
+        Postcode in the standard 'SW1A 1AA' format, or None
+    """
+    match = _single_match(_POSTCODE_RE, message)
+    return format_postcode(match.group(0)) if match is not None else None
+
+
+def _keyword_choice(message: str, choices: Dict[str, re.Pattern]) -> Optional[str]:
+    if len(_WORD_RE.findall(message)) > MAX_EXTRA_WORDS + 1 or _NEGATION_RE.search(message):
+        return None
+    found = [value for value, pattern in choices.items() if pattern.search(message)]
+    return found[0] if len(found) == 1 else None
+
+
+def extract_intent(message: str) -> Optional[str]:
+    """
+    Extract a buy/sell intent from keywords.
+
+    Args:
+        message: User's message
+
+    Returns:
+        'BUY_HOME' or 'SELL_HOME', or None if neither or both are mentioned
+    """
+    return _keyword_choice(message, {"BUY_HOME": _BUY_RE, "SELL_HOME": _SELL_RE})
+
+
+def extract_property_type(message: str) -> Optional[str]:
+    """
+    Extract a new-build/resale property type from keywords.
+
+    Args:
+        message: User's message
+
+    Returns:
+        'NEW' or 'RESALE', or None
+    """
+    return _keyword_choice(message, {"NEW": _NEW_RE, "RESALE": _RESALE_RE})
+
+
+SLOT_EXTRACTORS: Dict[str, Callable[[str], Any]] = {
+    "intent": extract_intent,
+    "property_type": extract_property_type,
+    "phone": extract_uk_phone,
+    "email": extract_email,
+    "budget": extract_budget,
+    "postcode": extract_postcode,
+}
+
+
+def extract_slot_value(slot: str, message: str) -> Optional[Any]:
+    """
+    Try to fill one slot from the user's message without the LLM.
+
+    Args:
+        slot: Slot the chatbot asked for
+        message: User's message
+
+    Returns:
+        Extracted value, or None if the slot has no extractor or the answer isn't clear-cut
+    """
+    extractor = SLOT_EXTRACTORS.get(slot)
+    return extractor(message) if extractor is not None else None
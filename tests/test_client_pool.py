@@ -0,0 +1,10 @@
+from src.llm.client_pool import ClientPool
+
+
+def test_from_env_reads_timeouts(monkeypatch):
+    monkeypatch.setenv("LLM_CONNECT_TIMEOUT", "1.5")
+    monkeypatch.setenv("LLM_READ_TIMEOUT", "20")
+    monkeypatch.setenv("LLM_WRITE_TIMEOUT", "3")
+    monkeypatch.setenv("LLM_POOL_TIMEOUT", "0.5")
+    timeout = ClientPool.from_env().timeout
+    assert (timeout.connect, timeout.read, timeout.write, timeout.pool) == (1.5, 20.0, 3.0, 0.5)
@@ -0,0 +1,14 @@
+from src.llm import cache
+
+
+def test_shared_cache_uses_env_db(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "completions.db")
+    monkeypatch.setenv("CHATBOT_COMPLETION_CACHE_DB", db_path)
+    monkeypatch.setattr(cache, "_shared_cache", None)
+    assert cache.get_shared_completion_cache().db_path == db_path
+
+
+def test_shared_cache_defaults_to_memory(monkeypatch):
+    monkeypatch.delenv("CHATBOT_COMPLETION_CACHE_DB", raising=False)
+    monkeypatch.setattr(cache, "_shared_cache", None)
+    assert cache.get_shared_completion_cache().db_path is None
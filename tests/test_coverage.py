@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from src.utils.coverage import CoverageEngine, OfficeCoverage
+
+
+@pytest.mark.parametrize("district", ["SW1-SW3", "SW1–SW3", "SW1 — SW3", "SW1-3"])
+def test_district_range_dashes(district):
+    office = OfficeCoverage("test", {"districts": [district]})
+    assert office.covers_outward("SW1")
+    assert office.covers_outward("SW3")
+    assert not office.covers_outward("SW4")
+
+
+@pytest.mark.parametrize("district", ["SW1-E20", "SW20-SW1"])
+def test_invalid_district_range(district):
+    with pytest.raises(ValueError, match="Invalid district"):
+        OfficeCoverage("test", {"districts": [district]})
+
+
+def test_removed_office_falls_back_to_default(tmp_path):
+    path = tmp_path / "coverage.json"
+    path.write_text(json.dumps({
+        "default_office": "a",
+        "offices": {"a": {"areas": ["SW"]}, "b": {"areas": ["E"]}},
+    }))
+    engine = CoverageEngine(str(path), reload_interval=0)
+    assert engine.is_covered("E1 6AN", "b")
+
+    path.write_text(json.dumps({"default_office": "a", "offices": {"a": {"areas": ["SW"]}}}))
+    engine.reload()
+    assert engine.office("b").key == "a"
+    assert not engine.is_covered("E1 6AN", "b")
+    assert engine.is_covered("SW1A 1AA", "b")
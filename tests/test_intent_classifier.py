@@ -0,0 +1,20 @@
+from src.utils.intent_classifier import harvest_examples
+
+
+def _state(*turns):
+    return {"conversation_history": [
+        {"user_message": message, "slots": {"intent": intent}, **({"intent_source": source} if source else {})}
+        for message, intent, source in turns
+    ]}
+
+
+def test_harvest_only_llm_labels():
+    states = [
+        _state(("hello", None, None), ("I'd like to buy", "BUY_HOME", "llm"), ("a flat", "BUY_HOME", None)),
+        # The classifier's own predictions and keyword matches aren't training data
+        _state(("buy a house", "BUY_HOME", "local")),
+        _state(("sell", "SELL_HOME", "extractor")),
+        # Logged before turns recorded their intent source
+        _state(("sell my flat", "SELL_HOME", None)),
+    ]
+    assert harvest_examples(states) == [("I'd like to buy", "BUY_HOME")]
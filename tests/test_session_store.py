@@ -0,0 +1,79 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.memory.session_store import InMemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore(ttl=60)
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=60)
+
+
+def test_concurrent_turns_conflict(store):
+    assert store.get_versioned("s") == (None, 0)
+    assert store.set_if_version("s", {"turn": 0}, 0)
+
+    # Two workers load the same version; only the first save wins
+    state, version = store.get_versioned("s")
+    assert state == {"turn": 0}
+    assert store.set_if_version("s", {"turn": "a"}, version)
+    assert not store.set_if_version("s", {"turn": "b"}, version)
+    assert store.get("s") == {"turn": "a"}
+
+    # A session created meanwhile can't be overwritten as if it were new
+    assert not store.set_if_version("s", {"turn": "c"}, 0)
+
+
+def test_set_bumps_version(store):
+    store.set("s", {"turn": 0})
+    _, version = store.get_versioned("s")
+    store.set("s", {"turn": 1})
+    assert not store.set_if_version("s", {"turn": 2}, version)
+    assert store.set_if_version("s", {"turn": 2}, version + 1)
+
+
+def test_expired_session_starts_over(store):
+    store.ttl = 0.01
+    store.set("s", {"turn": 0})
+    time.sleep(0.02)
+    assert store.get_versioned("s") == (None, 0)
+    assert store.set_if_version("s", {"turn": 1}, 0)
+
+
+def test_sqlite_adds_version_column(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)")
+    conn.execute("INSERT INTO sessions VALUES ('s', '{\"turn\": 0}', ?)", (time.time() + 60,))
+    conn.commit()
+    conn.close()
+
+    store = SQLiteSessionStore(path, ttl=60)
+    assert store.get_versioned("s") == ({"turn": 0}, 1)
+    assert store.set_if_version("s", {"turn": 1}, 1)
+
+
+def test_server_returns_conflict(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from fastapi.testclient import TestClient
+
+    from src import server
+
+    store = InMemorySessionStore(ttl=60)
+    service = server.ChatService("test", store)
+    app = server.create_app(service)
+
+    async def process_message(self, message):
+        # Another worker saves the same session while this turn runs
+        store.set(self.session_id, store.get(self.session_id))
+        return {"assistant_response": "ok", "slots": {}}
+
+    monkeypatch.setattr(server.AsyncRealEstateChatbot, "process_message", process_message)
+    client = TestClient(app)
+    session_id = client.post("/sessions").json()["session_id"]
+    response = client.post("/chat", json={"session_id": session_id, "message": "hi"})
+    assert response.status_code == 409
@@ -0,0 +1,26 @@
+import threading
+
+from src import chatbot
+
+
+def test_speculation_queue_is_bounded():
+    release = threading.Event()
+    futures = [chatbot._submit_speculation(release.wait, 5) for _ in range(chatbot.SPECULATION_MAX_PENDING)]
+    try:
+        assert all(future is not None for future in futures)
+        # Workers busy and queue full: the speculation is skipped rather than queued
+        assert chatbot._submit_speculation(lambda: None) is None
+        futures[-1].cancel()
+        assert chatbot._submit_speculation(lambda: None) is not None
+    finally:
+        release.set()
+    for future in futures:
+        if not future.cancelled():
+            future.result(timeout=5)
+
+
+def test_speculation_restarts_after_shutdown():
+    chatbot.shutdown_speculation()
+    future = chatbot._submit_speculation(lambda: 42)
+    assert future is not None and future.result(timeout=5) == 42
+    chatbot.shutdown_speculation()
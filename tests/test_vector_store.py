@@ -0,0 +1,96 @@
+import random
+import zlib
+
+import numpy as np
+import pytest
+
+from src.memory.vector_store import InMemoryVectorStore, _single_equality, matches_where
+
+# Mixed metadata values: True == 1 and False == 0 in Python, so bool and int codes must agree
+_VALUES = {
+    "session_id": ["s0", "s1", "s2", "s3"],
+    "type": ["user", "assistant"],
+    "slot_state_intent": ["BUY_HOME", "SELL_HOME", "None"],
+    "turn": [0, 1, 2, 3, 2.5, True, False, "x", None],
+    "other": [1, "a"],
+}
+_TARGETS = {key: values + ["unknown", 7] for key, values in _VALUES.items()}
+
+
+def _random_embedding(dimensions=16):
+    # Deterministic per text, so a reloaded store embeds queries the same way
+    return lambda texts: np.stack(
+        [np.random.default_rng(zlib.crc32(text.encode())).standard_normal(dimensions) for text in texts]
+    )
+
+
+@pytest.mark.parametrize("index", ["flat", "ivf"])
+def test_save_over_loaded_store(tmp_path, index):
+    store = InMemoryVectorStore(_random_embedding(), index=index, n_lists=8, n_probe=8, ivf_train_size=200)
+    ids = [str(i) for i in range(500)]
+    store.add_documents([f"doc {i}" for i in ids], [{"session_id": f"s{int(i) % 5}"} for i in ids], ids)
+    store.save(str(tmp_path))
+    expected = store.query("doc", 5, where={"session_id": "s1"})["ids"]
+
+    # Saving a memory-mapped store back to its own files must not truncate them mid-read
+    loaded = InMemoryVectorStore.load(str(tmp_path), _random_embedding())
+    loaded.save(str(tmp_path))
+    reloaded = InMemoryVectorStore.load(str(tmp_path), _random_embedding())
+
+    assert len(reloaded) == 500
+    assert reloaded.trained == (index == "ivf")
+    np.testing.assert_array_equal(reloaded._embeddings[:500], store._embeddings[:500])
+    assert reloaded.query("doc", 5, where={"session_id": "s1"})["ids"] == expected
+    assert not [name for name in tmp_path.iterdir() if name.suffix == ".tmp"]
+
+
+def _random_metadata(rng):
+    # Keys are sometimes missing, so $ne/$nin must match rows without them
+    return {key: rng.choice(values) for key, values in _VALUES.items() if rng.random() < 0.85}
+
+
+def _random_where(rng, depth=0):
+    if depth < 2 and rng.random() < 0.3:
+        return {rng.choice(["$and", "$or"]): [_random_where(rng, depth + 1) for _ in range(rng.randint(0, 3))]}
+    key = rng.choice(list(_TARGETS))
+    operator = rng.choice([None, "$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte"])
+    if operator in ("$in", "$nin"):
+        target = rng.sample(_TARGETS[key], rng.randint(1, 3))
+    elif operator in ("$gt", "$gte", "$lt", "$lte"):
+        target = rng.choice([0, 1, 2, 2.5, True, "a"])
+    else:
+        target = rng.choice(_TARGETS[key])
+    return {key: target if operator is None else {operator: target}}
+
+
+@pytest.mark.parametrize("index", ["flat", "ivf"])
+def test_indexed_filters_match_matches_where(index):
+    rng = random.Random(24)
+    store = InMemoryVectorStore(_random_embedding(), index=index, n_lists=8, n_probe=8, ivf_train_size=200)
+    metadatas = [_random_metadata(rng) for _ in range(1000)]
+    store.add_documents([f"doc {i}" for i in range(1000)], metadatas, [str(i) for i in range(1000)])
+    # Upserts move rows between posting lists
+    for i in range(0, 1000, 7):
+        metadatas[i] = _random_metadata(rng)
+        store.add_documents([f"doc {i}"], [metadatas[i]], [str(i)])
+
+    rows = np.arange(len(store.ids))
+    filters = [_random_where(rng) for _ in range(300)] + [
+        {"turn": True}, {"turn": 1}, {"turn": {"$in": [False]}}, {"turn": {"$nin": [0, "x"]}},
+        {"type": {"$ne": "user"}}, {"other": {"$ne": 1}}, {"session_id": "unknown"}, {"type": None},
+        {"turn": {"$gt": "a"}}, {"$or": []}, {"$and": []}, {"$and": [{"session_id": "s1"}]},
+    ]
+    for where in filters:
+        expected = {str(i) for i, metadata in enumerate(metadatas) if matches_where(metadata, where)}
+        found = store.query("doc", 2000, where=where)["ids"][0]
+        assert sorted(found) == sorted(expected), where
+
+        candidates = store._candidates(where)
+        if candidates is not None:
+            # Candidates may over-approximate, but never miss a match
+            assert expected <= {store.ids[row] for row in candidates.tolist()}, where
+            if _single_equality(where):
+                assert {store.ids[row] for row in candidates.tolist()} == expected, where
+        if store._vectorizable(where):
+            mask = store._where_mask(where, rows)
+            assert {store.ids[row] for row in rows[mask].tolist()} == expected, where